@@ -4,7 +4,9 @@ from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
 from kusibot.database.models import User
 from config import config
-from kusibot.database.db import init_db
+from kusibot.database.db import db, init_db
+from kusibot.chatbot.model_warmup import model_warmup
+from kusibot.app.event_loop import async_view_loop
 from kusibot.app import (
     main_bp,
     auth_bp,
@@ -29,13 +31,28 @@ DASHBOARD_URL = "professional_bp.dashboard"
 LOGIN_URL = "auth_bp.login"
 MAIN_URL = "main_bp.index"
 
-def create_app(config_name):
+class KusibotFlask(Flask):
+  """Flask app awaiting its async views in the process-wide event loop (see AsyncViewLoop)."""
+
+  def async_to_sync(self, func):
+
+    def run(*args, **kwargs):
+      # The connection of the request thread (user loading) goes back to the pool while the view is awaited,
+      # as the database work of the view runs in the threads of the loop (run_db)
+      db.session.close()
+      return async_view_loop.run(func(*args, **kwargs))
+
+    return run
+
+def create_app(config_name, warmup="off"):
   """
   Creates and Configures a Flask app instance
   following the Application-factory pattern.
   
   Args:
     config_name (str): The configuration name to use [dev/testing/prod].
+    warmup (str, optional): The model warm-up [background/blocking/hook/off], if the configuration
+      (MODEL_WARMUP) does not set it. The serving entry points enable it, the CLI tools do not.
   
   Returns:
     Flask: The Flask app instance.
@@ -45,9 +62,9 @@ def create_app(config_name):
   app_config = config[config_name]
 
   # Creating Flask instance with common templates and static folders.
-  app = Flask(__name__,
-            template_folder='kusibot/app/templates',
-            static_folder='kusibot/app/static')
+  app = KusibotFlask(__name__,
+                     template_folder='kusibot/app/templates',
+                     static_folder='kusibot/app/static')
   
   # Load selected configuration object to the Flask app.
   app.config.from_object(app_config)
@@ -86,11 +103,21 @@ def create_app(config_name):
     """Custom error handler for 403 errors."""
     return render_template('forbidden.html'), 403
 
+  # Warming up the models so the first chats do not pay their cold start.
+  warmup_mode = app.config.get('MODEL_WARMUP') or warmup
+  if warmup_mode == 'background':
+    model_warmup.start()
+  elif warmup_mode == 'blocking':
+    model_warmup.run()
+  elif warmup_mode == 'off':
+    model_warmup.skip()
+  # "hook": started by the gunicorn post_worker_init hook (deploy/gunicorn.conf.py)
+
   return app
 
 def main():
   """Main entry point for running the app using Flask server."""
-  app = create_app(os.getenv('FLASK_ENV', 'default'))
+  app = create_app(os.getenv('FLASK_ENV', 'default'), warmup="background")
   app.run(host="0.0.0.0", port=5000, debug=True)
 
 if __name__ == '__main__':
@@ -15,6 +15,13 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
     SQLALCHEMY_TRACK_MODIFICATIONS = False # Disable the logs of INSERT, UPDATE, DELETE operations. Too much overhead.
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', DEFAULT_SQL)
+    # Warm-up of BERT and Ollama at boot: "background" (thread), "blocking" (inside create_app),
+    # "hook" (started by the gunicorn post_worker_init hook) or "off". GET /ready answers 200 once done.
+    # Unset, it is chosen by the entry point: the servers warm up, the CLI tools building the app do not.
+    MODEL_WARMUP = os.getenv('MODEL_WARMUP')
+    # Per-stage latency of the chat turns: Server-Timing header of /chatbot/chat, last 'timing' event of
+    # /chatbot/chat/stream and in-process histograms, served by GET /metrics.
+    TURN_TIMING = os.getenv('TURN_TIMING', '1') == '1'
 
 
 class DevelopmentConfig(Config):
@@ -28,6 +35,7 @@ class TestingConfig(Config):
     TESTING = True # Exceptions are propagated rather than handled by the the app’s error handlers.
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:' # In memory DB.
     WTF_CSRF_ENABLED = False
+    MODEL_WARMUP = 'off' # Tests load (or mock) the models themselves.
 
 class PerformanceConfig(TestingConfig):
     """Performance Testing configuration for the Flask app."""
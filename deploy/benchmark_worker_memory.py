@@ -0,0 +1,126 @@
+import argparse, json, os, re, signal, subprocess, sys, time
+
+######################################################################
+# Per-worker memory benchmark of the gunicorn deployment.            #
+# Starts gunicorn with and without preload and reports the RSS and   #
+# PSS (RSS with shared pages split between the processes sharing     #
+# them) of every worker once it has loaded the intent model.         #
+# Linux only: reads /proc/<pid>/smaps_rollup.                        #
+######################################################################
+
+DEPLOY_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(DEPLOY_DIR)
+GUNICORN_CONFIG = os.path.join(DEPLOY_DIR, "gunicorn.conf.py")
+APP_FACTORY = "app:create_app('prod')"
+READY_PATTERN = re.compile(r"Worker (\d+) ready")
+MEMORY_FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+def read_memory_mb(pid):
+    """
+    Reads the memory usage of a process from /proc/<pid>/smaps_rollup.
+
+    Args:
+        pid (int): The process id.
+    Returns:
+        dict: The memory fields in MB.
+    """
+
+    memory = {}
+    with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in MEMORY_FIELDS:
+                memory[key.lower() + "_mb"] = int(value.split()[0]) / 1024
+
+    return memory
+
+def run_gunicorn(preload, workers, port, startup_timeout):
+    """
+    Starts gunicorn, waits for every worker to be ready and measures the memory of
+    the master and the workers.
+
+    Args:
+        preload (bool): Whether the app and the intent model are preloaded in the master.
+        workers (int): Number of gunicorn workers.
+        port (int): Port where gunicorn listens.
+        startup_timeout (float): Maximum seconds to wait for the workers.
+    Returns:
+        dict: The memory of the master, of every worker and the totals.
+    """
+
+    env = {
+        **os.environ,
+        "GUNICORN_PRELOAD": "1" if preload else "0",
+        "GUNICORN_WORKERS": str(workers),
+        "GUNICORN_BIND": f"127.0.0.1:{port}"
+    }
+    process = subprocess.Popen([sys.executable, "-m", "gunicorn", "--config", GUNICORN_CONFIG, APP_FACTORY],
+                               cwd=PROJECT_DIR, env=env, stderr=subprocess.PIPE, text=True)
+
+    worker_pids = []
+    start_time = time.perf_counter()
+    try:
+        while len(worker_pids) < workers:
+            line = process.stderr.readline()
+            if not line:
+                raise RuntimeError("gunicorn exited before all the workers were ready")
+            if time.perf_counter() - start_time > startup_timeout:
+                raise TimeoutError("Timed out waiting for the gunicorn workers")
+
+            match = READY_PATTERN.search(line)
+            if match:
+                worker_pids.append(int(match.group(1)))
+
+        startup_s = time.perf_counter() - start_time
+        time.sleep(1) # Let the workers settle after their first allocations
+
+        worker_memory = {pid: read_memory_mb(pid) for pid in worker_pids}
+        master_memory = read_memory_mb(process.pid)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    return {
+        "preload": preload,
+        "workers": workers,
+        "startup_s": startup_s,
+        "master": master_memory,
+        "per_worker": worker_memory,
+        "avg_worker_rss_mb": sum(m["rss_mb"] for m in worker_memory.values()) / workers,
+        "avg_worker_pss_mb": sum(m["pss_mb"] for m in worker_memory.values()) / workers,
+        "total_pss_mb": master_memory["pss_mb"] + sum(m["pss_mb"] for m in worker_memory.values())
+    }
+
+def main():
+    """Command comparing the per-worker memory of gunicorn without and with preload."""
+
+    parser = argparse.ArgumentParser(description="Benchmark per-worker memory of gunicorn without and with preload.")
+    parser.add_argument("--workers", type=int, default=2, help="Number of gunicorn workers.")
+    parser.add_argument("--port", type=int, default=5055, help="Port used by the benchmarked server.")
+    parser.add_argument("--startup-timeout", type=float, default=300, help="Maximum seconds to wait for the workers.")
+    parser.add_argument("--output", default=None, help="Path of an optional JSON report.")
+    args = parser.parse_args()
+
+    report = {
+        "before": run_gunicorn(False, args.workers, args.port, args.startup_timeout),
+        "after": run_gunicorn(True, args.workers, args.port, args.startup_timeout)
+    }
+
+    for name, result in report.items():
+        print(f"{name} (preload={result['preload']}): startup {result['startup_s']:.1f} s | "
+              f"avg worker RSS {result['avg_worker_rss_mb']:.0f} MB, PSS {result['avg_worker_pss_mb']:.0f} MB | "
+              f"total PSS (master + workers) {result['total_pss_mb']:.0f} MB")
+        for pid, memory in result["per_worker"].items():
+            print(f"  worker {pid}: RSS {memory['rss_mb']:.0f} MB, PSS {memory['pss_mb']:.0f} MB, "
+                  f"shared {memory['shared_clean_mb'] + memory['shared_dirty_mb']:.0f} MB, "
+                  f"private {memory['private_clean_mb'] + memory['private_dirty_mb']:.0f} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
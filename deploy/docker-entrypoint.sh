@@ -5,5 +5,16 @@ echo "Setting up instance folder..."
 mkdir -p /app/instance
 chmod -R 777 /app/instance
 
+if [ -n "$INTENT_SERVER_SOCKET" ]; then
+    echo "Starting intent inference service..."
+    python -m kusibot.chatbot.intent_server &
+    # The socket is published once every inference process has loaded its model
+    for _ in $(seq 300); do
+        [ -S "$INTENT_SERVER_SOCKET" ] && break
+        sleep 1
+    done
+fi
+
 echo "Starting Gunicorn server..."
-exec gunicorn --bind 0.0.0.0:5000 "app:create_app('prod')"
\ No newline at end of file
+# Workers, threads and preload of the intent model are set in gunicorn.conf.py
+exec gunicorn --config gunicorn.conf.py "app:create_app('prod')"
\ No newline at end of file
@@ -0,0 +1,76 @@
+import gc, multiprocessing, os
+
+######################################################################
+# Gunicorn configuration for production.                             #
+# With preload (default) the app and the BERT intent model are       #
+# loaded once in the master before forking, so the workers share     #
+# the read-only weights through copy-on-write instead of holding a   #
+# copy each.                                                         #
+# https://docs.gunicorn.org/en/stable/settings.html                  #
+######################################################################
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("GUNICORN_WORKERS", 2))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", 4))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120)) # LLM responses can take a while
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+# Torch intra-op threads per worker: the cores are split between the workers
+# so they do not oversubscribe the CPU when running BERT concurrently.
+intent_torch_threads = int(os.getenv("INTENT_TORCH_THREADS", max(1, multiprocessing.cpu_count() // workers)))
+os.environ.setdefault("OMP_NUM_THREADS", str(intent_torch_threads))
+os.environ.setdefault("MKL_NUM_THREADS", str(intent_torch_threads))
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false") # The Rust tokenizer pool is not fork-safe
+
+# The models are warmed up by every worker (post_worker_init) rather than by create_app in the master,
+# where the torch kernels would be initialised before forking and with a single thread. The warm-up
+# runs in a thread of the worker: the Ollama model load can outlast the worker timeout, and meanwhile
+# the worker answers the readiness probe (503) instead of being killed for not serving.
+os.environ.setdefault("MODEL_WARMUP", "hook")
+
+def _load_intent_model():
+    """Builds the IntentRecognizerAgent singleton (loads the tokenizer and BERT weights)."""
+
+    from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
+    return IntentRecognizerAgent()
+
+def when_ready(server):
+    """Master, before forking: load the intent model once so the workers share it."""
+
+    if not preload_app:
+        return
+
+    import torch
+    torch.set_num_threads(1) # No OpenMP pool is started in the master (not fork-safe)
+    _load_intent_model()
+
+    # Objects created so far are never collected, so the collector does not write
+    # into (and copy) the pages shared with the workers.
+    gc.freeze()
+    server.log.info("Intent model preloaded in the master (pid %s)", os.getpid())
+
+def post_fork(server, worker):
+    """Worker, just after forking: own torch threads and database connections."""
+
+    import torch
+    torch.set_num_threads(intent_torch_threads)
+
+    if preload_app:
+        # Connections opened by the master must not be shared with the workers
+        from kusibot.database.db import db
+        with server.app.wsgi().app_context():
+            db.engine.dispose(close=False)
+
+def post_worker_init(worker):
+    """Worker, before serving: load the model (if not preloaded) and start warming BERT and Ollama up so no request pays the cold start."""
+
+    if os.getenv("MODEL_WARMUP") == "hook":
+        from kusibot.chatbot.model_warmup import model_warmup
+        _load_intent_model()
+        model_warmup.start() # GET /ready answers 503 until it ends
+    else:
+        _load_intent_model().predict_intent("Hello")
+
+    worker.log.info("Worker %s ready (intent model %s, %s torch threads)", worker.pid,
+                    "shared with the master" if preload_app else "loaded by the worker", intent_torch_threads)
@@ -1,5 +1,5 @@
 from functools import wraps
-from flask import redirect, url_for, abort
+from flask import redirect, url_for, abort, current_app
 from flask_login import current_user
 
 def redirect_to_principal_page(is_professional):
@@ -33,7 +33,7 @@ def standard_user_required(f):
     def decorated_function(*args, **kwargs):
         if current_user.is_professional:
             abort(403)
-        return f(*args, **kwargs)
+        return current_app.ensure_sync(f)(*args, **kwargs) # Async views are run by the app
 
     return decorated_function
 
@@ -48,6 +48,6 @@ def professional_user_required(f):
     def decorated_function(*args, **kwargs):
         if not current_user.is_professional:
             abort(403)
-        return f(*args, **kwargs)
+        return current_app.ensure_sync(f)(*args, **kwargs) # Async views are run by the app
 
     return decorated_function
@@ -1,13 +1,48 @@
-from flask import Blueprint, render_template, request, jsonify
+from flask import Blueprint, render_template, request, jsonify, make_response, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 from kusibot.services import chatbot_service
+from kusibot.chatbot.turn_timing import turn_timings
 from kusibot.app.auth.utils import standard_user_required
-import traceback
+from functools import wraps
+import inspect, traceback, json, time
 
 chatbot_bp = Blueprint('chatbot_bp', __name__, template_folder='templates', static_folder='static')
 
 CHAT_ERROR_MSG = "An error occurred. Sorry for the inconvenience :("
 
+def timed_turn(view):
+    """Times the stages of the chat turn served by the view (if TURN_TIMING is enabled)
+    and sends them in the Server-Timing header of the response.
+
+    Args:
+        view: The (sync or async) chat view.
+    Returns:
+        The decorated view.
+    """
+
+    def add_server_timing(rv, timer):
+        response = make_response(rv)
+        if timer is not None:
+            response.headers['Server-Timing'] = timer.get_server_timing()
+        return response
+
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_timed_view(*args, **kwargs):
+            with turn_timings.turn(current_app.config.get('TURN_TIMING', False)) as timer:
+                rv = await view(*args, **kwargs)
+            return add_server_timing(rv, timer)
+
+        return async_timed_view
+
+    @wraps(view)
+    def timed_view(*args, **kwargs):
+        with turn_timings.turn(current_app.config.get('TURN_TIMING', False)) as timer:
+            rv = view(*args, **kwargs)
+        return add_server_timing(rv, timer)
+
+    return timed_view
+
 @chatbot_bp.route('/', methods=['GET'])
 @login_required
 @standard_user_required
@@ -26,6 +61,7 @@ def chatbot():
 @chatbot_bp.route('/chat', methods=['POST'])
 @login_required
 @standard_user_required
+@timed_turn
 def chat():
     """Handle user messages and return the chatbot responses.
     
@@ -34,26 +70,113 @@ def chat():
     """
 
     try:
-        # Get the message from the request
-        data = request.json
-        user_message = data.get('message', '')
-    
         # If no user message, respond with a simple message.
+        user_message = _get_user_message()
         if not user_message:
-            return jsonify({'response': chatbot_service.CHATBOT_NO_MSG_PROVIDED})
-        
-        # Return chatbot response as JSON
-        bot_response = chatbot_service.get_response(user_message, current_user.id)
-        return jsonify({
-            'response': bot_response["agent_response"],
-            'agent_type': bot_response["agent_type"],
-            'intent': bot_response["intent_detected"]
-        })
+            return _no_message_response()
+
+        return _chat_response(chatbot_service.get_response(user_message, current_user.id))
+
+    except Exception:
+        return _chat_error_response()
+
+@chatbot_bp.route('/chat/async', methods=['POST'])
+@login_required
+@standard_user_required
+@timed_turn
+async def chat_async():
+    """Async version of chat: the turn is awaited in the event loop of the async views,
+    where its LLM calls share the async connection pool instead of a blocking call each.
     
+    Returns:
+        Response: The JSON response message from the chatbot.
+    """
+
+    try:
+        # If no user message, respond with a simple message.
+        user_message = _get_user_message()
+        if not user_message:
+            return _no_message_response()
+
+        return _chat_response(await chatbot_service.aget_response(user_message, current_user.id))
+
     except Exception:
+        return _chat_error_response()
+
+@chatbot_bp.route('/chat/stream', methods=['POST'])
+@login_required
+@standard_user_required
+def chat_stream():
+    """Handle user messages and stream the chatbot response as Server-Sent Events.
+
+    Events: 'meta' (agent type and intent), 'token' (a chunk of the response),
+    'done' (the full response, already stored) and 'error'. If TURN_TIMING is enabled,
+    a last 'timing' event carries the Server-Timing breakdown of the turn, as the
+    headers are sent before it ends.
+    
+    Returns:
+        Response: The text/event-stream response.
+    """
+
+    data = request.get_json(silent=True) or {}
+    user_message = data.get('message', '')
+    user_id = current_user.id
+    timing_enabled = current_app.config.get('TURN_TIMING', False)
+
+    def events():
+        # If no user message, respond with a simple message.
+        if not user_message:
+            yield _sse_event('done', {'response': chatbot_service.CHATBOT_NO_MSG_PROVIDED})
+            return
+
+        with turn_timings.turn(timing_enabled) as timer:
+            try:
+                first_token = True
+                for event in chatbot_service.stream_response(user_message, user_id):
+                    if first_token and event['event'] == 'token' and timer is not None:
+                        timer.record('first_token', time.perf_counter() - timer.start_time)
+                        first_token = False
+                    yield _sse_event(event.pop('event'), event)
+            except Exception:
+                yield _sse_event('error', {'response': CHAT_ERROR_MSG})
+
+        if timer is not None:
+            yield _sse_event('timing', {'server_timing': timer.get_server_timing()})
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no' # Do not buffer the stream in reverse proxies
+    })
+
+def _sse_event(event, data):
+    """Formats a Server-Sent Event with a JSON payload."""
+
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _get_user_message():
+    """Returns the message sent by the user in the JSON body of the chat request."""
+
+    return request.json.get('message', '')
+
+def _no_message_response():
+    """Returns the chat response when the user sent no message."""
+
+    return jsonify({'response': chatbot_service.CHATBOT_NO_MSG_PROVIDED})
+
+def _chat_response(bot_response):
+    """Returns the chatbot response (from the chatbot service) as the JSON chat response."""
+
+    return jsonify({
+        'response': bot_response["agent_response"],
+        'agent_type': bot_response["agent_type"],
+        'intent': bot_response["intent_detected"]
+    })
+
+def _chat_error_response():
+    """Returns the JSON chat response (500) when the chatbot failed to respond."""
 
-        return jsonify({
-            'response': CHAT_ERROR_MSG,
-            'agent_type': None,
-            'intent': None
-        }), 500
\ No newline at end of file
+    return jsonify({
+        'response': CHAT_ERROR_MSG,
+        'agent_type': None,
+        'intent': None
+    }), 500
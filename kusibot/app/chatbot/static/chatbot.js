@@ -55,6 +55,46 @@ function scrollToBottom(chatWindow) {
     }, 50)
 }
 
+/**
+ * Sets the text of a message, escaping HTML and keeping line breaks.
+ * @param messageText - DOMElement holding the text of a message.
+ * @param text - The message text.
+ */
+function setMessageText(messageText, text) {
+    const sanitizedText = text.replace(/</g, "&lt;").replace(/>/g, "&gt;")
+    messageText.innerHTML = sanitizedText.replace(/\n/g, '<br>')
+}
+
+/**
+ * Parses the Server-Sent Events of a streamed response as they arrive.
+ * @param response - The fetch response with a text/event-stream body.
+ * @param onEvent - Function called with the name and JSON data of every event.
+ */
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+
+    while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+
+        buffer += decoder.decode(value, { stream: true })
+        const events = buffer.split('\n\n')
+        buffer = events.pop() // Incomplete event, wait for the rest
+
+        events.forEach(rawEvent => {
+            let name = 'message'
+            let data = ''
+            rawEvent.split('\n').forEach(line => {
+                if (line.startsWith('event: ')) name = line.slice(7)
+                else if (line.startsWith('data: ')) data += line.slice(6)
+            })
+            if (data) onEvent(name, JSON.parse(data))
+        })
+    }
+}
+
 // Function to show typing indicator
 function showTypingIndicator(typingIndicator, chatWindow) {
     typingIndicator.classList.remove('d-none')
@@ -106,10 +146,9 @@ document.addEventListener('DOMContentLoaded', function () {
             messageDiv.classList.add('bg-white', 'border')
 
         // Sanitize text and add message text
-        const sanitizedText = text.replace(/</g, "&lt;").replace(/>/g, "&gt;")
         const messageText = document.createElement('div')
         messageText.classList.add('message-text')
-        messageText.innerHTML = sanitizedText.replace(/\n/g, '<br>')
+        setMessageText(messageText, text)
         messageDiv.appendChild(messageText)
 
         // Create timestamp
@@ -150,8 +189,8 @@ document.addEventListener('DOMContentLoaded', function () {
         try {
             showTypingIndicator(typingIndicator, chatWindow)
 
-            // Send message to server
-            const response = await fetch(CHAT_URL, {
+            // Send message to server, the response is streamed as it is generated
+            const response = await fetch(CHAT_STREAM_URL, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
@@ -164,10 +203,30 @@ document.addEventListener('DOMContentLoaded', function () {
                 throw new Error(`HTTP error. Status: ${response.status}`)
             }
 
-            const data = await response.json()
-            hideTypingIndicator(typingIndicator)
+            // The bot message is created with the first token and filled as the rest arrive
+            let botMessageText = null
+            let botText = ''
+            function renderBotText(newText) {
+                botText = newText
+                if (!botMessageText) {
+                    hideTypingIndicator(typingIndicator)
+                    botMessageText = addMessage(botText, false).querySelector('.message-text')
+                } else {
+                    setMessageText(botMessageText, botText)
+                    scrollToBottom(chatWindow)
+                }
+            }
 
-            addMessage(data.response, false, data.timestamp)
+            await readEventStream(response, (event, data) => {
+                if (event === 'token')
+                    renderBotText(botText + data.text)
+                else if (event === 'done' || event === 'error')
+                    renderBotText(data.response)
+            })
+
+            if (!botMessageText) {
+                throw new Error('The response stream ended without a response')
+            }
 
         } catch (error) {
 
@@ -0,0 +1,67 @@
+import asyncio, concurrent.futures, contextvars, os, threading
+
+######################################################################
+# Event loop of the async views.                                     #
+# Flask runs an async view (the async chat turn) from the request    #
+# thread of the WSGI server; every view is awaited in one event loop #
+# per process, so the awaits of the turns (the Ollama calls, the     #
+# speculative tasks) share the loop and the async connection pool    #
+# of the LLM clients, which is bound to the loop that first used it. #
+######################################################################
+
+class AsyncViewLoop:
+    """
+    Process-wide event loop, run by a daemon thread, where the request threads await their
+    async views. The blocking work the views offload (run_db, BERT) runs in the default
+    executor of the loop, of ASYNC_THREADPOOL_SIZE threads.
+
+    After a fork the child process starts its own loop, as the thread of the parent's is not copied.
+    """
+
+    DEFAULT_THREADPOOL_SIZE = 32
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+
+    def _get_loop(self):
+        """Returns the loop of this process, starting it the first time."""
+
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(
+                    int(os.getenv("ASYNC_THREADPOOL_SIZE", self.DEFAULT_THREADPOOL_SIZE)), thread_name_prefix="kusibot"))
+                threading.Thread(target=loop.run_forever, name="async-views", daemon=True).start()
+                self._loop, self._pid = loop, os.getpid()
+
+            return self._loop
+
+    def run(self, coroutine):
+        """
+        Runs a coroutine in the loop and waits for its result. The coroutine runs in a copy of the
+        context of the caller, so it sees the Flask app and request contexts of the request thread.
+
+        Args:
+            coroutine: The coroutine to run (e.g. the call of an async view).
+        Returns:
+            The result of the coroutine (its exception is raised).
+        """
+
+        loop = self._get_loop()
+        context = contextvars.copy_context()
+        result = concurrent.futures.Future()
+
+        def set_result(task):
+            if task.cancelled():
+                result.cancel()
+            elif task.exception() is not None:
+                result.set_exception(task.exception())
+            else:
+                result.set_result(task.result())
+
+        loop.call_soon_threadsafe(lambda: loop.create_task(coroutine, context=context).add_done_callback(set_result))
+        return result.result()
+
+async_view_loop = AsyncViewLoop() # Process-wide loop of the async views
@@ -1,4 +1,9 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, jsonify, render_template
+from kusibot.chatbot.model_warmup import model_warmup
+from kusibot.chatbot.turn_timing import turn_timings
+from kusibot.chatbot.llm_scheduler import llm_scheduler
+from kusibot.chatbot.generation_profiles import generation_controller
+from kusibot.chatbot.turn_speculation import turn_speculation
 
 main_bp = Blueprint('main_bp', __name__, template_folder='templates', static_folder='static')
 
@@ -37,4 +42,29 @@ def sos():
     Returns:
         str: The HTML SOS page to render.
     """
-    return render_template('sos.html')
\ No newline at end of file
+    return render_template('sos.html')
+
+@main_bp.route('/ready')
+def ready():
+    """Readiness probe: whether the models are warmed up.
+
+    Returns:
+        Response: The readiness and warm-up durations, 200 if ready or 503 while warming up.
+    """
+    stats = model_warmup.get_stats()
+    return jsonify(stats), 200 if stats["ready"] else 503
+
+@main_bp.route('/metrics')
+def metrics():
+    """Metrics of the chat turns served by this process.
+
+    Returns:
+        Response: The latency histograms of every stage of the timed turns (TURN_TIMING) and
+            the queue depth, admissions and waits of the Ollama generations, the generation profiles
+            chosen from that load (GENERATION_ADAPTIVE), and the wasted rate and
+            time saved of the speculative turns (CHATBOT_SPECULATIVE).
+    """
+    return jsonify({"turn_timing": turn_timings.get_stats(),
+                    "llm_scheduler": llm_scheduler.get_stats(),
+                    "generation": dict(generation_controller.get_stats(), adaptive=generation_controller.adaptive),
+                    "turn_speculation": turn_speculation.get_stats()})
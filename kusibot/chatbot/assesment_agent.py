@@ -1,8 +1,14 @@
 import json, os
-from langchain_ollama import OllamaLLM
+from kusibot.chatbot.llm_registry import llm_registry
+from kusibot.chatbot.llm_deadlines import llm_deadlines
+from kusibot.chatbot.question_prefetcher import question_prefetcher
+from kusibot.chatbot.phrasing_bank import phrasing_bank
+from kusibot.chatbot.context_window import context_window
+from kusibot.chatbot.generation_profiles import generation_controller
+from kusibot.chatbot.turn_timing import turn_timings
 from kusibot.chatbot.assesment_states.asking_question_state import AskingQuestionState
 from kusibot.database.db_repositories import AssessmentRepository, ConversationRepository, MessageRepository, AssessmentQuestionRepository
-from langchain_core.prompts import ChatPromptTemplate
+from kusibot.database.db import run_db
 
 class AssesmentAgent:
     """
@@ -15,10 +21,9 @@ class AssesmentAgent:
             Defaults to "mistral".
 
     Attributes:
-        model (OllamaLLM | None): An instance of the Ollama language model client. 
-            Is None if the connection fails.
-        prompt_question (ChatPromptTemplate): A LangChain prompt template for 
-            generating natural-sounding assessment questions.
+        question_chain (Runnable | None): The compiled chain (prompt template for
+            generating natural-sounding assessment questions | Ollama model), shared
+            by every assessment agent. Is None if the connection fails.
         questionnaires (dict): A dictionary containing the loaded structures for 
             all available assessments (e.g., PHQ-9, GAD-7).
         state (BaseState): The current state object in the state machine, which 
@@ -35,30 +40,26 @@ class AssesmentAgent:
     STATE_WAITING_CATEGORIZATION = "waiting_categorization"
     STATE_FINISHED = "finished"
 
+    # Variables only in the last section: every request starts with the same instructions (cached by Ollama)
     MODEL_PROMPT_QUESTION = """
 # Agent Role & Tone:
 You are an assistant within a mental health chatbot (KUSIBOT). Adopt a gentle, calm, supportive, and natural conversational style.
 
 # Task:
 Generate a **single, concise sentence (strictly 1 sentence max)** that naturally introduces the *topic* 
-of the upcoming assessment question ({question}). Your primary goal is to make this introduction feel like a smooth, 
+of the upcoming assessment question (given in the Input Information below). Your primary goal is to make this introduction feel like a smooth, 
 integrated part of the ongoing conversation, leveraging the `context`. DO NOT ask to the user about an option based on context, that part of mapping
 is done in other Agent.
 
-# Input Information:
-* Upcoming Question Topic: {question}  # A brief description of the theme of the question to be asked next.
-* Upcoming Question ID: {question_id} # The sequence number (1, 2, 3...).
-* Recent Conversation Context (Last 6 messages): {context} # The recent interaction history. For question_id > 1, this includes the user's response(s) to previous question(s).
-
 # Generation Rules:
 
 1.  **If Question ID (`question_id`) is 1:**
-    * Use the `context` to formulate a sentence that gently transitions from the general chat or the trigger for the assessment into the first question's topic (`{question}`). 
+    * Use the `context` to formulate a sentence that gently transitions from the general chat or the trigger for the assessment into the first question's topic. 
     Acknowledge the start of this focused part of the conversation.
     * *Example Goal:* Make the user feel comfortable starting the assessment based on what was just discussed while introducing the first question's theme.
 
 2.  **If Question ID (`question_id`) is greater than 1:**
-    * Use the latest messages in the `context` (likely the user's answer to the previous question) to create a sentence that flows naturally into the `upcoming_question` topic (`{question}`).
+    * Use the latest messages in the `context` (likely the user's answer to the previous question) to create a sentence that flows naturally into the upcoming question topic.
     * The sentence should feel like a logical continuation or the next step, based on the immediately preceding exchange visible in the `context`.
     * *Example Goal:* Ensure the sequence of questions feels connected and conversational, not abrupt, by linking to the user's last input implicitly or explicitly.
 
@@ -66,28 +67,34 @@ is done in other Agent.
     * Prioritize a natural, flowing conversational feel.
     * Maintain a supportive and gentle tone.
     * Strictly adhere to the 1-sentence limit.
-    * Focus on introducing the topic (`{question}`) and asking it.
+    * Focus on introducing the upcoming question topic and asking it.
 
 # Output Format:
 Output *only* the sentence with the gentle introduction and the assesment question. Do not add any extra text, explanations, greetings or any options from previous questions.
 
+# Input Information:
+* Upcoming Question Topic: {question}  # A brief description of the theme of the question to be asked next.
+* Upcoming Question ID: {question_id} # The sequence number (1, 2, 3...).
+* Recent Conversation Context (summary of the earlier messages and the latest ones): {context} # The recent interaction history. For question_id > 1, this includes the user's response(s) to previous question(s).
+
 Your Response:
     """
 
     AGENT_TYPE = "Assesment"
-    CONTEXT_MAX_RETRIEVAL = 6
+    AGENT_NAME = "assessment"
+    # Generation profiles, from the full one to the lightest, used as the load of Ollama rises
+    # (see GenerationController). num_ctx is left as configured: Ollama reloads the model when it changes.
+    GENERATION_PROFILES = [
+        {"name": "full"},
+        {"name": "reduced", "num_predict": 64, "context_tokens": 256},
+        {"name": "minimal", "num_predict": 48, "context_tokens": 128},
+    ]
 
     def __init__(self, model_name="mistral"):
         
-        # Load Mistral Ollama model
-        ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-        try:
-            self.model = OllamaLLM(model=model_name, base_url=ollama_base_url)
-        except Exception as e:
-          print(f"ERROR: Ollama is not installed - {e}")
-          self.model = None
-        
-        self.prompt_question = ChatPromptTemplate.from_template(self.MODEL_PROMPT_QUESTION)
+        # Shared Mistral Ollama client and chain (built once per process)
+        self.question_chain = llm_registry.get_chain(self.AGENT_NAME, self.MODEL_PROMPT_QUESTION, model_name)
+        generation_controller.register(self.AGENT_NAME, self.GENERATION_PROFILES)
 
         # Load questionnaire data
         self.questionnaires = self._load_questionnaires()
@@ -167,23 +174,179 @@ Your Response:
             question_id: The ID of the question.
             user_id: The ID of the user asking the question.
         Returns:
-            str: The naturalized question generated by the model, or the original question if the model is not available.
+            str: The naturalized question generated by the model, or the original question if the model is not available or exceeds the deadline.
         """
         
         # If model not available, return the question as is
-        if not self.model:
+        if not self.question_chain:
             return question
         
-        # Get the context for the question
-        current_conv = self.conv_repo.get_current_conversation_by_user_id(user_id)
-        messages = self.msg_repo.get_limited_messages(current_conv.id, self.CONTEXT_MAX_RETRIEVAL)
-        messages.reverse()
+        # The raw question is asked if the model exceeds the deadline of the agent
+        return llm_deadlines.invoke(self.AGENT_NAME,
+                                    self.question_chain,
+                                    self._build_question_input(question, question_id, user_id),
+                                    fallback=question)
+
+    async def _anaturalize_question(self, question, question_id, user_id):
+        """
+        Async variant of _naturalize_question: the model is awaited (ainvoke) and the
+        database access is offloaded to a thread.
+        
+        Args:
+            question: The question to naturalize.
+            question_id: The ID of the question.
+            user_id: The ID of the user asking the question.
+        Returns:
+            str: The naturalized question generated by the model, or the original question if the model is not available or exceeds the deadline.
+        """
+
+        if not self.question_chain:
+            return question
+
+        chain_input = await run_db(self._build_question_input, question, question_id, user_id)
+
+        return await llm_deadlines.ainvoke(self.AGENT_NAME, self.question_chain, chain_input, fallback=question)
+
+    def _stream_naturalized_question(self, question, question_id, user_id):
+        """
+        Generate a naturalized question like _naturalize_question, but yield it in chunks as the model produces them.
+        
+        Args:
+            question: The question to naturalize.
+            question_id: The ID of the question.
+            user_id: The ID of the user asking the question.
+        Yields:
+            str: The next chunk of the naturalized question (the original question if the model is not available or exceeds the deadline).
+        """
+
+        if not self.question_chain:
+            yield question
+            return
+
+        yield from llm_deadlines.stream(self.AGENT_NAME,
+                                        self.question_chain,
+                                        self._build_question_input(question, question_id, user_id),
+                                        fallback=question)
+
+    def _build_question_input(self, question, question_id, user_id, pending_messages=None):
+        """
+        Build the prompt variables of the question naturalization, including the recent conversation context.
+        
+        Args:
+            question: The question to naturalize.
+            question_id: The ID of the question.
+            user_id: The ID of the user asking the question.
+            pending_messages (list, optional): (is_user, text) messages of the current turn, not stored yet.
+        Returns:
+            dict: The question, question ID and context of the prompt.
+        """
+
+        # Get the context for the question (within the token budget)
+        with turn_timings.stage("history"):
+            current_conv = self.conv_repo.get_current_conversation_by_user_id(user_id)
+            messages = self.msg_repo.get_limited_messages(current_conv.id, context_window.MAX_MESSAGES)
+            messages.reverse()
+            summary = self.conv_repo.get_summary(current_conv.id)
+
+            chat_history = context_window.build_history(self.AGENT_NAME, current_conv.id, messages, summary, pending_messages)
+
+        return {"question": question, "question_id": question_id, "context": chat_history}
+
+    def _prefetch_next_question(self, assessment_id, free_text, bot_response):
+        """
+        Start naturalizing the next question of the assessment in the background, once the free text
+        answer of the current one arrived (the next question does not depend on the option picked).
+        
+        Args:
+            assessment_id: The ID of the current assessment.
+            free_text: The free text answer of the user (not stored yet).
+            bot_response: The options prompt answered to it (not stored yet).
+        """
+
+        if not self.question_chain or not question_prefetcher.enabled or phrasing_bank.should_use():
+            return
+
+        try:
+            assessment = self.assess_repo.get_assessment(assessment_id)
+            question_list = self.questionnaires[assessment.assessment_type]['questions']
+            next_question = next((q for q in question_list if q['id'] == assessment.current_question + 1), None)
+            if next_question is None: # Last question, the assessment finalizes next
+                return
+
+            chain_input = self._build_question_input(next_question['question'],
+                                                     next_question['id'],
+                                                     assessment.user_id,
+                                                     pending_messages=[(True, free_text), (False, bot_response)])
+            question_prefetcher.submit(assessment_id, next_question['id'], self.AGENT_NAME, self.question_chain, chain_input)
+        except Exception as e:
+            print(f"ERROR: Failed to prefetch the next question: {e}")
+
+    def _get_prefetched_question(self, assessment_id, question_id):
+        """
+        Get the naturalized question prefetched for the assessment, if any.
+        
+        Args:
+            assessment_id: The ID of the current assessment.
+            question_id: The ID of the question to ask.
+        Returns:
+            str: The prefetched question, or None if it has to be generated now.
+        """
+
+        if not self.question_chain or not question_prefetcher.enabled:
+            return None
+
+        return question_prefetcher.get(assessment_id, question_id)
+
+    async def _aget_prefetched_question(self, assessment_id, question_id):
+        """Async variant of _get_prefetched_question: an unfinished prefetch is awaited."""
+
+        if not self.question_chain or not question_prefetcher.enabled:
+            return None
+
+        return await question_prefetcher.aget(assessment_id, question_id)
+
+    def _get_banked_question(self, assessment_id, question_id):
+        """
+        Get a precomputed phrasing of the question, if the phrasing mode asks it from the bank now.
         
-        chat_history = "\n".join([f"{'User' if msg.is_user else 'Bot'}: {msg.text}" for msg in messages])
+        Args:
+            assessment_id: The ID of the current assessment.
+            question_id: The ID of the question to ask.
+        Returns:
+            str: The precomputed phrasing, or None if it has to be phrased by the model.
+        """
+
+        if self.question_chain and not phrasing_bank.should_use():
+            return None
 
-        chain = self.prompt_question | self.model  
+        assessment_type = self.assess_repo.get_assessment(assessment_id).assessment_type
+        return phrasing_bank.get_phrasing(assessment_type, question_id)
+
+    def _get_ready_question(self, assessment_id, question_id):
+        """
+        Get the question already phrased (prefetched or precomputed), without calling the model.
         
-        return chain.invoke({"question": question, "question_id": question_id, "context": chat_history})
+        Args:
+            assessment_id: The ID of the current assessment.
+            question_id: The ID of the question to ask.
+        Returns:
+            str: The phrased question, or None if the model has to phrase it now.
+        """
+
+        prefetched_question = self._get_prefetched_question(assessment_id, question_id)
+        if prefetched_question is not None:
+            return prefetched_question
+
+        return self._get_banked_question(assessment_id, question_id)
+
+    async def _aget_ready_question(self, assessment_id, question_id):
+        """Async variant of _get_ready_question: an unfinished prefetch is awaited and the database access offloaded."""
+
+        prefetched_question = await self._aget_prefetched_question(assessment_id, question_id)
+        if prefetched_question is not None:
+            return prefetched_question
+
+        return await run_db(self._get_banked_question, assessment_id, question_id)
 
     def map_intent_to_assessment(self, intent):
         """
@@ -212,6 +375,62 @@ Your Response:
             str: The response generated by the current state.    
         """
         
+        current_assesment = self._get_or_start_assessment(user_input, conversation_id, intent)
+        
+        # Process response based on STATE
+        return self.state.generate_response(user_input, 
+                                            conversation_id, 
+                                            current_assesment.id)
+
+    async def agenerate_response(self, user_input, conversation_id, intent=None):
+        """
+        Async variant of generate_response: the LLM calls of the current state are awaited.
+        
+        Args:
+            user_input: The input from the user.
+            conversation_id: The ID of the current conversation.
+            intent: The intent detected by BERT, if any.
+        Returns:
+            str: The response generated by the current state.
+        """
+
+        # Only the ID leaves the worker thread: the session of run_db is closed afterwards
+        assessment_id = await run_db(self._get_or_start_assessment_id, user_input, conversation_id, intent)
+
+        return await self.state.agenerate_response(user_input,
+                                                   conversation_id,
+                                                   assessment_id)
+
+    def stream_response(self, user_input, conversation_id, intent=None):
+        """
+        Generate a response like generate_response, but yield it in chunks as it is produced.
+        
+        Args:
+            user_input: The input from the user.
+            conversation_id: The ID of the current conversation.
+            intent: The intent detected by BERT, if any.
+        Yields:
+            str: The next chunk of the response generated by the current state.
+        """
+
+        current_assesment = self._get_or_start_assessment(user_input, conversation_id, intent)
+
+        yield from self.state.stream_response(user_input,
+                                              conversation_id,
+                                              current_assesment.id)
+
+    def _get_or_start_assessment(self, user_input, conversation_id, intent):
+        """
+        Get the current assessment of the conversation user, starting a new one if there is none.
+        
+        Args:
+            user_input: The input from the user (the assessment trigger when starting one).
+            conversation_id: The ID of the current conversation.
+            intent: The intent detected by BERT, used to choose the questionnaire.
+        Returns:
+            Assessment: The current assessment.
+        """
+
         # Get the current conversation and assesment
         current_conv = self.conv_repo.get_conversation(conversation_id)
         current_assesment = self.assess_repo.get_current_assessment(current_conv.user_id)
@@ -224,9 +443,10 @@ Your Response:
                                                                    user_id=current_conv.user_id,
                                                                    assessment_type=questionnaire_to_take,
                                                                    state=self.STATE_ASKING)
-        
-        # Process response based on STATE
-        return self.state.generate_response(user_input, 
-                                            conversation_id, 
-                                            current_assesment.id)
-                
+
+        return current_assesment
+
+    def _get_or_start_assessment_id(self, user_input, conversation_id, intent):
+        """Returns the ID of the assessment of _get_or_start_assessment (for run_db, whose session is closed once done)."""
+
+        return self._get_or_start_assessment(user_input, conversation_id, intent).id
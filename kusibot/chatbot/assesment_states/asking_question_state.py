@@ -1,5 +1,6 @@
 from kusibot.chatbot.assesment_states.base_state import BaseState
 from kusibot.chatbot.assesment_states.waiting_free_state import WaitingFreeTextState
+from kusibot.database.db import run_db
 
 class AskingQuestionState(BaseState):
     """State representing the agent asking a question in an assessment."""
@@ -9,12 +10,55 @@ class AskingQuestionState(BaseState):
         # Get the next question to ask
         question_json = self.context._get_question_json(assessment_id)
 
-        # Get the model natural phrase
-        user_id = self.context.assess_repo.get_assessment(assessment_id).user_id
-        bot_response = self.context._naturalize_question(question_json['question'],
-                                                         question_json['id'],
-                                                         user_id)
+        # Get the model natural phrase (prefetched while the user picked the previous option, or precomputed)
+        bot_response = self.context._get_ready_question(assessment_id, question_json['id'])
+        if bot_response is None:
+            user_id = self.context.assess_repo.get_assessment(assessment_id).user_id
+            bot_response = self.context._naturalize_question(question_json['question'],
+                                                             question_json['id'],
+                                                             user_id)
         
+        self._wait_for_free_text(assessment_id)
+        
+        return bot_response
+
+    async def agenerate_response(self, user_input, conversation_id, assessment_id):
+
+        # Get the next question to ask
+        question_json = await run_db(self.context._get_question_json, assessment_id)
+
+        # Get the model natural phrase (prefetched while the user picked the previous option, or precomputed)
+        bot_response = await self.context._aget_ready_question(assessment_id, question_json['id'])
+        if bot_response is None:
+            user_id = await run_db(self._get_user_id, assessment_id)
+            bot_response = await self.context._anaturalize_question(question_json['question'],
+                                                                    question_json['id'],
+                                                                    user_id)
+
+        await run_db(self._wait_for_free_text, assessment_id)
+
+        return bot_response
+
+    def stream_response(self, user_input, conversation_id, assessment_id):
+
+        # Get the next question to ask
+        question_json = self.context._get_question_json(assessment_id)
+
+        # Stream the model natural phrase (or the one prefetched or precomputed)
+        ready_question = self.context._get_ready_question(assessment_id, question_json['id'])
+        if ready_question is not None:
+            yield ready_question
+        else:
+            user_id = self.context.assess_repo.get_assessment(assessment_id).user_id
+            yield from self.context._stream_naturalized_question(question_json['question'],
+                                                                 question_json['id'],
+                                                                 user_id)
+
+        self._wait_for_free_text(assessment_id)
+
+    def _wait_for_free_text(self, assessment_id):
+        """Moves the assessment to waiting for the free text answer once the question is asked."""
+
         # Changing state of AssesmentAgent to WaitingFreeTextState
         self.context._transition_to_next_state(WaitingFreeTextState())
 
@@ -23,5 +67,8 @@ class AskingQuestionState(BaseState):
             assessment_id,
             current_state=self.context.STATE_WAITING_FREE_TEXT
         )
-        
-        return bot_response
+
+    def _get_user_id(self, assessment_id):
+        """Returns the ID of the user taking the assessment (for run_db, whose session is closed once done)."""
+
+        return self.context.assess_repo.get_assessment(assessment_id).user_id
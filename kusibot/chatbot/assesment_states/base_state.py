@@ -1,5 +1,6 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from kusibot.database.db import run_db
 
 class BaseState(ABC):
     """
@@ -26,4 +27,32 @@ class BaseState(ABC):
         Returns:
             str: The response generated by the current state.
         """
-        pass
\ No newline at end of file
+        pass
+
+    def stream_response(self, user_input, conversation_id, assessment_id):
+        """
+        Generate the response like generate_response, but yield it in chunks as it is produced.
+        By default the whole response is a single chunk (states without LLM generation).
+        
+        Args:
+            user_input: The input from the user.
+            conversation_id: The ID of the current conversation.
+            assessment_id: The ID of the current assessment.
+        Yields:
+            str: The next chunk of the response.
+        """
+        yield self.generate_response(user_input, conversation_id, assessment_id)
+
+    async def agenerate_response(self, user_input, conversation_id, assessment_id):
+        """
+        Async variant of generate_response. By default the state (without LLM generation)
+        runs in a thread, so its database access does not block the event loop.
+        
+        Args:
+            user_input: The input from the user.
+            conversation_id: The ID of the current conversation.
+            assessment_id: The ID of the current assessment.
+        Returns:
+            str: The response generated by the current state.
+        """
+        return await run_db(self.generate_response, user_input, conversation_id, assessment_id)
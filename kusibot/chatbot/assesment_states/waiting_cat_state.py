@@ -1,4 +1,5 @@
 from kusibot.chatbot.assesment_states.base_state import BaseState
+from kusibot.database.db import run_db
 
 class WaitingCategorizationState(BaseState):
     """State where the user is expected to categorize their response by selecting an option from a list."""
@@ -6,6 +7,56 @@ class WaitingCategorizationState(BaseState):
     ERROR_NUMBER_RESPONSE = "Sorry, I need the number corresponding to the option. Can you please provide the number?"
 
     def generate_response(self, user_input, conversation_id, assessment_id):
+
+        error_response = self._categorize(user_input, assessment_id)
+        if error_response:
+            return error_response
+
+        # Return next question or the final message
+        return self.context.state.generate_response(
+            user_input,
+            conversation_id,
+            assessment_id
+        )
+
+    def stream_response(self, user_input, conversation_id, assessment_id):
+
+        error_response = self._categorize(user_input, assessment_id)
+        if error_response:
+            yield error_response
+            return
+
+        # Stream next question or the final message
+        yield from self.context.state.stream_response(
+            user_input,
+            conversation_id,
+            assessment_id
+        )
+
+    async def agenerate_response(self, user_input, conversation_id, assessment_id):
+
+        error_response = await run_db(self._categorize, user_input, assessment_id)
+        if error_response:
+            return error_response
+
+        # Return next question or the final message
+        return await self.context.state.agenerate_response(
+            user_input,
+            conversation_id,
+            assessment_id
+        )
+
+    def _categorize(self, user_input, assessment_id):
+        """
+        Saves the option selected by the user and moves the assessment to the next state
+        (asking the next question or finalizing).
+
+        Args:
+            user_input: The input from the user (the option number).
+            assessment_id: The ID of the current assessment.
+        Returns:
+            str: The error response if the input is not a valid option, None otherwise.
+        """
         
         # Get the current question that was asked
         question_json = self.context._get_question_json(assessment_id)
@@ -31,15 +82,9 @@ class WaitingCategorizationState(BaseState):
                 total_questions = len(self.context.questionnaires[assessment.assessment_type]['questions'])
                 if assessment.current_question + 1 > total_questions: # All questions answered
                     
-                    # Changing state and triggering finalization
+                    # Changing state to trigger finalization
                     from kusibot.chatbot.assesment_states.finalizing_state import FinalizingState
                     self.context._transition_to_next_state(FinalizingState())
-                    
-                    return self.context.state.generate_response(
-                        user_input,
-                        conversation_id,
-                        assessment_id
-                    )
                 
                 else: # More questions to answer
                     
@@ -54,13 +99,8 @@ class WaitingCategorizationState(BaseState):
                         current_question=assessment.current_question + 1,
                         last_free_text=None
                     )
-                    
-                    # Return next question
-                    return self.context.state.generate_response(
-                        user_input,
-                        conversation_id,
-                        assessment_id
-                    )
+
+                return None
                  
             else: # Selected index is out of range
                 return self.ERROR_NUMBER_RESPONSE
@@ -34,4 +34,7 @@ class WaitingFreeTextState(BaseState):
             last_free_text=user_input
         )
 
+        # The next question is known now: start phrasing it while the user picks an option
+        self.context._prefetch_next_question(assessment_id, user_input, prompt)
+
         return prompt
\ No newline at end of file
@@ -0,0 +1,243 @@
+import math, os, threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from kusibot.chatbot.llm_registry import llm_registry
+from kusibot.chatbot.llm_deadlines import llm_deadlines
+from kusibot.chatbot.generation_profiles import generation_controller
+
+######################################################################
+# Token-budgeted context of the LLM prompts.                         #
+# The conversation messages fill a prompt token budget from the      #
+# newest to the oldest, and a rolling summary of the conversation    #
+# (updated in the background) stands in for the older ones, so the   #
+# prompt size is bounded however long the messages are.              #
+######################################################################
+
+CHARS_PER_TOKEN = 4 # Approximation for the Mistral tokenizer on English text
+
+def estimate_tokens(text):
+    """Returns the approximate number of tokens of a text."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def truncate_to_tokens(text, max_tokens):
+    """Returns the text cut to approximately max_tokens tokens (the end replaced by "...")."""
+
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max(max_chars - 3, 0)].rstrip() + "..."
+
+def format_turn(is_user, text):
+    """Returns the line of a message in the prompt context."""
+    return f"{'User' if is_user else 'Bot'}: {text}"
+
+def pack_turns(turns, budget_tokens):
+    """
+    Fills the budget with the newest turns. If the newest turn alone does not fit, it is truncated.
+
+    Args:
+        turns (list): (is_user, text) turns, from the oldest to the newest.
+        budget_tokens (int): The token budget of the context.
+    Returns:
+        tuple: The lines of the packed turns (oldest first) and the number of oldest turns left out.
+    """
+
+    lines = []
+    used_tokens = 0
+    for i in range(len(turns) - 1, -1, -1):
+        line = format_turn(*turns[i])
+        tokens = estimate_tokens(line) + 1 # Line break
+        if used_tokens + tokens > budget_tokens:
+            if not lines:
+                lines.append(truncate_to_tokens(line, budget_tokens))
+                i -= 1
+            lines.reverse()
+            return lines, i + 1
+        lines.append(line)
+        used_tokens += tokens
+
+    lines.reverse()
+    return lines, 0
+
+class ContextWindow:
+    """
+    Builds the conversation context of the agent prompts within a token budget per agent type
+    (CONTEXT_<AGENT>_TOKENS, e.g. CONTEXT_CONVERSATION_TOKENS=768), lowered to the context_tokens
+    of the current generation profile of the agent under load.
+
+    The messages left out of the budget are folded into the rolling summary of the conversation,
+    which is placed first in the context. The summary is updated by the LLM in a background
+    thread once CONTEXT_SUMMARY_BATCH messages are left out (CONTEXT_SUMMARY=0 disables it).
+    """
+
+    DEFAULT_BUDGETS = {"conversation": 768, "assessment": 384}
+    DEFAULT_BUDGET = 512
+    DEFAULT_SUMMARY_TOKENS = 160
+    DEFAULT_SUMMARY_BATCH = 4
+    MAX_MESSAGES = 50 # Messages retrieved to fill the budget
+
+    SUMMARY_AGENT_NAME = "summary"
+    # Variables only in the last section, so the instructions are a prefix shared by every request
+    SUMMARY_PROMPT = """
+# Task:
+You keep a running summary of a conversation between a user and KUSIBOT, a supportive mental health chatbot.
+Update the current summary with the new messages, in at most 4 short sentences.
+
+# Rules:
+* Keep what matters to continue the conversation: the user's feelings, situation, concerns and any important event or name mentioned.
+* Keep facts from the current summary unless the new messages contradict them.
+* Write in the third person ("The user..."). Do not add advice, diagnoses or anything not said in the conversation.
+
+# Output Format:
+Output *only* the updated summary.
+
+# Input:
+* Current Summary: {summary}
+* New Messages:
+{messages}
+
+Updated Summary:
+"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._summarizing = set()
+        self._builds = 0
+        self._truncated = 0
+        self._summaries = 0
+        self._failures = 0
+
+    @property
+    def summaries_enabled(self):
+        """Whether the messages left out of the context are summarized."""
+        return os.getenv("CONTEXT_SUMMARY", "1") == "1"
+
+    def get_budget(self, agent_name):
+        """
+        Returns the context token budget of an agent type (the lower of the configured one and
+        the one of its current generation profile).
+
+        Args:
+            agent_name (str): The agent type (e.g. "conversation", "assessment").
+        Returns:
+            int: The token budget.
+        """
+
+        budget_tokens = int(os.getenv(f"CONTEXT_{agent_name.upper()}_TOKENS",
+                                      self.DEFAULT_BUDGETS.get(agent_name, self.DEFAULT_BUDGET)))
+        profile_tokens = generation_controller.get_profile(agent_name).get("context_tokens")
+        return budget_tokens if profile_tokens is None else min(budget_tokens, profile_tokens)
+
+    def build_history(self, agent_name, conversation_id, messages, summary, pending_turns=None):
+        """
+        Builds the context of a prompt: the summary of the older messages and the newest ones
+        fitting in the budget of the agent. Schedules the update of the summary if enough
+        messages were left out.
+
+        Args:
+            agent_name (str): The agent type.
+            conversation_id (int): The ID of the conversation.
+            messages (list): The last messages of the conversation, from the oldest to the newest.
+            summary (ConversationSummary | None): The rolling summary of the conversation.
+            pending_turns (list, optional): (is_user, text) turns of the current turn, not stored yet.
+        Returns:
+            str: The context of the prompt.
+        """
+
+        budget_tokens = self.get_budget(agent_name)
+        summary_tokens = int(os.getenv("CONTEXT_SUMMARY_TOKENS", self.DEFAULT_SUMMARY_TOKENS))
+
+        # The messages already summarized are replaced by the summary
+        lines = []
+        if summary is not None:
+            messages = [msg for msg in messages if msg.id > summary.summarized_until]
+            lines.append(f"Summary of the earlier conversation: {truncate_to_tokens(summary.text, summary_tokens)}")
+            budget_tokens -= estimate_tokens(lines[0]) + 1
+
+        turns = [(msg.is_user, msg.text) for msg in messages] + list(pending_turns or [])
+        packed_lines, left_out = pack_turns(turns, max(budget_tokens, 0))
+        lines.extend(packed_lines)
+
+        with self._lock:
+            self._builds += 1
+            if packed_lines and packed_lines[-1] != format_turn(*turns[-1]):
+                self._truncated += 1
+
+        left_out_messages = messages[:left_out]
+        if self.summaries_enabled and len(left_out_messages) >= int(os.getenv("CONTEXT_SUMMARY_BATCH", self.DEFAULT_SUMMARY_BATCH)):
+            self._schedule_summary(conversation_id, summary.text if summary else "", left_out_messages)
+
+        return "\n".join(lines)
+
+    def _schedule_summary(self, conversation_id, previous_summary, messages):
+        """Starts folding the messages into the summary in a background thread (one update per conversation at a time)."""
+
+        if not has_app_context():
+            return
+
+        app = current_app._get_current_object()
+        turns = [(msg.is_user, msg.text) for msg in messages]
+        with self._lock:
+            if conversation_id in self._summarizing:
+                return
+            self._summarizing.add(conversation_id)
+
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="context-summary")
+                self._pid = os.getpid()
+            self._executor.submit(self._update_summary, app, conversation_id, previous_summary, turns, messages[-1].id)
+
+    def _update_summary(self, app, conversation_id, previous_summary, turns, summarized_until):
+        """Generates the updated summary with the LLM and stores it."""
+
+        from kusibot.database.db_repositories import ConversationRepository
+
+        try:
+            chain = llm_registry.get_chain(self.SUMMARY_AGENT_NAME, self.SUMMARY_PROMPT,
+                                           os.getenv("CONTEXT_SUMMARY_MODEL", "mistral"))
+            if chain is None:
+                return
+
+            summary_text = llm_deadlines.invoke(self.SUMMARY_AGENT_NAME, chain, {
+                "summary": previous_summary or "(none yet)",
+                "messages": "\n".join(format_turn(is_user, text) for is_user, text in turns)
+            }, fallback=None)
+            if summary_text is None: # Not generated in time, the messages are summarized with the next ones
+                return
+            summary_text = summary_text.strip()
+
+            summary_tokens = int(os.getenv("CONTEXT_SUMMARY_TOKENS", self.DEFAULT_SUMMARY_TOKENS))
+            with app.app_context():
+                ConversationRepository().save_summary(conversation_id,
+                                                      truncate_to_tokens(summary_text, summary_tokens),
+                                                      summarized_until)
+            with self._lock:
+                self._summaries += 1
+        except Exception as e:
+            print(f"ERROR: Failed to update the conversation summary: {e}")
+            with self._lock:
+                self._failures += 1
+        finally:
+            with self._lock:
+                self._summarizing.discard(conversation_id)
+
+    def get_stats(self):
+        """
+        Returns the context counters.
+
+        Returns:
+            dict: Contexts built, newest messages truncated, summaries updated and failed updates.
+        """
+
+        with self._lock:
+            return {
+                "builds": self._builds,
+                "truncated": self._truncated,
+                "summaries": self._summaries,
+                "summary_failures": self._failures,
+                "summarizing": len(self._summarizing)
+            }
+
+context_window = ContextWindow() # Process-wide builder of the prompt contexts
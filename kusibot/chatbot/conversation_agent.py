@@ -1,7 +1,12 @@
-from langchain_ollama import OllamaLLM
-from langchain_core.prompts import ChatPromptTemplate
-from kusibot.database.db_repositories import MessageRepository
-import os
+import asyncio, random
+from kusibot.chatbot.llm_registry import llm_registry
+from kusibot.chatbot.llm_deadlines import llm_deadlines
+from kusibot.chatbot.context_window import context_window
+from kusibot.chatbot.generation_profiles import generation_controller
+from kusibot.chatbot.response_cache import response_cache
+from kusibot.chatbot.turn_timing import turn_timings
+from kusibot.database.db_repositories import ConversationRepository, MessageRepository
+from kusibot.database.db import run_db
 
 class ConversationAgent:
   """
@@ -13,15 +18,32 @@ class ConversationAgent:
             Defaults to "mistral".
 
     Attributes:
-        model (OllamaLLM | None): An instance of the Ollama language model client.
-            Is None if the connection fails.
-        prompt (ChatPromptTemplate): A LangChain prompt template for generating
-            empathetic conversational responses.
+        chain (Runnable | None): The compiled chain (prompt template for generating
+            empathetic conversational responses | Ollama model), shared by every
+            conversation agent. Is None if the connection fails.
+        conv_repo (ConversationRepository): Repository for conversation data access.
         msg_repo (MessageRepository): Repository for message data access.
     """
 
-  CONTEXT_MAX_RETRIEVE_MSG = 10
+  AGENT_NAME = "conversation"
   MODEL_NOT_AVAILABLE_RESPONSE = "Sorry, the model is not available at the moment and I'm not able to help you :("
+  # Reply when the LLM scheduler does not admit the call (too many generations waiting)
+  BUSY_RESPONSE = "I'm talking with quite a few people right now, so I need a little moment. Could you send me that again in a bit? I'm here for you."
+  # Replies when the model exceeds the deadline of the agent (OLLAMA_CONVERSATION_DEADLINE_S)
+  DEADLINE_RESPONSES = [
+    "Thank you for sharing that with me. I'm taking a little longer than usual to gather my thoughts, could you tell me a bit more?",
+    "I hear you, and I'm here with you. Give me a moment, would you like to tell me more about how that feels?",
+    "That sounds important, thank you for telling me. I'm a bit slow right now, but I'm listening, please go on.",
+  ]
+  # Generation profiles, from the full one to the lightest, used as the load of Ollama rises
+  # (see GenerationController). num_ctx is left as configured: Ollama reloads the model when it changes.
+  GENERATION_PROFILES = [
+    {"name": "full"},
+    {"name": "reduced", "num_predict": 128, "context_tokens": 512},
+    {"name": "minimal", "num_predict": 96, "context_tokens": 256},
+  ]
+  # The instructions are static and the variables come last, so Ollama reuses the
+  # evaluated instructions (KV cache) of the previous request instead of evaluating them again.
   PROMPT_TEMPLATE = """
 # Agent Persona: KUSIBOT
 You are KUSIBOT (you have to refer yourself as that), a supportive and empathetic conversational agent within a mental health chatbot system. Your role is to engage in natural conversation when no formal assessment is active, providing brief, understanding responses. You are triggered after an initial intent classification has determined the user is engaging in general conversation or expressing feelings that don't require immediate assessment. 
@@ -36,10 +58,6 @@ Provide concise (strictly 2-3 sentences maximum), empathetic, and supportive res
 4.  **Gentle Encouragement (Not Advice):** If relevant, offer *general* encouragement for self-reflection or self-care (e.g., "Taking a quiet moment can sometimes help," "It sounds like you're thinking deeply about this."). Avoid prescriptive advice.
 5.  **Respect Boundaries:** Be sensitive. Do not push if the user is hesitant.
 
-# Input Context:
--   Previous Conversation History (Last 10 messages): {chat_history}
--   Current User Query: {user_query}
-
 # Crucial Boundaries & Safety:
 -   **NO Medical Advice:** Absolutely do NOT give diagnoses, treatment plans, or medical opinions.
 -   **NO Assessments:** Do NOT ask questions from mental health questionnaires (like PHQ-9, GAD-7) or try to diagnose. This is handled by a different agent.
@@ -50,50 +68,205 @@ Provide concise (strictly 2-3 sentences maximum), empathetic, and supportive res
 # Output Format:
 Generate ONLY the response text for KUSIBOT.
 
+# Input Context:
+-   Previous Conversation History (summary of the earlier messages and the latest ones): {chat_history}
+-   Current User Query: {user_query}
+
 Your Response:
 """
 
   def __init__(self, model_name="mistral"):
     
-    ollama_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-
-    try:
-      self.model = OllamaLLM(model=model_name, base_url=ollama_base_url)
-    except Exception as e:
-      print(f"ERROR: Ollama is not installed - {e}")
-      self.model = None
-    
-    self.prompt = ChatPromptTemplate.from_template(self.PROMPT_TEMPLATE)
+    # Shared Ollama client and chain (built once per process)
+    self.chain = llm_registry.get_chain(self.AGENT_NAME, self.PROMPT_TEMPLATE, model_name)
+    generation_controller.register(self.AGENT_NAME, self.GENERATION_PROFILES)
 
     # Repositories used
+    self.conv_repo = ConversationRepository()
     self.msg_repo = MessageRepository()
     
-  def generate_response(self, text, conversation_id, intent=None):
+  def generate_response(self, text, conversation_id, intent=None, cancel_event=None, intent_future=None):
     """
     Generates a response based on the user's input and the conversation context.
     
     Args:
       text (str): The user's input text.
       conversation_id (int): The ID of the current conversation.
-      intent (str, optional): The detected intent of the user's input. Not used in this agent.
+      intent (str, optional): The detected intent of the user's input (part of the response cache key).
+      cancel_event (threading.Event, optional): Stops a speculative generation once set
+        (the turn went to another agent), its response is then discarded.
+      intent_future (concurrent.futures.Future, optional): Resolved with the intent of a speculative
+        turn once classified. Only waited for by the turns using the response cache (the intent is
+        part of its key); the others start the generation at once.
     Returns:
-      str: The generated response from the model.
+      str: The generated response from the model (a canned reply if it exceeds the deadline).
     """
     
-    if not self.model:
+    if not self.chain:
       return self.MODEL_NOT_AVAILABLE_RESPONSE
 
-    # Fetch last X messages for the context.
-    messages = self.msg_repo.get_limited_messages(
-      conv_id=conversation_id,
-      limit=self.CONTEXT_MAX_RETRIEVE_MSG
-    )
-    messages.reverse()
+    chain_input = self._build_chain_input(text, conversation_id)
+    if intent_future is not None and response_cache.can_cache(text, chain_input):
+      intent = intent_future.result()
+    if cancel_event is not None and cancel_event.is_set():
+      return None
+
+    cached_response, cache_key = self._get_cached_response(text, intent, chain_input)
+    if cached_response is not None:
+      return cached_response
+  
+    response = llm_deadlines.invoke(self.AGENT_NAME,
+                                    self.chain,
+                                    chain_input,
+                                    fallback=random.choice(self.DEADLINE_RESPONSES),
+                                    busy_fallback=self.BUSY_RESPONSE,
+                                    cancel_event=cancel_event)
+    if cancel_event is None or not cancel_event.is_set():
+      self._cache_response(cache_key, response)
+
+    return response
+
+  async def agenerate_response(self, text, conversation_id, intent=None, chain_input=None, intent_future=None):
+    """
+    Async variant of generate_response: the model is awaited (ainvoke) and the database
+    access is offloaded to a thread.
     
-    chat_history = "\n".join([f"{'User' if msg.is_user else 'Bot'}: {msg.text}" for msg in messages])
+    Args:
+      text (str): The user's input text.
+      conversation_id (int): The ID of the current conversation.
+      intent (str, optional): The detected intent of the user's input (part of the response cache key).
+      chain_input (dict, optional): The prompt variables, if already built.
+      intent_future (asyncio.Future, optional): Resolved with the intent of a speculative turn once
+        classified, awaited only by the turns using the response cache.
+    Returns:
+      str: The generated response from the model.
+    """
+
+    if not self.chain:
+      return self.MODEL_NOT_AVAILABLE_RESPONSE
+
+    if chain_input is None:
+      chain_input = await run_db(self._build_chain_input, text, conversation_id)
+
+    if intent_future is not None and response_cache.can_cache(text, chain_input):
+      intent = await intent_future
+
+    cached_response, cache_key = await asyncio.to_thread(self._get_cached_response, text, intent, chain_input)
+    if cached_response is not None:
+      return cached_response
+
+    response = await llm_deadlines.ainvoke(self.AGENT_NAME,
+                                           self.chain,
+                                           chain_input,
+                                           fallback=random.choice(self.DEADLINE_RESPONSES),
+                                           busy_fallback=self.BUSY_RESPONSE)
+    self._cache_response(cache_key, response)
+
+    return response
+
+  async def aspeculate_response(self, text, conversation_id, intent_future):
+    """
+    Async generation started before the intent of the turn is known (speculative turns).
+    If it is cancelled during the history fetch, it still waits for the fetch to end,
+    so the database session is free for the agent that answers the turn instead.
     
-    chain = self.prompt | self.model
-  
-    return chain.invoke({"chat_history": chat_history, "user_query": text})
+    Args:
+      text (str): The user's input text.
+      conversation_id (int): The ID of the current conversation.
+      intent_future (asyncio.Future): Resolved with the intent once classified (for the response cache).
+    Returns:
+      str: The generated response from the model.
+    """
+
+    history = asyncio.ensure_future(run_db(self._build_chain_input, text, conversation_id))
+    try:
+      chain_input = await asyncio.shield(history)
+    except asyncio.CancelledError:
+      await asyncio.wait([history])
+      raise
+
+    return await self.agenerate_response(text, conversation_id, chain_input=chain_input, intent_future=intent_future)
+
+  def stream_response(self, text, conversation_id, intent=None):
+    """
+    Generates a response like generate_response, but yields it in chunks as the model produces them.
+    A cached response is yielded at once; the streamed ones are not cached (a deadline may cut them).
+    
+    Args:
+      text (str): The user's input text.
+      conversation_id (int): The ID of the current conversation.
+      intent (str, optional): The detected intent of the user's input (part of the response cache key).
+    Yields:
+      str: The next chunk of the generated response.
+    """
+
+    if not self.chain:
+      yield self.MODEL_NOT_AVAILABLE_RESPONSE
+      return
+
+    chain_input = self._build_chain_input(text, conversation_id)
+    cached_response, _ = self._get_cached_response(text, intent, chain_input)
+    if cached_response is not None:
+      yield cached_response
+      return
+
+    yield from llm_deadlines.stream(self.AGENT_NAME,
+                                    self.chain,
+                                    chain_input,
+                                    fallback=random.choice(self.DEADLINE_RESPONSES),
+                                    busy_fallback=self.BUSY_RESPONSE)
+
+  def _get_cached_response(self, text, intent, chain_input):
+    """
+    Looks a short turn with a trivial context up in the semantic response cache.
+    
+    Args:
+      text (str): The user's input text.
+      intent (str | None): The detected intent of the user's input.
+      chain_input (dict): The prompt variables.
+    Returns:
+      tuple: The cached response (None on a miss) and the cache key to store the generated
+        one (None if the turn does not use the cache).
+    """
+
+    context_key = response_cache.get_context_key(text, chain_input, intent)
+    if context_key is None:
+      return None, None
+
+    embedding = response_cache.embed(text)
+    if embedding is None:
+      return None, None
+
+    return response_cache.get(embedding, context_key), (embedding, context_key)
+
+  def _cache_response(self, cache_key, response):
+    """Stores a generated response in the semantic response cache (not the canned ones)."""
+
+    if cache_key is None or not response or response == self.BUSY_RESPONSE or response in self.DEADLINE_RESPONSES:
+      return
+
+    response_cache.put(*cache_key, response)
+
+  def _build_chain_input(self, text, conversation_id):
+    """
+    Builds the prompt variables: the conversation context (within the token budget) and the user's input.
+    
+    Args:
+      text (str): The user's input text.
+      conversation_id (int): The ID of the current conversation.
+    Returns:
+      dict: The chat history and user query of the prompt.
+    """
+
+    # Fetch the last messages and the summary of the older ones for the context.
+    with turn_timings.stage("history"):
+      messages = self.msg_repo.get_limited_messages(
+        conv_id=conversation_id,
+        limit=context_window.MAX_MESSAGES
+      )
+      messages.reverse()
+      summary = self.conv_repo.get_summary(conversation_id)
+      
+      chat_history = context_window.build_history(self.AGENT_NAME, conversation_id, messages, summary)
 
-    
\ No newline at end of file
+    return {"chat_history": chat_history, "user_query": text}
@@ -0,0 +1,186 @@
+import json, os, threading, time
+from langchain_core.runnables import RunnableSequence
+from langchain_ollama import OllamaLLM
+from kusibot.chatbot.llm_scheduler import llm_scheduler
+
+######################################################################
+# Load-adaptive generation profiles.                                 #
+# Every agent type has a list of profiles, from the full one to the  #
+# lightest (shorter answers, smaller context). A controller steps    #
+# all the agents down a profile while the LLM queue is deep or the   #
+# model is slow, and back up once the load subsides.                 #
+######################################################################
+
+# Ollama options of OllamaLLM, all sent on every request (see OllamaLLM._generate_params)
+OLLAMA_OPTION_FIELDS = ("mirostat", "mirostat_eta", "mirostat_tau", "num_ctx", "num_gpu", "num_thread", "num_predict",
+                        "repeat_last_n", "repeat_penalty", "temperature", "seed", "stop", "tfs_z", "top_k", "top_p")
+PROFILE_OPTIONS = ("num_predict", "num_ctx")
+
+class GenerationController:
+    """
+    Chooses the generation profile of every agent type from the load of Ollama.
+
+    A profile is a dict with a name and, optionally, num_predict and num_ctx (Ollama options
+    overriding the ones of the agent) and context_tokens (budget of the prompt context).
+    The agents register their profiles (GENERATION_PROFILES, replaced by the JSON list in
+    GENERATION_<AGENT>_PROFILES if set) and share one level: the controller moves one
+    profile down while the LLM queue depth or the latency of the generations (moving
+    average) is high, and one up when both are low, at most once every cooldown.
+
+    Options (read when used): GENERATION_ADAPTIVE ("1" to follow the load, opt-in; otherwise the full profile is kept),
+    GENERATION_QUEUE_HIGH/LOW, GENERATION_LATENCY_HIGH_S/LOW_S and GENERATION_COOLDOWN_S.
+    """
+
+    DEFAULT_QUEUE_HIGH = 8
+    DEFAULT_QUEUE_LOW = 1
+    DEFAULT_LATENCY_HIGH_S = 8.0
+    DEFAULT_LATENCY_LOW_S = 3.0
+    DEFAULT_COOLDOWN_S = 10.0
+    LATENCY_SMOOTHING = 0.3 # Weight of the last generation in the moving average
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = {}
+        self._bound_chains = {}
+        self._level = 0
+        self._latency_s = None
+        self._last_switch = 0.0
+        self._switches = 0
+
+    @property
+    def adaptive(self):
+        """Whether the profiles follow the load."""
+        return os.getenv("GENERATION_ADAPTIVE", "0") == "1"
+
+    def register(self, agent_name, profiles):
+        """
+        Sets the generation profiles of an agent type.
+
+        Args:
+            agent_name (str): The agent type (e.g. "conversation", "assessment").
+            profiles (list): The profiles, from the full one to the lightest.
+        """
+
+        configured = os.getenv(f"GENERATION_{agent_name.upper()}_PROFILES")
+        if configured:
+            try:
+                profiles = json.loads(configured)
+            except json.JSONDecodeError as e:
+                print(f"ERROR: Invalid GENERATION_{agent_name.upper()}_PROFILES, using the default profiles - {e}")
+
+        with self._lock:
+            self._profiles[agent_name] = list(profiles)
+
+    def observe_latency(self, latency_s):
+        """Adds the latency of a finished generation to the moving average."""
+
+        with self._lock:
+            if self._latency_s is None:
+                self._latency_s = latency_s
+            else:
+                self._latency_s += self.LATENCY_SMOOTHING * (latency_s - self._latency_s)
+
+    def _max_level(self):
+        return max((len(profiles) - 1 for profiles in self._profiles.values()), default=0)
+
+    def update(self):
+        """Moves the level one profile down or up if the load requires it (and the cooldown passed)."""
+
+        if not self.adaptive:
+            with self._lock:
+                self._level = 0
+            return
+
+        queue_depth = llm_scheduler.get_stats()["queue_depth"]
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_switch < float(os.getenv("GENERATION_COOLDOWN_S", self.DEFAULT_COOLDOWN_S)):
+                return
+
+            latency_s = self._latency_s or 0.0
+            overloaded = (queue_depth >= int(os.getenv("GENERATION_QUEUE_HIGH", self.DEFAULT_QUEUE_HIGH))
+                          or latency_s >= float(os.getenv("GENERATION_LATENCY_HIGH_S", self.DEFAULT_LATENCY_HIGH_S)))
+            relaxed = (queue_depth <= int(os.getenv("GENERATION_QUEUE_LOW", self.DEFAULT_QUEUE_LOW))
+                       and latency_s <= float(os.getenv("GENERATION_LATENCY_LOW_S", self.DEFAULT_LATENCY_LOW_S)))
+
+            level = self._level
+            if overloaded and level < self._max_level():
+                level += 1
+            elif relaxed and level > 0:
+                level -= 1
+            if level == self._level:
+                return
+
+            profile_names = ", ".join(f"{name}={self._profile_at(name, level)['name']}" for name in self._profiles)
+            print(f"Generation profile level {self._level} -> {level} "
+                  f"(queue depth {queue_depth}, latency {latency_s:.2f} s): {profile_names}")
+            self._level = level
+            self._last_switch = now
+            self._switches += 1
+
+    def _profile_at(self, agent_name, level):
+        """Returns the profile of an agent type at a level (its lightest one past the end of its list)."""
+
+        profiles = self._profiles.get(agent_name)
+        if not profiles:
+            return {"name": "full"}
+        return profiles[min(level, len(profiles) - 1)]
+
+    def get_profile(self, agent_name):
+        """
+        Returns the current generation profile of an agent type, updating the level first.
+
+        Args:
+            agent_name (str): The agent type.
+        Returns:
+            dict: The profile (name, and optionally num_predict, num_ctx and context_tokens).
+        """
+
+        self.update()
+        with self._lock:
+            return self._profile_at(agent_name, self._level)
+
+    def apply(self, agent_name, chain):
+        """
+        Returns the chain with the Ollama options of the current profile of the agent type.
+
+        Args:
+            agent_name (str): The agent type.
+            chain (Runnable): The chain of the agent (prompt | OllamaLLM).
+        Returns:
+            Runnable: The chain bound to the options of the profile, or the same chain if the
+                profile changes none (or it does not end in an Ollama model).
+        """
+
+        profile = self.get_profile(agent_name)
+        overrides = {option: profile[option] for option in PROFILE_OPTIONS if profile.get(option) is not None}
+        if not overrides or not isinstance(chain, RunnableSequence) or not isinstance(chain.last, OllamaLLM):
+            return chain
+
+        key = (id(chain), agent_name, profile["name"])
+        with self._lock:
+            if key not in self._bound_chains:
+                llm = chain.last
+                options = {field: getattr(llm, field) for field in OLLAMA_OPTION_FIELDS}
+                options.update(overrides)
+                bound_chain = RunnableSequence(chain.first, *chain.middle, llm.bind(options=options))
+                self._bound_chains[key] = (chain, bound_chain) # The chain is kept so its id is not reused
+            return self._bound_chains[key][1]
+
+    def get_stats(self):
+        """
+        Returns the current profiles and the load they were chosen from.
+
+        Returns:
+            dict: The level, the profile of every agent type, the switches and the latency moving average.
+        """
+
+        with self._lock:
+            return {
+                "level": self._level,
+                "profiles": {name: self._profile_at(name, self._level)["name"] for name in self._profiles},
+                "switches": self._switches,
+                "latency_s": self._latency_s
+            }
+
+generation_controller = GenerationController() # Process-wide controller of the generation profiles
@@ -0,0 +1,215 @@
+import argparse, os, torch
+
+######################################################################
+# Inference backends for the BERT intent classifier.                 #
+# Every backend receives the input tensors and returns the logits.   #
+######################################################################
+
+ONNX_ARTIFACT = "mh_bert.onnx"
+TORCHSCRIPT_ARTIFACT = "mh_bert.torchscript.pt"
+
+class LogitsModule(torch.nn.Module):
+    """
+    Thin wrapper around BertForSequenceClassification returning only the logits,
+    so the model can be traced and exported with plain tensor inputs/outputs.
+
+    Args:
+        model (BertForSequenceClassification): The fine-tuned BERT model.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask, return_dict=False)[0]
+
+class EagerBackend:
+    """
+    Default backend: runs the PyTorch model in eager mode.
+
+    Args:
+        model (BertForSequenceClassification): The fine-tuned BERT model.
+    """
+
+    NAME = "eager"
+
+    def __init__(self, model):
+        self.module = LogitsModule(model)
+
+    def __call__(self, input_ids, attention_mask):
+        with torch.no_grad():
+            return self.module(input_ids, attention_mask)
+
+class CompiledBackend:
+    """
+    Runs the model under torch.inference_mode using the exported TorchScript
+    artifact if it exists, or torch.compile otherwise. If compilation fails at
+    the first call, it keeps running the model in eager mode.
+
+    Args:
+        model (BertForSequenceClassification): The fine-tuned BERT model.
+        artifact_path (str): Path of the exported TorchScript artifact.
+        device (torch.device): The device on which the model is running.
+    """
+
+    NAME = "compiled"
+
+    def __init__(self, model, artifact_path, device):
+        self._eager_module = LogitsModule(model)
+
+        if os.path.exists(artifact_path):
+            self.module = torch.jit.load(artifact_path, map_location=device)
+            self.mode = "torchscript"
+        else:
+            self.module = torch.compile(self._eager_module, dynamic=True)
+            self.mode = "torch.compile"
+
+    def __call__(self, input_ids, attention_mask):
+        with torch.inference_mode():
+            try:
+                return self.module(input_ids, attention_mask)
+            except Exception as e:
+                if self.module is self._eager_module:
+                    raise
+                print(f"ERROR: {self.mode} backend failed, falling back to eager - {e}")
+                self.module, self.mode = self._eager_module, "eager"
+                return self.module(input_ids, attention_mask)
+
+class OnnxBackend:
+    """
+    Runs the exported ONNX model in an ONNX Runtime CPU session.
+
+    Args:
+        artifact_path (str): Path of the exported ONNX artifact.
+        device (torch.device): The device where the logits are returned.
+    """
+
+    NAME = "onnx"
+
+    def __init__(self, artifact_path, device):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(artifact_path, options, providers=["CPUExecutionProvider"])
+        self.device = device
+
+    def __call__(self, input_ids, attention_mask):
+        logits = self.session.run(["logits"], {
+            "input_ids": input_ids.cpu().numpy(),
+            "attention_mask": attention_mask.cpu().numpy()
+        })[0]
+        return torch.from_numpy(logits).to(self.device)
+
+def create_backend(name, model, artifact_dir, device):
+    """
+    Creates the inference backend selected by name, falling back to the eager
+    backend if its artifact is missing or the backend cannot be loaded.
+
+    Args:
+        name (str): The backend name (eager, compiled or onnx).
+        model (BertForSequenceClassification): The fine-tuned BERT model.
+        artifact_dir (str): Directory where the exported artifacts are stored.
+        device (torch.device): The device on which the model is running.
+    Returns:
+        The inference backend.
+    """
+
+    try:
+        if name == CompiledBackend.NAME:
+            return CompiledBackend(model, os.path.join(artifact_dir, TORCHSCRIPT_ARTIFACT), device)
+
+        if name == OnnxBackend.NAME:
+            artifact_path = os.path.join(artifact_dir, ONNX_ARTIFACT)
+            if not os.path.exists(artifact_path):
+                print(f"ERROR: ONNX artifact not found at {artifact_path}, falling back to eager backend")
+                return EagerBackend(model)
+            try:
+                return OnnxBackend(artifact_path, device)
+            except ImportError as e:
+                print(f"ERROR: ONNX Runtime is not installed (install the 'onnx' extra), falling back to eager backend - {e}")
+                return EagerBackend(model)
+
+        if name != EagerBackend.NAME:
+            print(f"ERROR: Unknown intent backend '{name}', falling back to eager backend")
+    except Exception as e:
+        print(f"ERROR: Failed to load intent backend '{name}', falling back to eager backend - {e}")
+
+    return EagerBackend(model)
+
+def _dummy_inputs(device):
+    """Returns a small (batch, sequence) input used to trace the model."""
+
+    input_ids = torch.ones((2, 16), dtype=torch.long, device=device)
+    attention_mask = torch.ones((2, 16), dtype=torch.long, device=device)
+    return input_ids, attention_mask
+
+def export_torchscript(model, artifact_path, device):
+    """
+    Traces the model with TorchScript and saves it.
+
+    Args:
+        model (BertForSequenceClassification): The fine-tuned BERT model.
+        artifact_path (str): Path where the artifact is written.
+        device (torch.device): The device on which the model is running.
+    """
+
+    module = LogitsModule(model).eval()
+    with torch.no_grad():
+        traced = torch.jit.trace(module, _dummy_inputs(device), check_trace=False)
+    traced.save(artifact_path)
+
+def export_onnx(model, artifact_path, device):
+    """
+    Exports the model to ONNX with dynamic batch and sequence dimensions.
+
+    Args:
+        model (BertForSequenceClassification): The fine-tuned BERT model.
+        artifact_path (str): Path where the artifact is written.
+        device (torch.device): The device on which the model is running.
+    """
+
+    module = LogitsModule(model).eval()
+    dynamic_axes = {
+        "input_ids": {0: "batch", 1: "sequence"},
+        "attention_mask": {0: "batch", 1: "sequence"},
+        "logits": {0: "batch"}
+    }
+    with torch.no_grad():
+        torch.onnx.export(module, _dummy_inputs(device), artifact_path,
+                          input_names=["input_ids", "attention_mask"],
+                          output_names=["logits"],
+                          dynamic_axes=dynamic_axes,
+                          opset_version=17,
+                          dynamo=False)
+
+def main():
+    """One-shot command exporting the intent model artifacts next to its label mapping."""
+
+    parser = argparse.ArgumentParser(description="Export the BERT intent model for the faster inference backends.")
+    parser.add_argument("--format", choices=["onnx", "torchscript", "all"], default="all",
+                        help="Artifact format to export (default: all).")
+    parser.add_argument("--output-dir", default=None,
+                        help="Directory where the artifacts are written (default: next to label_mapping.json).")
+    args = parser.parse_args()
+
+    from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
+    agent = IntentRecognizerAgent()
+    if agent.quantization_report and agent.quantization_report["applied"]:
+        parser.error("the artifacts are exported from the fp32 model, unset INTENT_QUANTIZATION")
+    output_dir = args.output_dir or agent.model_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    if args.format in ("torchscript", "all"):
+        artifact_path = os.path.join(output_dir, TORCHSCRIPT_ARTIFACT)
+        export_torchscript(agent.model, artifact_path, agent.device)
+        print(f"TorchScript artifact written to {artifact_path}")
+
+    if args.format in ("onnx", "all"):
+        artifact_path = os.path.join(output_dir, ONNX_ARTIFACT)
+        export_onnx(agent.model, artifact_path, agent.device)
+        print(f"ONNX artifact written to {artifact_path}")
+
+if __name__ == '__main__':
+    main()
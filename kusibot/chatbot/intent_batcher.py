@@ -0,0 +1,158 @@
+import os, time
+from collections import Counter
+from concurrent.futures import Future
+from queue import Queue, Empty
+from threading import Lock, Thread
+
+class IntentMicroBatcher:
+    """
+    Cross-request micro-batching front end for the intent classifier.
+    Concurrent callers enqueue their text and wait on a future while a single
+    background worker groups the pending texts into one batch, runs a single
+    forward pass and hands every caller its own prediction back.
+
+    Args:
+        predict_batch_fn (callable): Function receiving a list of texts and returning
+            a list of (intent, confidence) tuples in the same order.
+        max_batch_size (int, optional): Maximum number of texts in a single batch.
+            Defaults to 16.
+        max_wait_ms (float, optional): Maximum time (in milliseconds) the worker waits
+            for more requests once the first one of a batch has arrived. Defaults to 5.
+
+    Attributes:
+        predict_batch_fn (callable): The batched prediction function.
+        max_batch_size (int): Maximum number of texts in a single batch.
+        max_wait (float): Maximum time (in seconds) to wait to fill a batch.
+    """
+
+    def __init__(self, predict_batch_fn, max_batch_size=16, max_wait_ms=5):
+        self.predict_batch_fn = predict_batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+
+        self._lock = Lock()
+        self._queue = None
+        self._worker = None
+        self._worker_pid = None
+
+        # Statistics
+        self._stats_lock = Lock()
+        self._total_requests = 0
+        self._total_batches = 0
+        self._max_queue_depth = 0
+        self._batch_size_histogram = Counter()
+
+    def predict(self, text, timeout=None):
+        """
+        Enqueues the text to be classified and blocks until its batch has been processed.
+
+        Args:
+            text: The input text for which the intent needs to be predicted.
+            timeout: Maximum number of seconds to wait for the result (None waits forever).
+        Returns:
+            tuple: The predicted intent label and its confidence.
+        """
+
+        future = Future()
+        queue = self._ensure_worker()
+        queue.put((text, future))
+
+        with self._stats_lock:
+            self._total_requests += 1
+            self._max_queue_depth = max(self._max_queue_depth, queue.qsize())
+
+        return future.result(timeout=timeout)
+
+    def _ensure_worker(self):
+        """
+        Starts the background worker if it is not running in the current process.
+        Threads do not survive a fork, so a worker started before forking
+        (e.g. in a preloading server) is started again in the child process.
+
+        Returns:
+            Queue: The queue the running worker is consuming from.
+        """
+
+        with self._lock:
+            if (self._worker is None or
+                not self._worker.is_alive() or
+                self._worker_pid != os.getpid()):
+
+                self._queue = Queue()
+                self._worker = Thread(target=self._run,
+                                      args=(self._queue,),
+                                      name="intent-micro-batcher",
+                                      daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+            return self._queue
+
+    def _run(self, queue):
+        """
+        Worker loop: waits for a first request, fills the batch until it is full or
+        the maximum wait time expires and then processes it.
+
+        Args:
+            queue (Queue): The queue of pending (text, future) requests.
+        """
+
+        while True:
+            batch = [queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(queue.get(timeout=remaining))
+                    else:
+                        batch.append(queue.get_nowait())
+                except Empty:
+                    break
+
+            self._process_batch(batch)
+
+    def _process_batch(self, batch):
+        """
+        Runs the batched prediction and resolves the future of every request.
+
+        Args:
+            batch (list): A list of (text, future) requests.
+        """
+
+        with self._stats_lock:
+            self._total_batches += 1
+            self._batch_size_histogram[len(batch)] += 1
+
+        try:
+            results = self.predict_batch_fn([text for text, _ in batch])
+        except Exception as e:
+            print(f"ERROR: Intent batch prediction failed - {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def get_stats(self):
+        """
+        Returns the queue depth and batch-size statistics of the batcher.
+
+        Returns:
+            dict: The batching statistics.
+        """
+
+        with self._stats_lock:
+            processed = sum(size * count for size, count in self._batch_size_histogram.items())
+            return {
+                "queue_depth": self._queue.qsize() if self._queue else 0,
+                "max_queue_depth": self._max_queue_depth,
+                "total_requests": self._total_requests,
+                "total_batches": self._total_batches,
+                "avg_batch_size": (processed / self._total_batches) if self._total_batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_size_histogram.items())),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000
+            }
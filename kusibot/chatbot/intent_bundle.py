@@ -0,0 +1,156 @@
+import argparse, hashlib, json, os, shutil, time
+from transformers import BertTokenizerFast, BertForSequenceClassification
+
+######################################################################
+# Local model bundle of the intent classifier.                       #
+# Tokenizer, safetensors weights (memory-mapped on load) and label   #
+# mapping in a single directory, so startup needs no network.        #
+######################################################################
+
+BUNDLE_MANIFEST = "bundle.json"
+BUNDLE_FORMAT_VERSION = 1
+LABEL_MAPPING_FILE = "label_mapping.json"
+WEIGHTS_FILE = "model.safetensors"
+
+def _sha256(path):
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_bundle(output_dir, tokenizer_name, model_repo):
+    """
+    Downloads the tokenizer, the fine-tuned model and its label mapping and writes
+    them as a local bundle (weights as safetensors) with a manifest of the files.
+
+    Args:
+        output_dir (str): Directory where the bundle is written.
+        tokenizer_name (str): Hugging Face name of the tokenizer.
+        model_repo (str): Hugging Face repo of the fine-tuned model and label mapping.
+    Returns:
+        dict: The bundle manifest.
+    """
+
+    from huggingface_hub import hf_hub_download
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = BertTokenizerFast.from_pretrained(tokenizer_name)
+    tokenizer.save_pretrained(output_dir)
+
+    model = BertForSequenceClassification.from_pretrained(model_repo)
+    model.save_pretrained(output_dir, safe_serialization=True)
+
+    label_mapping_path = hf_hub_download(repo_id=model_repo, filename=LABEL_MAPPING_FILE)
+    shutil.copyfile(label_mapping_path, os.path.join(output_dir, LABEL_MAPPING_FILE))
+
+    files = {}
+    for filename in sorted(os.listdir(output_dir)):
+        path = os.path.join(output_dir, filename)
+        if filename != BUNDLE_MANIFEST and os.path.isfile(path):
+            files[filename] = {"size": os.path.getsize(path), "sha256": _sha256(path)}
+
+    manifest = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "tokenizer": tokenizer_name,
+        "model_repo": model_repo,
+        "files": files
+    }
+    with open(os.path.join(output_dir, BUNDLE_MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+def read_manifest(bundle_dir, verify_checksums=False):
+    """
+    Reads the bundle manifest and checks every listed file exists with the recorded size
+    (and checksum, which reads the whole weights file, if requested).
+
+    Args:
+        bundle_dir (str): Directory of the bundle.
+        verify_checksums (bool, optional): Whether to verify the SHA-256 of every file.
+    Returns:
+        dict: The bundle manifest.
+    Raises:
+        FileNotFoundError: If the manifest or any listed file is missing.
+        ValueError: If the format version, a size or a checksum does not match.
+    """
+
+    manifest_path = os.path.join(bundle_dir, BUNDLE_MANIFEST)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise FileNotFoundError(f"Cannot read the bundle manifest {manifest_path}: {e}")
+
+    if manifest.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format version {manifest.get('format_version')}")
+
+    files = manifest.get("files", {})
+    for required in (WEIGHTS_FILE, LABEL_MAPPING_FILE):
+        if required not in files:
+            raise FileNotFoundError(f"The bundle does not contain {required}")
+
+    for filename, info in files.items():
+        path = os.path.join(bundle_dir, filename)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Missing bundle file {path}")
+        if os.path.getsize(path) != info["size"]:
+            raise ValueError(f"Size mismatch of bundle file {path}")
+        if verify_checksums and _sha256(path) != info["sha256"]:
+            raise ValueError(f"Checksum mismatch of bundle file {path}")
+
+    return manifest
+
+def load_bundle(bundle_dir):
+    """
+    Loads the tokenizer, model and label mapping strictly from a local bundle.
+    Nothing is resolved against the Hugging Face Hub.
+
+    Args:
+        bundle_dir (str): Directory of the bundle.
+    Returns:
+        tuple: The tokenizer, the model and the label mapping.
+    Raises:
+        FileNotFoundError: If the bundle is missing or incomplete.
+        ValueError: If the bundle files do not match the manifest.
+    """
+
+    read_manifest(bundle_dir)
+
+    # Safetensors weights are memory-mapped instead of unpickled
+    tokenizer = BertTokenizerFast.from_pretrained(bundle_dir, local_files_only=True)
+    model = BertForSequenceClassification.from_pretrained(bundle_dir, local_files_only=True, use_safetensors=True)
+    with open(os.path.join(bundle_dir, LABEL_MAPPING_FILE), 'r') as f:
+        label_mapping = json.load(f)
+
+    return tokenizer, model, label_mapping
+
+def main():
+    """Command building (or verifying) the local model bundle of the intent classifier."""
+
+    from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
+
+    parser = argparse.ArgumentParser(description="Build the offline model bundle of the intent classifier.")
+    parser.add_argument("--output-dir", default=os.getenv("INTENT_MODEL_BUNDLE", "intent_bundle"),
+                        help="Directory where the bundle is written (default: INTENT_MODEL_BUNDLE or ./intent_bundle).")
+    parser.add_argument("--verify", action="store_true",
+                        help="Verify the checksums of an existing bundle instead of building it.")
+    args = parser.parse_args()
+
+    if args.verify:
+        read_manifest(args.output_dir, verify_checksums=True)
+        print(f"Bundle {args.output_dir} verified")
+        return
+
+    start_time = time.perf_counter()
+    manifest = build_bundle(args.output_dir, IntentRecognizerAgent.BERT_TOKENIZER, IntentRecognizerAgent.CUSTOM_BERT_REPO)
+    size_mb = sum(info["size"] for info in manifest["files"].values()) / 1e6
+    print(f"Bundle written to {args.output_dir} ({len(manifest['files'])} files, {size_mb:.1f} MB) "
+          f"in {time.perf_counter() - start_time:.1f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from threading import Lock
+
+class IntentPredictionCache:
+    """
+    Bounded, thread-safe LRU cache of intent predictions keyed on the cleaned text.
+    The cache is tied to a fingerprint of the model configuration and is
+    cleared automatically whenever that fingerprint changes.
+
+    Args:
+        max_size (int): Maximum number of cached predictions.
+
+    Attributes:
+        max_size (int): Maximum number of cached predictions.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max(1, int(max_size))
+
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._fingerprint = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def validate(self, fingerprint):
+        """
+        Clears the cache if the model configuration changed since the predictions were stored.
+
+        Args:
+            fingerprint: Hashable description of the current model configuration.
+        """
+
+        with self._lock:
+            if fingerprint != self._fingerprint:
+                if self._entries:
+                    self._invalidations += 1
+                self._entries.clear()
+                self._fingerprint = fingerprint
+
+    def get(self, key):
+        """
+        Returns the cached prediction of the key, marking it as recently used.
+
+        Args:
+            key (str): The cleaned text.
+        Returns:
+            tuple: The cached (intent, confidence) prediction, or None on a miss.
+        """
+
+        with self._lock:
+            prediction = self._entries.get(key)
+            if prediction is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return prediction
+
+    def put(self, key, prediction):
+        """
+        Stores a prediction, evicting the least recently used one if the cache is full.
+
+        Args:
+            key (str): The cleaned text.
+            prediction (tuple): The (intent, confidence) prediction.
+        """
+
+        with self._lock:
+            self._entries[key] = prediction
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get_stats(self):
+        """
+        Returns the size and hit/miss counters of the cache.
+
+        Returns:
+            dict: The cache statistics.
+        """
+
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "invalidations": self._invalidations
+            }
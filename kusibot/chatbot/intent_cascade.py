@@ -0,0 +1,340 @@
+import argparse, os, random, time, torch, zlib
+from threading import Lock
+
+######################################################################
+# Two-stage (cascade) intent classification.                         #
+# A hashed n-gram linear model decides the easy messages in          #
+# microseconds and only uncertain ones are escalated to BERT.        #
+######################################################################
+
+CASCADE_ARTIFACT = "intent_cascade.pt"
+
+class HashedNgramClassifier(torch.nn.Module):
+    """
+    Linear intent classifier over hashed word unigrams/bigrams and character trigrams.
+    The features are hashed into a fixed number of buckets, so no vocabulary is needed.
+
+    Args:
+        labels (list): The intent labels, in class index order.
+        num_buckets (int, optional): Number of hash buckets. Defaults to 2**18.
+
+    Attributes:
+        labels (list): The intent labels, in class index order.
+        num_buckets (int): Number of hash buckets.
+        margin (float): Minimum difference between the two most probable intents
+            for the first stage to decide on its own (calibrated when training).
+    """
+
+    def __init__(self, labels, num_buckets=2**18):
+        super().__init__()
+        self.labels = list(labels)
+        self.num_buckets = num_buckets
+        self.margin = 1.0 # Escalates everything until calibrated
+        self.weights = torch.nn.EmbeddingBag(num_buckets, len(self.labels), mode='sum')
+        self.bias = torch.nn.Parameter(torch.zeros(len(self.labels)))
+        torch.nn.init.zeros_(self.weights.weight)
+
+    def featurize(self, text):
+        """
+        Hashes the n-grams of an (already cleaned) text into bucket indices.
+
+        Args:
+            text (str): The cleaned input text.
+        Returns:
+            list: The bucket index of every n-gram.
+        """
+
+        words = text.split()
+        ngrams = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            ngrams.extend(f"#{padded[i:i + 3]}" for i in range(len(padded) - 2))
+
+        return [zlib.crc32(ngram.encode('utf-8')) % self.num_buckets for ngram in ngrams] or [0]
+
+    def forward(self, indices, offsets, per_sample_weights):
+        return self.weights(indices, offsets, per_sample_weights=per_sample_weights) + self.bias
+
+    def _to_tensors(self, texts):
+        """
+        Featurizes a batch of texts into the flattened EmbeddingBag inputs.
+        Every n-gram is weighted by 1/sqrt(n) so long texts do not dominate.
+
+        Args:
+            texts (list): The cleaned input texts.
+        Returns:
+            tuple: The indices, offsets and per-sample weights tensors.
+        """
+
+        indices, offsets, weights = [], [], []
+        for text in texts:
+            features = self.featurize(text)
+            offsets.append(len(indices))
+            indices.extend(features)
+            weights.extend([1 / len(features) ** 0.5] * len(features))
+
+        return torch.tensor(indices), torch.tensor(offsets), torch.tensor(weights)
+
+    def predict_proba(self, texts):
+        """
+        Predicts the intent probabilities of a batch of cleaned texts.
+
+        Args:
+            texts (list): The cleaned input texts.
+        Returns:
+            torch.Tensor: The class probabilities (one row per text).
+        """
+
+        with torch.no_grad():
+            return torch.softmax(self(*self._to_tensors(texts)), dim=1)
+
+    def predict(self, text):
+        """
+        Predicts the intent of a cleaned text if the first stage is confident enough.
+
+        Args:
+            text (str): The cleaned input text.
+        Returns:
+            tuple: The predicted intent and its confidence, or None if the prediction
+                margin is below the calibrated one (the text must be escalated).
+        """
+
+        top_probs, top_classes = torch.topk(self.predict_proba([text])[0], k=2)
+        if (top_probs[0] - top_probs[1]).item() < self.margin:
+            return None
+
+        return self.labels[top_classes[0].item()], top_probs[0].item()
+
+    def fit(self, texts, labels, epochs=5, batch_size=256, learning_rate=0.05, seed=42):
+        """
+        Trains the linear model on cleaned texts and their intent labels.
+
+        Args:
+            texts (list): The cleaned training texts.
+            labels (list): The intent label of every text.
+            epochs (int, optional): Number of training epochs. Defaults to 5.
+            batch_size (int, optional): Mini-batch size. Defaults to 256.
+            learning_rate (float, optional): Adam learning rate. Defaults to 0.05.
+            seed (int, optional): Seed of the mini-batch shuffling, so the training is reproducible. Defaults to 42.
+        """
+
+        rng = random.Random(seed) # The weights start at zero, the shuffling is the only randomness
+        targets = [self.labels.index(label) for label in labels]
+        order = list(range(len(texts)))
+        optimizer = torch.optim.Adam(self.parameters(), lr=learning_rate)
+
+        self.train()
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            total_loss = 0.0
+            for i in range(0, len(order), batch_size):
+                batch = order[i:i + batch_size]
+                logits = self(*self._to_tensors([texts[j] for j in batch]))
+                loss = torch.nn.functional.cross_entropy(logits, torch.tensor([targets[j] for j in batch]))
+
+                optimizer.zero_grad()
+                loss.backward()
+                optimizer.step()
+                total_loss += loss.item() * len(batch)
+
+            print(f"Epoch {epoch + 1}/{epochs} - loss: {total_loss / len(order):.4f}")
+        self.eval()
+
+    def calibrate_margin(self, texts, reference_predictions, triggers_assessment):
+        """
+        Chooses the smallest margin for which every text decided by the first stage
+        keeps the assessment-trigger decision of the reference (BERT) predictions.
+
+        Args:
+            texts (list): The cleaned validation texts.
+            reference_predictions (list): The BERT (intent, confidence) predictions.
+            triggers_assessment (callable): Function returning whether an (intent, confidence)
+                prediction starts an assessment.
+        Returns:
+            dict: The calibrated margin, the escalation rate and the intent agreement on
+                the texts decided by the first stage.
+        """
+
+        probs = self.predict_proba(texts)
+        top_probs, top_classes = torch.topk(probs, k=2, dim=1)
+        candidates = []
+        for (first, second), predicted_class, reference in zip(top_probs.tolist(), top_classes[:, 0].tolist(), reference_predictions):
+            prediction = (self.labels[predicted_class], first)
+            candidates.append((first - second, triggers_assessment(*prediction) == triggers_assessment(*reference),
+                               prediction[0] == reference[0]))
+
+        # Walking from the most confident texts, the first stage can decide all of them
+        # until the first one that would change an assessment-trigger decision.
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        self.margin = candidates[-1][0] if candidates else 1.0
+        for margin, same_trigger, _ in candidates:
+            if not same_trigger:
+                self.margin = margin + 1e-6
+                break
+
+        decided = [candidate for candidate in candidates if candidate[0] >= self.margin]
+        agreeing = sum(1 for _, _, same_intent in decided if same_intent)
+
+        return {
+            "margin": self.margin,
+            "escalation_rate": 1 - len(decided) / len(candidates) if candidates else 1.0,
+            "first_stage_intent_agreement": agreeing / len(decided) if decided else 0.0
+        }
+
+    def save(self, path):
+        """
+        Saves the classifier (labels, buckets, margin and weights).
+
+        Args:
+            path (str): Path where the artifact is written.
+        """
+
+        torch.save({
+            "labels": self.labels,
+            "num_buckets": self.num_buckets,
+            "margin": self.margin,
+            "state_dict": self.state_dict()
+        }, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a classifier saved with save().
+
+        Args:
+            path (str): Path of the artifact.
+        Returns:
+            HashedNgramClassifier: The loaded classifier.
+        """
+
+        artifact = torch.load(path, map_location="cpu", weights_only=True) # Only tensors and plain values
+        classifier = cls(artifact["labels"], artifact["num_buckets"])
+        classifier.load_state_dict(artifact["state_dict"])
+        classifier.margin = artifact["margin"]
+        return classifier.eval()
+
+class IntentCascade:
+    """
+    Cascade front end of the intent classifier: the first stage decides the confident
+    messages and the rest are escalated to BERT. Keeps escalation and latency statistics.
+
+    Args:
+        first_stage (HashedNgramClassifier): The cheap first-stage classifier.
+        margin (float, optional): Overrides the calibrated margin of the first stage.
+
+    Attributes:
+        first_stage (HashedNgramClassifier): The cheap first-stage classifier.
+    """
+
+    def __init__(self, first_stage, margin=None):
+        self.first_stage = first_stage
+        if margin is not None:
+            self.first_stage.margin = margin
+
+        self._stats_lock = Lock()
+        self._first_stage_decisions = 0
+        self._escalations = 0
+        self._first_stage_time = 0.0
+        self._bert_time = 0.0
+
+    def predict(self, cleaned_text, bert_predict_fn):
+        """
+        Predicts the intent with the first stage, escalating to BERT when uncertain.
+
+        Args:
+            cleaned_text (str): The cleaned input text for the first stage.
+            bert_predict_fn (callable): Function running BERT and returning (intent, confidence).
+        Returns:
+            tuple: The predicted intent and its confidence.
+        """
+
+        start_time = time.perf_counter()
+        prediction = self.first_stage.predict(cleaned_text)
+        first_stage_time = time.perf_counter() - start_time
+
+        escalated = prediction is None
+        bert_time = 0.0
+        if escalated:
+            start_time = time.perf_counter()
+            prediction = bert_predict_fn()
+            bert_time = time.perf_counter() - start_time
+
+        with self._stats_lock:
+            self._first_stage_time += first_stage_time
+            if escalated:
+                self._escalations += 1
+                self._bert_time += bert_time
+            else:
+                self._first_stage_decisions += 1
+
+        return prediction
+
+    def get_stats(self):
+        """
+        Returns the escalation rate and per-stage latency of the cascade.
+
+        Returns:
+            dict: The cascade statistics.
+        """
+
+        with self._stats_lock:
+            total = self._first_stage_decisions + self._escalations
+            return {
+                "total_predictions": total,
+                "first_stage_decisions": self._first_stage_decisions,
+                "escalations": self._escalations,
+                "escalation_rate": self._escalations / total if total else 0.0,
+                "margin": self.first_stage.margin,
+                "first_stage_mean_ms": self._first_stage_time * 1000 / total if total else 0.0,
+                "bert_mean_ms": self._bert_time * 1000 / self._escalations if self._escalations else 0.0
+            }
+
+def main():
+    """Command training the first-stage classifier and calibrating its margin against BERT."""
+
+    parser = argparse.ArgumentParser(description="Train the first-stage (hashed n-gram) intent classifier.")
+    parser.add_argument("--train-set", required=True,
+                        help="Labelled dataset used to train MH_BERT (CSV statement/status or text/intent, or JSONL).")
+    parser.add_argument("--validation-split", type=float, default=0.2, help="Fraction held out to calibrate the margin.")
+    parser.add_argument("--validation-limit", type=int, default=2000, help="Maximum number of validation texts run through BERT.")
+    parser.add_argument("--epochs", type=int, default=5, help="Number of training epochs.")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the validation split and the training shuffling.")
+    parser.add_argument("--output-dir", default=None,
+                        help="Directory where the artifact is written (default: next to label_mapping.json).")
+    args = parser.parse_args()
+
+    from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
+    from kusibot.chatbot.intent_evaluation import load_evaluation_set, assessment_trigger
+
+    agent = IntentRecognizerAgent()
+    samples = [(agent._clean_text(text), intent) for text, intent in load_evaluation_set(args.train_set)
+               if intent in agent.label_mapping]
+    random.Random(args.seed).shuffle(samples)
+
+    split = int(len(samples) * (1 - args.validation_split))
+    train_samples, validation_samples = samples[:split], samples[split:][:args.validation_limit]
+
+    # Training
+    classifier = HashedNgramClassifier(sorted(agent.label_mapping, key=agent.label_mapping.get))
+    classifier.fit([text for text, _ in train_samples], [intent for _, intent in train_samples],
+                   epochs=args.epochs, seed=args.seed)
+
+    # Margin calibration against BERT decisions
+    validation_texts = [text for text, _ in validation_samples]
+    bert_predictions = []
+    for i in range(0, len(validation_texts), 32):
+        bert_predictions.extend(agent._predict_batch(validation_texts[i:i + 32]))
+
+    _, triggers_assessment = assessment_trigger()
+    calibration = classifier.calibrate_margin(validation_texts, bert_predictions, triggers_assessment)
+    print(f"Margin: {calibration['margin']:.4f} | escalation rate: {calibration['escalation_rate']:.2%} | "
+          f"first-stage intent agreement: {calibration['first_stage_intent_agreement']:.2%}")
+
+    output_dir = args.output_dir or agent.model_dir
+    os.makedirs(output_dir, exist_ok=True)
+    artifact_path = os.path.join(output_dir, CASCADE_ARTIFACT)
+    classifier.save(artifact_path)
+    print(f"Cascade artifact written to {artifact_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+import argparse, csv, json, os, statistics, time
+from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
+
+######################################################################
+# Offline accuracy vs. latency evaluation of the intent classifier.  #
+# A candidate configuration (backend, quantization, padding, max     #
+# length) is compared against the reference fp32 eager model.        #
+######################################################################
+
+# Settings of the reference model: the original fp32 eager path.
+REFERENCE_SETTINGS = {
+    "backend": "eager",
+    "quantization": "none",
+    "padding": "max_length"
+}
+
+# Candidate settings mapped to the environment variables read by IntentRecognizerAgent.
+SETTINGS_ENV = {
+    "backend": "INTENT_BACKEND",
+    "quantization": "INTENT_QUANTIZATION",
+    "padding": "INTENT_PADDING"
+}
+
+# Width of the band around the assessment threshold considered "near the threshold".
+THRESHOLD_BAND = 0.1
+
+def load_evaluation_set(path):
+    """
+    Loads a labelled evaluation set from a CSV file (columns text/intent or the
+    statement/status columns of the training dataset) or a JSONL file.
+
+    Args:
+        path (str): Path of the evaluation set.
+    Returns:
+        list: A list of (text, intent) tuples.
+    """
+
+    if path.endswith(".jsonl"):
+        with open(path, 'r', encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+
+    samples = []
+    for row in rows:
+        text = row.get("text", row.get("statement"))
+        intent = row.get("intent", row.get("status"))
+        if text and intent:
+            samples.append((text, intent))
+
+    return samples
+
+def export_evaluation_set_from_db(output_path, config_name="default"):
+    """
+    Exports the stored user messages with a detected intent as a JSONL evaluation set.
+    Note these intents were predicted by the model in production, so they measure
+    agreement with the deployed model rather than ground-truth accuracy.
+
+    Args:
+        output_path (str): Path of the JSONL file to write.
+        config_name (str, optional): The app configuration to connect to the database.
+    Returns:
+        int: The number of exported messages.
+    """
+
+    from app import create_app
+    from kusibot.database.db_repositories import MessageRepository
+
+    app = create_app(config_name)
+    with app.app_context():
+        messages = MessageRepository().get_user_messages_with_intent()
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for message in messages:
+            f.write(json.dumps({"text": message.text, "intent": message.intent}) + "\n")
+
+    return len(messages)
+
+def parse_settings(spec):
+    """
+    Parses a 'key=value,key=value' candidate specification.
+
+    Args:
+        spec (str): The candidate specification (backend, quantization, padding, max_length).
+    Returns:
+        dict: The candidate settings.
+    """
+
+    settings = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, value = item.partition("=")
+        if key not in SETTINGS_ENV and key != "max_length":
+            raise ValueError(f"Unknown candidate setting '{key}'")
+        settings[key] = value
+
+    return settings
+
+def build_agent(settings):
+    """
+    Builds an IntentRecognizerAgent with the given settings. The singleton is bypassed
+    on purpose so the reference and the candidate models can live side by side.
+
+    Args:
+        settings (dict): The agent settings (backend, quantization, padding, max_length).
+    Returns:
+        IntentRecognizerAgent: The configured agent.
+    """
+
+    env_overrides = {SETTINGS_ENV[key]: value for key, value in settings.items() if key in SETTINGS_ENV}
+    env_overrides["INTENT_BATCHING"] = "0"
+    env_overrides["INTENT_SERVER_SOCKET"] = "" # The models are evaluated in this process
+    if settings.get("quantization") == "dynamic":
+        env_overrides["INTENT_QUANTIZATION_MIN_AGREEMENT"] = "0" # This harness is the accuracy check
+
+    previous_env = {key: os.environ.get(key) for key in env_overrides}
+    os.environ.update(env_overrides)
+    try:
+        agent = IntentRecognizerAgent.__new__(IntentRecognizerAgent)
+        agent.__init__()
+    finally:
+        for key, value in previous_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    if "max_length" in settings:
+        agent.TEXT_MAX_LENGTH = int(settings["max_length"])
+
+    return agent
+
+def _percentile(values, percentile):
+    """Returns the given percentile (0-100) of the values using linear interpolation."""
+
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * percentile / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def run_predictions(agent, samples, batch_size=16):
+    """
+    Runs the evaluation set through the agent, one message at a time to measure
+    request latency and then in batches to measure throughput.
+
+    Args:
+        agent (IntentRecognizerAgent): The agent to evaluate.
+        samples (list): A list of (text, intent) tuples.
+        batch_size (int, optional): Batch size of the throughput run. Defaults to 16.
+    Returns:
+        tuple: The list of (intent, confidence) predictions and the latency statistics.
+    """
+
+    texts = [text for text, _ in samples]
+    if not texts:
+        return [], {"samples": 0, "p50_ms": 0.0, "p95_ms": 0.0, "mean_ms": 0.0,
+                    "throughput_single_msg_s": 0.0, "throughput_batched_msg_s": 0.0, "batch_size": batch_size}
+
+    agent._predict_batch(texts[:1]) # Warm-up run
+
+    predictions, latencies = [], []
+    for text in texts:
+        start_time = time.perf_counter()
+        predictions.append(agent._predict_batch([text])[0])
+        latencies.append((time.perf_counter() - start_time) * 1000)
+
+    start_time = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        agent._predict_batch(texts[i:i + batch_size])
+    batched_time = time.perf_counter() - start_time
+
+    latency = {
+        "samples": len(texts),
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "mean_ms": statistics.mean(latencies),
+        "throughput_single_msg_s": len(texts) / (sum(latencies) / 1000),
+        "throughput_batched_msg_s": len(texts) / batched_time,
+        "batch_size": batch_size
+    }
+
+    return [(intent, float(confidence)) for intent, confidence in predictions], latency
+
+def accuracy_report(samples, predictions):
+    """
+    Computes the overall and per-intent accuracy of the predictions.
+
+    Args:
+        samples (list): A list of (text, intent) tuples.
+        predictions (list): A list of (intent, confidence) tuples.
+    Returns:
+        dict: The overall accuracy and the accuracy (recall) of every labelled intent.
+    """
+
+    per_intent = {}
+    for (_, expected), (predicted, _) in zip(samples, predictions):
+        stats = per_intent.setdefault(expected, {"total": 0, "correct": 0})
+        stats["total"] += 1
+        stats["correct"] += int(predicted.lower() == expected.lower())
+
+    for stats in per_intent.values():
+        stats["accuracy"] = stats["correct"] / stats["total"]
+
+    correct = sum(stats["correct"] for stats in per_intent.values())
+    return {
+        "accuracy": correct / len(samples) if samples else 0.0,
+        "per_intent": dict(sorted(per_intent.items()))
+    }
+
+def comparison_report(reference, candidate, threshold, triggers_assessment):
+    """
+    Compares the candidate predictions against the reference ones, focusing on
+    the confidence shift around the assessment threshold.
+
+    Args:
+        reference (list): The reference (intent, confidence) predictions.
+        candidate (list): The candidate (intent, confidence) predictions.
+        threshold (float): The confidence threshold to start an assessment.
+        triggers_assessment (callable): Function returning whether an (intent, confidence)
+            prediction starts an assessment.
+    Returns:
+        dict: Agreement, confidence shifts and assessment decision flips.
+    """
+
+    agreement, trigger_flips, crossings = 0, 0, 0
+    shifts, near_threshold_shifts = [], []
+
+    for (ref_intent, ref_conf), (cand_intent, cand_conf) in zip(reference, candidate):
+        agreement += int(ref_intent == cand_intent)
+        shift = cand_conf - ref_conf
+        shifts.append(abs(shift))
+
+        if abs(ref_conf - threshold) <= THRESHOLD_BAND:
+            near_threshold_shifts.append(shift)
+        if (ref_conf >= threshold) != (cand_conf >= threshold):
+            crossings += 1
+        if triggers_assessment(ref_intent, ref_conf) != triggers_assessment(cand_intent, cand_conf):
+            trigger_flips += 1
+
+    total = len(reference)
+    return {
+        "agreement": agreement / total if total else 0.0,
+        "mean_abs_confidence_shift": statistics.mean(shifts) if shifts else 0.0,
+        "max_abs_confidence_shift": max(shifts) if shifts else 0.0,
+        "near_threshold_samples": len(near_threshold_shifts),
+        "near_threshold_mean_shift": statistics.mean(near_threshold_shifts) if near_threshold_shifts else 0.0,
+        "threshold_crossings": crossings,
+        "assessment_trigger_flips": trigger_flips
+    }
+
+def assessment_trigger():
+    """
+    Builds the decision used by the manager agent to start an assessment.
+
+    Returns:
+        tuple: The confidence threshold and a function returning whether an
+            (intent, confidence) prediction starts an assessment.
+    """
+
+    from kusibot.chatbot.manager_agent import ChatbotManagerAgent, should_start_assessment
+    from kusibot.chatbot.assesment_agent import AssesmentAgent
+
+    assesment_agent = AssesmentAgent()
+
+    def triggers_assessment(intent, confidence):
+        return should_start_assessment(intent, confidence, assesment_agent)
+
+    return ChatbotManagerAgent.CHATBOT_CONFIDENCE_ASSESMENT_THRESHOLD, triggers_assessment
+
+def evaluate(samples, candidate_settings=None, batch_size=16):
+    """
+    Evaluates the reference model and, optionally, a candidate configuration.
+
+    Args:
+        samples (list): A list of (text, intent) tuples.
+        candidate_settings (dict, optional): The candidate settings to compare.
+        batch_size (int, optional): Batch size of the throughput run. Defaults to 16.
+    Returns:
+        dict: The evaluation report.
+    """
+
+    threshold, triggers_assessment = assessment_trigger()
+
+    report = {
+        "samples": len(samples),
+        "threshold": threshold
+    }
+
+    reference_agent = build_agent(REFERENCE_SETTINGS)
+    reference_predictions, reference_latency = run_predictions(reference_agent, samples, batch_size)
+    report["reference"] = {
+        "settings": REFERENCE_SETTINGS,
+        **accuracy_report(samples, reference_predictions),
+        "latency": reference_latency
+    }
+    del reference_agent
+
+    if candidate_settings:
+        candidate_agent = build_agent(candidate_settings)
+        candidate_predictions, candidate_latency = run_predictions(candidate_agent, samples, batch_size)
+        report["candidate"] = {
+            "settings": candidate_settings,
+            **accuracy_report(samples, candidate_predictions),
+            "latency": candidate_latency,
+            "comparison": comparison_report(reference_predictions, candidate_predictions,
+                                            threshold, triggers_assessment),
+            "quantization": candidate_agent.quantization_report
+        }
+
+    return report
+
+def main():
+    """Command evaluating the intent classifier accuracy and latency on a labelled set."""
+
+    parser = argparse.ArgumentParser(description="Evaluate accuracy vs. latency of the intent classifier.")
+    parser.add_argument("--eval-set", help="Labelled evaluation set (CSV or JSONL).")
+    parser.add_argument("--candidate", default="",
+                        help="Candidate settings, e.g. 'backend=onnx,padding=longest,max_length=64' (quantization=dynamic needs the eager backend).")
+    parser.add_argument("--limit", type=int, default=None, help="Evaluate only the first N samples.")
+    parser.add_argument("--batch-size", type=int, default=16, help="Batch size of the throughput run.")
+    parser.add_argument("--output", default="intent_eval_report.json", help="Path of the JSON report.")
+    parser.add_argument("--export-from-db", metavar="JSONL",
+                        help="Export the stored user messages with intent as an evaluation set and exit.")
+    parser.add_argument("--config", default=os.getenv('FLASK_ENV', 'default'),
+                        help="App configuration used to connect to the database when exporting.")
+    args = parser.parse_args()
+
+    if args.export_from_db:
+        exported = export_evaluation_set_from_db(args.export_from_db, args.config)
+        print(f"{exported} messages exported to {args.export_from_db}")
+        return
+
+    if not args.eval_set:
+        parser.error("--eval-set is required")
+
+    samples = load_evaluation_set(args.eval_set)[:args.limit]
+    if not samples:
+        print(f"ERROR: No labelled samples in {args.eval_set}, the report has zero samples")
+    report = evaluate(samples, parse_settings(args.candidate), args.batch_size)
+    report["eval_set"] = args.eval_set
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"Evaluation report written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import argparse, io, os, time, torch
+from transformers import BertConfig, BertForSequenceClassification
+
+######################################################################
+# Dynamic int8 quantization of the BERT intent classifier.           #
+# The Linear layers are quantized to int8 (weights) at load time,    #
+# activations are quantized on the fly during inference.             #
+######################################################################
+
+QUANTIZED_ARTIFACT = "mh_bert.int8.pt"
+
+# Representative messages used to check that the quantized model agrees with the fp32 one.
+QUANTIZATION_CHECK_TEXTS = [
+    "Hello, how are you?",
+    "Hey kusibot, can you help me with something?",
+    "I'm feeling pretty excited today!",
+    "thanks, that was helpful",
+    "I think I have depression",
+    "I've been feeling really down and hopeless for weeks",
+    "Nothing I do seems to matter anymore and I can't get out of bed",
+    "I've been feeling anxious lately",
+    "I can't stop worrying about everything and my heart races all the time",
+    "I get panic attacks before going to work",
+    "I don't want to live anymore",
+    "Work has been so stressful that I can't sleep",
+    "My mood swings from extremely high to very low",
+]
+
+def quantize_model(model):
+    """
+    Quantizes the Linear layers of the model to int8 (dynamic quantization).
+
+    Args:
+        model (BertForSequenceClassification): The fp32 BERT model.
+    Returns:
+        BertForSequenceClassification: A quantized copy of the model.
+    """
+
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=False)
+
+def save_quantized_model(quantized_model, artifact_path):
+    """
+    Saves the quantized model as its configuration and its weights (packed int8 Linear
+    layers included), so loading it does not need to quantize the fp32 model again.
+
+    Args:
+        quantized_model (BertForSequenceClassification): The quantized BERT model.
+        artifact_path (str): Path where the artifact is written.
+    """
+
+    torch.save({"config": quantized_model.config.to_dict(), "state_dict": quantized_model.state_dict()}, artifact_path)
+
+def load_quantized_model(artifact_path):
+    """
+    Loads a pre-quantized artifact saved with save_quantized_model. Only tensors and plain
+    values are unpickled (weights_only): the model is rebuilt from its configuration, with
+    empty int8 Linear layers the stored weights are loaded into.
+
+    Args:
+        artifact_path (str): Path of the pre-quantized artifact.
+    Returns:
+        BertForSequenceClassification: The quantized model with the stored weights.
+    """
+
+    artifact = torch.load(artifact_path, map_location="cpu", weights_only=True)
+    quantized_model = BertForSequenceClassification(BertConfig.from_dict(artifact["config"]))
+    for module in list(quantized_model.modules()):
+        for name, child in list(module.named_children()):
+            if type(child) is torch.nn.Linear:
+                setattr(module, name, torch.ao.nn.quantized.dynamic.Linear(child.in_features, child.out_features,
+                                                                           bias_=child.bias is not None, dtype=torch.qint8))
+
+    quantized_model.load_state_dict(artifact["state_dict"])
+    return quantized_model.eval()
+
+def model_size_bytes(model):
+    """
+    Computes the serialized size of the model weights.
+
+    Args:
+        model (torch.nn.Module): The model to measure.
+    Returns:
+        int: The size of the model weights in bytes.
+    """
+
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
+
+def measure_latency_ms(model, input_ids, attention_mask, runs=5):
+    """
+    Measures the mean latency of a forward pass of the model.
+
+    Args:
+        model (torch.nn.Module): The model to measure.
+        input_ids: The input IDs tensor.
+        attention_mask: The attention mask tensor.
+        runs (int, optional): Number of timed forward passes. Defaults to 5.
+    Returns:
+        float: The mean latency in milliseconds.
+    """
+
+    with torch.no_grad():
+        model(input_ids=input_ids, attention_mask=attention_mask) # Warm-up run
+        start_time = time.perf_counter()
+        for _ in range(runs):
+            model(input_ids=input_ids, attention_mask=attention_mask)
+        end_time = time.perf_counter()
+
+    return (end_time - start_time) * 1000 / runs
+
+def compare_models(reference_model, candidate_model, input_ids, attention_mask):
+    """
+    Compares the predictions of a candidate model against the reference one.
+
+    Args:
+        reference_model (torch.nn.Module): The reference (fp32) model.
+        candidate_model (torch.nn.Module): The model to check (e.g. quantized).
+        input_ids: The input IDs tensor.
+        attention_mask: The attention mask tensor.
+    Returns:
+        dict: The agreement ratio of the predicted classes and the maximum
+            absolute difference between the class probabilities.
+    """
+
+    with torch.no_grad():
+        reference_probs = torch.softmax(reference_model(input_ids=input_ids, attention_mask=attention_mask).logits, dim=1)
+        candidate_probs = torch.softmax(candidate_model(input_ids=input_ids, attention_mask=attention_mask).logits, dim=1)
+
+    agreement = (reference_probs.argmax(dim=1) == candidate_probs.argmax(dim=1)).float().mean().item()
+    max_prob_diff = (reference_probs - candidate_probs).abs().max().item()
+
+    return {
+        "agreement": agreement,
+        "max_prob_diff": max_prob_diff
+    }
+
+def main():
+    """One-shot command saving the pre-quantized intent model next to its label mapping."""
+
+    parser = argparse.ArgumentParser(description="Quantize the BERT intent model (dynamic int8) and save it.")
+    parser.add_argument("--output-dir", default=None,
+                        help="Directory where the artifact is written (default: next to label_mapping.json).")
+    args = parser.parse_args()
+
+    # The fp32 model is quantized, so the agent is built in eager mode without quantization, in this process
+    os.environ.update({"INTENT_BACKEND": "eager", "INTENT_QUANTIZATION": "none", "INTENT_SERVER_SOCKET": ""})
+    from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
+    agent = IntentRecognizerAgent()
+    output_dir = args.output_dir or agent.model_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    artifact_path = os.path.join(output_dir, QUANTIZED_ARTIFACT)
+    save_quantized_model(quantize_model(agent.model), artifact_path)
+    print(f"Quantized artifact written to {artifact_path}")
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,22 @@
-import re, string, torch,json
-from transformers import BertTokenizer, BertForSequenceClassification
+import re, string, time, torch,json, os
+from collections import Counter
+from transformers import BertTokenizerFast, BertForSequenceClassification
 from threading import Lock
+from kusibot.chatbot.intent_batcher import IntentMicroBatcher
+from kusibot.chatbot.intent_backends import create_backend, EagerBackend
+from kusibot.chatbot.intent_bundle import load_bundle
+from kusibot.chatbot.intent_cascade import CASCADE_ARTIFACT, HashedNgramClassifier, IntentCascade
+from kusibot.chatbot.intent_cache import IntentPredictionCache
+from kusibot.chatbot.intent_server import IntentServerClient
+from kusibot.chatbot.intent_quantization import (
+    QUANTIZED_ARTIFACT,
+    QUANTIZATION_CHECK_TEXTS,
+    quantize_model,
+    load_quantized_model,
+    model_size_bytes,
+    measure_latency_ms,
+    compare_models
+)
 
 # https://refactoring.guru/es/design-patterns/singleton/python/example#example-1
 class IntentRecognizerSingletonMeta(type):
@@ -31,32 +47,170 @@ class IntentRecognizerAgent(metaclass=IntentRecognizerSingletonMeta):
     Attributes:
         device (torch.device): The computing device (CPU or CUDA GPU) on which
             the model is running.
-        tokenizer (BertTokenizer): The tokenizer for preprocessing text to match
-            the BERT model's input format.
+        tokenizer (BertTokenizerFast): The (Rust-backed) tokenizer for preprocessing
+            text to match the BERT model's input format.
         model (BertForSequenceClassification): The fine-tuned BERT model loaded
-            from the Hugging Face Hub.
+            from the Hugging Face Hub or the local bundle (INTENT_MODEL_BUNDLE).
         label_mapping (dict): A dictionary mapping intent labels to their
             corresponding numerical class indices.
         reverse_label_mapping (dict): A dictionary mapping numerical class
             indices back to their intent labels.
+        model_dir (str): Directory of the label mapping (or the bundle), where
+            the exported backend artifacts are stored.
+        backend (EagerBackend | CompiledBackend | OnnxBackend): The inference
+            backend running the forward pass (INTENT_BACKEND).
+        batcher (IntentMicroBatcher | None): Micro-batching front end grouping
+            concurrent predictions into a single forward pass. Is None if
+            batching is disabled (INTENT_BATCHING=0).
+        padding (str): Padding strategy of the batches, either 'longest' (pad only
+            to the longest sequence of each length bucket) or 'max_length' (pad
+            every sequence to TEXT_MAX_LENGTH).
+        quantization_report (dict | None): Accuracy, size and latency comparison
+            of the int8 and fp32 models. Is None if quantization is disabled
+            (INTENT_QUANTIZATION).
+        cascade (IntentCascade | None): Cheap first-stage classifier deciding the
+            confident messages before BERT. Is None if the cascade is disabled
+            (INTENT_CASCADE=0) or its artifact is missing.
+        cache (IntentPredictionCache | None): LRU cache of predictions keyed on
+            the cleaned text (opt-in, INTENT_CACHE_SIZE). Is None if disabled.
+            It is cleared whenever the model, backend or cascade is replaced.
+        client (IntentServerClient | None): Client of the out-of-process intent
+            service (INTENT_SERVER_SOCKET). If set, the model, tokenizer and
+            backend are only loaded in this process as a fallback.
     """
 
     BERT_TOKENIZER = "bert-base-uncased"
     CUSTOM_BERT_REPO = "didierrc/MH_BERT"
     TEXT_MAX_LENGTH = 128
+    BATCH_MAX_SIZE = 16
+    BATCH_MAX_WAIT_MS = 5
+    LENGTH_BUCKETS = (16, 32, 64, TEXT_MAX_LENGTH)
+    QUANTIZATION_MIN_AGREEMENT = 1.0
+    CACHE_SIZE = 0
+    SERVER_TIMEOUT_MS = 2000
+
+    _model_version = 0 # Bumped whenever the model, backend or cascade is assigned (see _model_fingerprint)
 
     def __init__(self):
 
         # Whether to use GPU or CPU
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         
-        # Load the trained BERT model and tokenizer
-        self.tokenizer = BertTokenizer.from_pretrained(self.BERT_TOKENIZER)
-        self.model = BertForSequenceClassification.from_pretrained(self.CUSTOM_BERT_REPO)
+        # Padding strategy: 'dynamic' pads each length bucket to its longest sequence
+        self.padding = "max_length" if os.getenv("INTENT_PADDING", "dynamic") == "max_length" else "longest"
+
+        # Histogram of real token lengths and padded/attention costs
+        self._token_stats_lock = Lock()
+        self._token_length_histogram = Counter()
+        self._padded_tokens = 0
+        self._attention_cost = 0
+
+        self.quantization_report = None
+        self.batcher = None
+        self.cascade = None
+
+        # LRU cache of predictions keyed on the cleaned text (opt-in)
+        cache_size = int(os.getenv("INTENT_CACHE_SIZE", self.CACHE_SIZE))
+        self.cache = IntentPredictionCache(cache_size) if cache_size > 0 else None
+
+        # Out-of-process intent service (opt-in): the local model is only loaded as a fallback
+        self.client = None
+        self._local_model_lock = Lock()
+        self._local_model_loaded = False
+        self._fallbacks = 0
+        socket_path = os.getenv("INTENT_SERVER_SOCKET")
+        if socket_path:
+            self.client = IntentServerClient(socket_path, float(os.getenv("INTENT_SERVER_TIMEOUT_MS", self.SERVER_TIMEOUT_MS)))
+        else:
+            self._load_local_model()
+
+    @property
+    def model(self):
+        """The BERT model (fp32 or quantized)."""
+        return self._model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+        self._model_version += 1
+
+    @property
+    def backend(self):
+        """The inference backend running the forward pass."""
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        self._backend = backend
+        self._model_version += 1
+
+    @property
+    def cascade(self):
+        """The first-stage classifier of the cascade (None if disabled)."""
+        return self._cascade
+
+    @cascade.setter
+    def cascade(self, cascade):
+        self._cascade = cascade
+        self._model_version += 1
+
+    def _load_local_model(self):
+        """
+        Loads the BERT model in this process with its inference options
+        (quantization, backend, batching and cascade).
+        """
+
+        # Load the trained BERT model, tokenizer and label mapping,
+        # strictly from the local bundle if configured (no network access)
+        start_time = time.perf_counter()
+        bundle_dir = os.getenv("INTENT_MODEL_BUNDLE")
+        if bundle_dir:
+            self._load_from_bundle(bundle_dir)
+        else:
+            self._load_from_hub()
         self.model.to(self.device)
         self.model.eval() # Set the model to evaluation mode as we are not training it
+        print(f"Intent model loaded from {bundle_dir or 'the Hugging Face Hub'} in {time.perf_counter() - start_time:.2f} s")
 
         # Creating reverse mapping to get the intent from the class index
+        self.reverse_label_mapping = {class_index: intent for intent, class_index in self.label_mapping.items()}
+
+        # Dynamic int8 quantization (opt-in), only kept if it agrees with the fp32 model.
+        # The compiled and onnx artifacts are exported from the fp32 model, so it only applies to eager.
+        backend_name = os.getenv("INTENT_BACKEND", "eager")
+        if os.getenv("INTENT_QUANTIZATION", "none") == "dynamic":
+            if backend_name == EagerBackend.NAME:
+                self._apply_quantization()
+            else:
+                print(f"ERROR: INTENT_QUANTIZATION is only supported with the eager backend, "
+                      f"not quantizing for the '{backend_name}' backend")
+
+        # Inference backend (eager, compiled or onnx), artifacts are stored next to the label mapping
+        self.backend = create_backend(backend_name, self.model, self.model_dir, self.device)
+
+        # Micro-batching of concurrent requests (opt-in)
+        if os.getenv("INTENT_BATCHING", "0") == "1":
+            self.batcher = IntentMicroBatcher(
+                self._predict_batch,
+                max_batch_size=int(os.getenv("INTENT_BATCH_MAX_SIZE", self.BATCH_MAX_SIZE)),
+                max_wait_ms=float(os.getenv("INTENT_BATCH_MAX_WAIT_MS", self.BATCH_MAX_WAIT_MS))
+            )
+
+        # Cascade classification (opt-in): cheap first stage, BERT only when uncertain
+        if os.getenv("INTENT_CASCADE", "0") == "1":
+            self._load_cascade()
+
+        self._local_model_loaded = True
+
+    def _load_from_hub(self):
+        """
+        Loads the tokenizer, the model and the label mapping from the Hugging Face Hub (or its cache).
+        Backend artifacts are stored next to the downloaded label mapping.
+        """
+
+        self.tokenizer = BertTokenizerFast.from_pretrained(self.BERT_TOKENIZER)
+        self.model = BertForSequenceClassification.from_pretrained(self.CUSTOM_BERT_REPO)
+
         # Try to load label mapping from the Hugging Face repo
         try:
             from huggingface_hub import hf_hub_download
@@ -68,9 +222,89 @@ class IntentRecognizerAgent(metaclass=IntentRecognizerSingletonMeta):
                 self.label_mapping = json.load(f)
         except Exception as e:
             print(f"Error loading label mapping: {e}")
-            raise e            
+            raise e
 
-        self.reverse_label_mapping = {class_index: intent for intent, class_index in self.label_mapping.items()}
+        self.model_dir = os.path.dirname(label_mapping_path)
+
+    def _load_from_bundle(self, bundle_dir):
+        """
+        Loads the tokenizer, the model and the label mapping strictly from the local bundle
+        built with kusibot-build-intent-bundle. There is no fallback to the Hub, so a missing
+        or incomplete bundle fails fast. Backend artifacts are stored inside the bundle.
+
+        Args:
+            bundle_dir (str): Directory of the bundle (INTENT_MODEL_BUNDLE).
+        """
+
+        try:
+            self.tokenizer, self.model, self.label_mapping = load_bundle(bundle_dir)
+        except Exception as e:
+            print(f"ERROR: Failed to load the intent model bundle {bundle_dir} - {e}")
+            raise e
+
+        self.model_dir = bundle_dir
+
+    def _load_cascade(self):
+        """
+        Loads the first-stage classifier trained with kusibot-train-cascade from the model directory.
+        The calibrated margin can be overridden with INTENT_CASCADE_MARGIN.
+        """
+
+        artifact_path = os.path.join(self.model_dir, CASCADE_ARTIFACT)
+        if not os.path.exists(artifact_path):
+            print(f"ERROR: Cascade artifact not found at {artifact_path}, using BERT only")
+            return
+
+        margin = os.getenv("INTENT_CASCADE_MARGIN")
+        try:
+            self.cascade = IntentCascade(HashedNgramClassifier.load(artifact_path),
+                                         margin=float(margin) if margin else None)
+        except Exception as e:
+            print(f"ERROR: Failed to load the cascade classifier, using BERT only - {e}")
+
+    def _apply_quantization(self):
+        """
+        Replaces the fp32 model by its dynamic int8 quantized version (loading the pre-quantized
+        artifact if it exists). The quantized model is only used if its predictions agree with the
+        fp32 model on the check messages. Model size and latency of both are reported.
+        """
+
+        if self.device.type != "cpu":
+            print("ERROR: Dynamic quantization is only supported on CPU, using the fp32 intent model")
+            return
+
+        artifact_path = os.path.join(self.model_dir, QUANTIZED_ARTIFACT)
+        try:
+            if os.path.exists(artifact_path):
+                quantized_model = load_quantized_model(artifact_path)
+            else:
+                quantized_model = quantize_model(self.model)
+        except Exception as e:
+            print(f"ERROR: Failed to quantize the intent model, using the fp32 model - {e}")
+            return
+
+        # Accuracy check and size/latency report
+        input_ids, attention_mask = self._get_input_tensors_from_texts(QUANTIZATION_CHECK_TEXTS)
+        self.quantization_report = {
+            **compare_models(self.model, quantized_model, input_ids, attention_mask),
+            "fp32_size_mb": model_size_bytes(self.model) / 1e6,
+            "int8_size_mb": model_size_bytes(quantized_model) / 1e6,
+            "fp32_latency_ms": measure_latency_ms(self.model, input_ids, attention_mask),
+            "int8_latency_ms": measure_latency_ms(quantized_model, input_ids, attention_mask),
+            "applied": False
+        }
+        report = self.quantization_report
+        print(f"Intent model fp32: {report['fp32_size_mb']:.1f} MB, {report['fp32_latency_ms']:.1f} ms | "
+              f"int8: {report['int8_size_mb']:.1f} MB, {report['int8_latency_ms']:.1f} ms | "
+              f"agreement: {report['agreement']:.2%}, max prob diff: {report['max_prob_diff']:.4f}")
+
+        min_agreement = float(os.getenv("INTENT_QUANTIZATION_MIN_AGREEMENT", self.QUANTIZATION_MIN_AGREEMENT))
+        if report["agreement"] < min_agreement:
+            print(f"ERROR: Quantized intent model agreement below {min_agreement:.2%}, using the fp32 model")
+            return
+
+        self.model = quantized_model
+        report["applied"] = True
 
     def _clean_text(self, text):
         """
@@ -96,26 +330,40 @@ class IntentRecognizerAgent(metaclass=IntentRecognizerSingletonMeta):
             return text
         return ""
     
-    def _get_input_tensors_from_text(self, text):
+    def _get_input_tensors_from_text(self, text, padding=None):
         """
         Converts the input text into tensors suitable for the BERT model.
         
         Args:
             text: The input text to be tokenized.
+            padding: The padding strategy to use ('longest' or 'max_length'). Defaults to the agent's one.
         Returns:
             tuple: A tuple containing the input IDs and attention mask tensors.
         """
 
-        # Clean the text
-        text = self._clean_text(text)
+        return self._get_input_tensors_from_texts([text], padding)
+
+    def _get_input_tensors_from_texts(self, texts, padding=None):
+        """
+        Converts a batch of input texts into tensors suitable for the BERT model.
+        
+        Args:
+            texts: The list of input texts to be tokenized.
+            padding: The padding strategy to use ('longest' or 'max_length'). Defaults to the agent's one.
+        Returns:
+            tuple: A tuple containing the input IDs and attention mask tensors (one row per text).
+        """
+
+        # Clean the texts
+        texts = [self._clean_text(text) for text in texts]
 
-        # Tokenize text
-        encoding = self.tokenizer.encode_plus(
-            text,
+        # Tokenize and pad texts (truncating to the maximum length supported)
+        encoding = self.tokenizer(
+            texts,
             add_special_tokens=True,
             max_length=self.TEXT_MAX_LENGTH,
+            padding=padding or self.padding,
             return_token_type_ids=False,
-            padding='max_length',
             truncation=True,
             return_attention_mask=True,
             return_tensors='pt'
@@ -123,36 +371,330 @@ class IntentRecognizerAgent(metaclass=IntentRecognizerSingletonMeta):
 
         return encoding['input_ids'].to(self.device), encoding['attention_mask'].to(self.device)
 
+    def _bucket_by_length(self, lengths):
+        """
+        Groups sequences by length so that short messages are not padded to long ones.
+        
+        Args:
+            lengths: The token length of every sequence.
+        Returns:
+            list: A list of buckets, each one a list of indices of the given sequences.
+        """
+
+        buckets = {}
+        for index, length in enumerate(lengths):
+            bound = next((bound for bound in self.LENGTH_BUCKETS if length <= bound), self.LENGTH_BUCKETS[-1])
+            buckets.setdefault(bound, []).append(index)
+
+        return [buckets[bound] for bound in sorted(buckets)]
+
+    def _forward(self, input_ids, attention_mask):
+        """
+        Runs the BERT model through the configured backend and returns the class probabilities.
+        
+        Args:
+            input_ids: The input IDs tensor.
+            attention_mask: The attention mask tensor.
+        Returns:
+            torch.Tensor: The class probabilities (one row per sequence).
+        """
+
+        logits = self.backend(input_ids, attention_mask)
+        return torch.nn.functional.softmax(logits, dim=1)
+
+    def _predict_batch(self, texts):
+        """
+        Predicts the intent of a batch of texts. With dynamic padding, the texts are
+        bucketed by token length and each bucket runs a single forward pass.
+        
+        Args:
+            texts: The list of input texts for which the intents need to be predicted.
+        Returns:
+            list: A list of (intent, confidence) tuples in the same order as the input texts.
+        """
+
+        batch_input_ids, batch_attention_mask = self._get_input_tensors_from_texts(texts)
+        lengths = batch_attention_mask.sum(dim=1).tolist()
+
+        if self.padding == "max_length":
+            buckets = [list(range(len(texts)))]
+        else:
+            buckets = self._bucket_by_length(lengths)
+
+        results = [None] * len(texts)
+        for bucket in buckets:
+            
+            # Get input tensors of the bucket: its rows, padded (on the right) to its longest sequence only
+            padded_length = batch_input_ids.shape[1] if self.padding == "max_length" else max(lengths[i] for i in bucket)
+            input_ids = batch_input_ids[bucket, :padded_length]
+            attention_mask = batch_attention_mask[bucket, :padded_length]
+            self._record_token_lengths([lengths[i] for i in bucket], padded_length)
+            
+            # Get the predicted index class
+            probs = self._forward(input_ids, attention_mask)
+            confidences, predicted_classes = torch.max(probs, dim=1)
+            
+            # Convert to numpy for easier handling
+            predicted_classes = predicted_classes.cpu().numpy()
+            confidences = confidences.cpu().numpy()
+
+            # Get the intent labels
+            for index, predicted_class, confidence in zip(bucket, predicted_classes, confidences):
+                results[index] = (self.reverse_label_mapping[predicted_class], confidence)
+
+        return results
+
+    def _record_token_lengths(self, lengths, padded_length):
+        """
+        Records the real token lengths of a batch and the cost of its padded forward pass.
+        
+        Args:
+            lengths: The real token length of every sequence in the batch.
+            padded_length: The length every sequence was padded to.
+        """
+
+        with self._token_stats_lock:
+            self._token_length_histogram.update(lengths)
+            self._padded_tokens += padded_length * len(lengths)
+            self._attention_cost += padded_length ** 2 * len(lengths)
+
+    def get_token_length_stats(self):
+        """
+        Returns the histogram of real token lengths and the savings of the padding
+        strategy compared to padding every message to TEXT_MAX_LENGTH.
+        
+        Returns:
+            dict: The token length statistics.
+        """
+
+        with self._token_stats_lock:
+            total_texts = sum(self._token_length_histogram.values())
+            real_tokens = sum(length * count for length, count in self._token_length_histogram.items())
+            max_length_tokens = total_texts * self.TEXT_MAX_LENGTH
+            max_length_attention = total_texts * self.TEXT_MAX_LENGTH ** 2
+
+            return {
+                "padding": self.padding,
+                "total_texts": total_texts,
+                "histogram": dict(sorted(self._token_length_histogram.items())),
+                "real_tokens": real_tokens,
+                "padded_tokens": self._padded_tokens,
+                "max_length_tokens": max_length_tokens,
+                "token_savings": (1 - self._padded_tokens / max_length_tokens) if total_texts else 0.0,
+                "attention_savings": (1 - self._attention_cost / max_length_attention) if total_texts else 0.0
+            }
+
+    def compare_padding_strategies(self, texts):
+        """
+        Verifies that dynamic padding predicts the same as the fixed 'max_length' padding.
+        
+        Args:
+            texts: The list of texts to compare the predictions on.
+        Returns:
+            dict: Number of texts, number of matching intents, the texts with a different
+                intent and the maximum absolute difference between class probabilities.
+        """
+
+        matching, mismatches, max_prob_diff = 0, [], 0.0
+        for text in texts:
+            probs_dynamic = self._forward(*self._get_input_tensors_from_text(text, padding="longest"))
+            probs_fixed = self._forward(*self._get_input_tensors_from_text(text, padding="max_length"))
+
+            max_prob_diff = max(max_prob_diff, (probs_dynamic - probs_fixed).abs().max().item())
+            if torch.argmax(probs_dynamic, dim=1).item() == torch.argmax(probs_fixed, dim=1).item():
+                matching += 1
+            else:
+                mismatches.append(text)
+
+        return {
+            "total": len(texts),
+            "matching": matching,
+            "mismatches": mismatches,
+            "max_prob_diff": max_prob_diff
+        }
+
     def predict_intent(self, text):
         """
         Predicts the intent of the input text using the BERT model.
+        Repeated messages are answered from the cache without running any model.
+        If the cascade is enabled, confident messages are decided by its first stage.
+        If batching is enabled, the text is grouped with other concurrent requests.
+        If the intent service is configured, the model runs there (locally as a fallback).
         
         Args:
             text: The input text for which the intent needs to be predicted.
-            return_confidence: If True, returns the confidence of the prediction.
             
         Returns:
             str: The predicted intent label.
-            float: The confidence of the prediction (if return_confidence is True).
+            float: The confidence of the prediction.
         """
 
-        # Get input tensors
-        input_ids, attention_mask = self._get_input_tensors_from_text(text)
+        cleaned_text = self._clean_text(text)
+
+        if self.cache:
+            self.cache.validate(self._model_fingerprint())
+            prediction = self.cache.get(cleaned_text)
+            if prediction is not None:
+                return prediction
+
+        if self.client:
+            prediction = self._predict_remote(text, cleaned_text)
+        else:
+            prediction = self._predict_local(text, cleaned_text)
+
+        if self.cache:
+            self.cache.put(cleaned_text, prediction)
+
+        return prediction
 
-        # Get prediction
+    def _predict_local(self, text, cleaned_text):
+        """
+        Predicts the intent in this process, with the cascade first stage if enabled.
+
+        Args:
+            text: The input text for which the intent needs to be predicted.
+            cleaned_text: The cleaned input text.
+        Returns:
+            tuple: The predicted intent label and its confidence.
+        """
+
+        if self.cascade:
+            return self.cascade.predict(cleaned_text, lambda: self._predict_with_bert(text))
+
+        return self._predict_with_bert(text)
+
+    def _predict_remote(self, text, cleaned_text):
+        """
+        Predicts the intent on the intent service. If the service cannot be reached, times
+        out or fails, the prediction falls back to a local model (loaded on first use).
+
+        Args:
+            text: The input text for which the intent needs to be predicted.
+            cleaned_text: The cleaned input text.
+        Returns:
+            tuple: The predicted intent label and its confidence.
+        """
+
+        try:
+            return self.client.predict(text)
+        except OSError as e:
+            print(f"ERROR: Intent service unavailable, predicting locally - {e}")
+
+        with self._local_model_lock:
+            self._fallbacks += 1
+            if not self._local_model_loaded:
+                self._load_local_model()
+
+        return self._predict_local(text, cleaned_text)
+
+    def _model_fingerprint(self):
+        """
+        Describes the current model configuration, so cached predictions are dropped
+        whenever the model, backend, cascade or tokenization settings change.
+        
+        Returns:
+            tuple: The model configuration fingerprint.
+        """
+
+        if self.client:
+            return (self.client.socket_path, self.padding, self.TEXT_MAX_LENGTH)
+
+        return (self._model_version, self.padding, self.TEXT_MAX_LENGTH)
+
+    def _predict_with_bert(self, text):
+        """
+        Predicts the intent of the input text with BERT (through the batcher if enabled).
+        
+        Args:
+            text: The input text for which the intent needs to be predicted.
+        Returns:
+            tuple: The predicted intent label and its confidence.
+        """
+
+        if self.batcher:
+            return self.batcher.predict(text)
+
+        return self._predict_batch([text])[0]
+
+    def warm_up(self):
+        """
+        Runs dummy predictions at every length bucket (and at the full batch size if batching
+        is enabled), so the lazy initialisation of the torch kernels for those shapes happens
+        now and not in the first requests. The prediction cache is not used.
+        With the intent service, a single prediction warms the connection up instead.
+        """
+
+        if not self._local_model_loaded:
+            self._predict_remote("Hello", "hello")
+            return
+
+        batch_sizes = (1, self.batcher.max_batch_size) if self.batcher else (1,)
+        for length in self.LENGTH_BUCKETS:
+            text = " ".join(["hello"] * (length - 2)) # [CLS] and [SEP] complete the length
+            for batch_size in batch_sizes:
+                self._predict_batch([text] * batch_size)
+
+    def embed_text(self, text):
+        """
+        Returns the sentence embedding of the input text: the pooled output of the BERT
+        encoder of the intent model, L2-normalized (the dot product of two embeddings is
+        their cosine similarity).
+
+        Args:
+            text: The input text to be embedded.
+        Returns:
+            torch.Tensor: The embedding, or None if the model is not loaded in this process
+                (intent service).
+        """
+
+        if not self._local_model_loaded:
+            return None
+
+        input_ids, attention_mask = self._get_input_tensors_from_text(text)
         with torch.no_grad():
-            outputs = self.model(input_ids=input_ids, attention_mask=attention_mask)
+            pooled_output = self.model.bert(input_ids=input_ids, attention_mask=attention_mask).pooler_output[0]
+
+        return torch.nn.functional.normalize(pooled_output.float(), dim=0).cpu()
+
+    def get_batching_stats(self):
+        """
+        Returns the queue depth and batch-size statistics of the micro-batcher.
         
-        # Get the predicted index class
-        logits = outputs.logits
-        probs = torch.nn.functional.softmax(logits, dim=1)
-        confidence, predicted_class = torch.max(probs, dim=1)
+        Returns:
+            dict: The batching statistics, or None if batching is disabled.
+        """
+
+        return self.batcher.get_stats() if self.batcher else None
+
+    def get_cascade_stats(self):
+        """
+        Returns the escalation rate and per-stage latency of the cascade.
         
-        # Convert to numpy for easier handling
-        predicted_class = predicted_class.cpu().numpy()[0]
-        confidence = confidence.cpu().numpy()[0]
+        Returns:
+            dict: The cascade statistics, or None if the cascade is disabled.
+        """
+
+        return self.cascade.get_stats() if self.cascade else None
+
+    def get_cache_stats(self):
+        """
+        Returns the size and hit/miss counters of the prediction cache.
         
-        # Get the intent label
-        intent = self.reverse_label_mapping[predicted_class]
+        Returns:
+            dict: The cache statistics, or None if the cache is disabled.
+        """
+
+        return self.cache.get_stats() if self.cache else None
+
+    def get_server_stats(self):
+        """
+        Returns the request, failure and fallback counters of the intent service client.
         
-        return intent, confidence
+        Returns:
+            dict: The client statistics, or None if the intent service is not used.
+        """
+
+        if not self.client:
+            return None
+
+        return {**self.client.get_stats(), "local_fallbacks": self._fallbacks}
@@ -0,0 +1,311 @@
+import argparse, itertools, multiprocessing, os, signal, socket, struct, threading, time
+
+######################################################################
+# Out-of-process intent inference service.                           #
+# A small pool of processes, each owning a model, accepts requests   #
+# on a UNIX socket with a compact binary protocol. Concurrent        #
+# requests of a process are batched by its IntentMicroBatcher.       #
+######################################################################
+
+# Request frame: request id, text length (bytes) + UTF-8 text.
+REQUEST_HEADER = struct.Struct("!II")
+# Response frame: request id, status, confidence, intent length (bytes) + UTF-8 intent.
+RESPONSE_HEADER = struct.Struct("!IBfH")
+STATUS_OK = 0
+STATUS_ERROR = 1
+MAX_TEXT_BYTES = 64 * 1024
+
+def _recv_exact(conn, size):
+    """
+    Reads exactly size bytes from a socket.
+
+    Args:
+        conn (socket.socket): The connected socket.
+        size (int): Number of bytes to read.
+    Returns:
+        bytes: The received bytes.
+    Raises:
+        ConnectionError: If the peer closes the connection before.
+    """
+
+    data = bytearray()
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed by the peer")
+        data.extend(chunk)
+
+    return bytes(data)
+
+def encode_request(request_id, text):
+    """Builds the request frame of a text."""
+
+    payload = text.encode('utf-8')
+    return REQUEST_HEADER.pack(request_id, len(payload)) + payload
+
+def encode_response(request_id, status, intent="", confidence=0.0):
+    """Builds the response frame of a prediction."""
+
+    payload = intent.encode('utf-8')
+    return RESPONSE_HEADER.pack(request_id, status, confidence, len(payload)) + payload
+
+class IntentServerClient:
+    """
+    Client of the intent inference service. Every thread keeps its own persistent
+    connection, which is dropped on any error or timeout (and after a fork).
+
+    Args:
+        socket_path (str): Path of the UNIX socket of the service.
+        timeout_ms (float): Maximum time to connect and get a prediction.
+
+    Attributes:
+        socket_path (str): Path of the UNIX socket of the service.
+        timeout (float): Maximum time (in seconds) to connect and get a prediction.
+    """
+
+    def __init__(self, socket_path, timeout_ms):
+        self.socket_path = socket_path
+        self.timeout = timeout_ms / 1000
+
+        self._local = threading.local()
+        self._request_ids = itertools.count(1)
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._failures = 0
+        self._total_time = 0.0
+
+    def _connection(self):
+        """Returns the connection of the current thread, connecting if needed."""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            try:
+                conn.connect(self.socket_path)
+            except OSError:
+                conn.close()
+                raise
+            self._local.conn, self._local.pid = conn, os.getpid()
+
+        return conn
+
+    def _close(self):
+        """Drops the connection of the current thread (a late response must not be read by the next request)."""
+
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def predict(self, text):
+        """
+        Predicts the intent of a text on the service.
+
+        Args:
+            text (str): The input text.
+        Returns:
+            tuple: The predicted intent and its confidence.
+        Raises:
+            OSError: If the service cannot be reached, times out or fails.
+        """
+
+        start_time = time.perf_counter()
+        request_id = next(self._request_ids) & 0xFFFFFFFF
+        try:
+            conn = self._connection()
+            conn.sendall(encode_request(request_id, text))
+            response_id, status, confidence, intent_length = RESPONSE_HEADER.unpack(_recv_exact(conn, RESPONSE_HEADER.size))
+            intent = _recv_exact(conn, intent_length).decode('utf-8')
+            if response_id != request_id:
+                raise ConnectionError(f"Unexpected response {response_id} to request {request_id}")
+            if status != STATUS_OK:
+                raise ConnectionError(f"The intent service failed to predict: {intent}")
+        except OSError:
+            self._close()
+            with self._stats_lock:
+                self._requests += 1
+                self._failures += 1
+            raise
+
+        with self._stats_lock:
+            self._requests += 1
+            self._total_time += time.perf_counter() - start_time
+
+        return intent, confidence
+
+    def get_stats(self):
+        """
+        Returns the request, failure and latency counters of the client.
+
+        Returns:
+            dict: The client statistics.
+        """
+
+        with self._stats_lock:
+            successes = self._requests - self._failures
+            return {
+                "socket_path": self.socket_path,
+                "requests": self._requests,
+                "failures": self._failures,
+                "mean_ms": self._total_time * 1000 / successes if successes else 0.0
+            }
+
+def _handle_connection(conn, agent):
+    """Answers the requests of one (persistent) client connection until it is closed."""
+
+    with conn:
+        while True:
+            try:
+                request_id, text_length = REQUEST_HEADER.unpack(_recv_exact(conn, REQUEST_HEADER.size))
+                if text_length > MAX_TEXT_BYTES:
+                    print(f"ERROR: Intent request of {text_length} bytes rejected, closing the connection")
+                    return
+                text = _recv_exact(conn, text_length).decode('utf-8')
+            except (OSError, UnicodeDecodeError):
+                return
+
+            try:
+                intent, confidence = agent.predict_intent(text)
+                response = encode_response(request_id, STATUS_OK, intent, float(confidence))
+            except Exception as e:
+                print(f"ERROR: Intent prediction failed in the intent service - {e}")
+                response = encode_response(request_id, STATUS_ERROR, str(e)[:200])
+
+            try:
+                conn.sendall(response)
+            except OSError:
+                return
+
+def _serve(listener, ready, torch_threads):
+    """
+    Inference process: loads its own model (with micro-batching) and answers every
+    accepted connection in a thread.
+    """
+
+    # Stopping is driven by the parent process
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    import torch
+    torch.set_num_threads(torch_threads)
+
+    # This process is the service: it must not act as a client of itself
+    os.environ.pop("INTENT_SERVER_SOCKET", None)
+    os.environ["INTENT_BATCHING"] = "1"
+
+    from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
+    agent = IntentRecognizerAgent()
+    agent.predict_intent("Hello") # Warm-up run
+    ready.set()
+
+    while True:
+        conn, _ = listener.accept()
+        threading.Thread(target=_handle_connection, args=(conn, agent), daemon=True).start()
+
+class IntentInferenceServer:
+    """
+    Pool of inference processes sharing a listening UNIX socket (the kernel distributes
+    the connections). The socket only appears at its path once every process is ready,
+    and dead processes are replaced.
+
+    Args:
+        socket_path (str): Path of the UNIX socket.
+        processes (int): Number of inference processes (model replicas).
+        torch_threads (int): Torch intra-op threads of every process.
+
+    Attributes:
+        socket_path (str): Path of the UNIX socket.
+        processes (int): Number of inference processes (model replicas).
+        torch_threads (int): Torch intra-op threads of every process.
+    """
+
+    STARTUP_TIMEOUT_S = 300
+
+    def __init__(self, socket_path, processes, torch_threads):
+        self.socket_path = socket_path
+        self.processes = processes
+        self.torch_threads = torch_threads
+
+        self._context = multiprocessing.get_context("fork")
+        self._listener = None
+        self._temporary_path = None
+        self._workers = []
+        self._stopping = False
+
+    def _spawn(self):
+        """Starts an inference process and returns it with its ready event."""
+
+        ready = self._context.Event()
+        worker = self._context.Process(target=_serve, args=(self._listener, ready, self.torch_threads), daemon=True)
+        worker.start()
+        return worker, ready
+
+    def start(self):
+        """Binds the socket, starts the inference processes and publishes the socket once they are ready."""
+
+        self._temporary_path = f"{self.socket_path}.{os.getpid()}.tmp"
+        for path in (self._temporary_path, self.socket_path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self._temporary_path)
+        self._listener.listen(128)
+
+        start_time = time.perf_counter()
+        starting = [self._spawn() for _ in range(self.processes)]
+        self._workers = [worker for worker, _ in starting]
+        for worker, ready in starting:
+            if not ready.wait(self.STARTUP_TIMEOUT_S):
+                self.stop()
+                raise TimeoutError("Timed out waiting for the intent inference processes")
+
+        os.rename(self._temporary_path, self.socket_path) # Clients only connect to a ready pool
+        print(f"Intent service ready on {self.socket_path} ({self.processes} processes) "
+              f"in {time.perf_counter() - start_time:.2f} s")
+
+    def supervise(self, interval_s=1.0):
+        """Replaces the inference processes that die, until the server is stopped."""
+
+        while not self._stopping:
+            for i, worker in enumerate(self._workers):
+                if not worker.is_alive() and not self._stopping:
+                    print(f"ERROR: Intent inference process {worker.pid} died (exit code {worker.exitcode}), restarting it")
+                    self._workers[i], _ = self._spawn()
+            time.sleep(interval_s)
+
+    def stop(self, *_):
+        """Stops the inference processes and removes the socket."""
+
+        self._stopping = True
+        for worker in self._workers:
+            worker.terminate()
+        if self._listener:
+            self._listener.close()
+        for path in (self._temporary_path, self.socket_path):
+            if path and os.path.exists(path):
+                os.unlink(path)
+
+def main():
+    """Command running the out-of-process intent inference service."""
+
+    parser = argparse.ArgumentParser(description="Run the intent inference service on a UNIX socket.")
+    parser.add_argument("--socket", default=os.getenv("INTENT_SERVER_SOCKET", "/tmp/kusibot-intent.sock"),
+                        help="Path of the UNIX socket (default: INTENT_SERVER_SOCKET).")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("INTENT_SERVER_PROCESSES", 2)),
+                        help="Number of inference processes (model replicas).")
+    parser.add_argument("--torch-threads", type=int, default=None,
+                        help="Torch intra-op threads per process (default: CPU cores / processes).")
+    args = parser.parse_args()
+
+    torch_threads = args.torch_threads or max(1, multiprocessing.cpu_count() // args.processes)
+    server = IntentInferenceServer(args.socket, args.processes, torch_threads)
+    signal.signal(signal.SIGTERM, server.stop)
+    signal.signal(signal.SIGINT, server.stop)
+
+    server.start()
+    server.supervise()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,454 @@
+import asyncio, contextvars, httpcore, httpx, os, socket, threading, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+######################################################################
+# Load balancing of the Ollama requests over several backends.       #
+# Every request goes to the healthy backend with the fewest requests #
+# in flight; a backend that keeps failing is ejected for a while     #
+# (circuit breaker), and a slow request can be hedged to a second    #
+# backend, keeping whichever answers first.                          #
+######################################################################
+
+# Attempt (primary or hedge) of the sync request sent by the current thread, see _AttemptStream
+_current_attempt = contextvars.ContextVar("ollama_attempt", default=None)
+
+class OllamaBackend:
+    """
+    State of an Ollama backend: requests in flight and circuit breaker.
+
+    Args:
+        url (str): The base URL of the backend.
+    """
+
+    def __init__(self, url):
+        self.url = httpx.URL(url)
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.opened_at = None # Set while the breaker is open (backend ejected)
+        self.probing = False # A trial request is in flight after the cooldown
+
+class OllamaBalancer:
+    """
+    Chooses the Ollama backend of every request among OLLAMA_BASE_URLS (comma separated).
+
+    The health of the backends is passive: it is only judged by the outcome of the requests
+    they serve (the circuit breaker), there are no probe requests of their own.
+
+    Options (read when used): OLLAMA_BREAKER_FAILURES (consecutive failures, connection errors
+    or 5xx responses, that eject a backend), OLLAMA_BREAKER_COOLDOWN_S (time ejected, after
+    which one trial request decides whether it is back) and OLLAMA_HEDGE_DELAY_S (a request
+    without a response after this delay is sent to a second backend too, 0 disables it).
+
+    Args:
+        urls (list): The base URLs of the backends.
+    """
+
+    DEFAULT_BREAKER_FAILURES = 3
+    DEFAULT_BREAKER_COOLDOWN_S = 30.0
+
+    def __init__(self, urls):
+        self._lock = threading.Lock()
+        self.backends = [OllamaBackend(url) for url in urls]
+        self._hedged = 0
+        self._hedge_wins = 0
+
+    def get_hedge_delay(self):
+        """Returns the delay (s) after which a request is hedged, or 0 if hedging is disabled."""
+        return float(os.getenv("OLLAMA_HEDGE_DELAY_S", "0"))
+
+    def acquire(self, exclude=()):
+        """
+        Picks the backend of a request, counting it as in flight until released.
+
+        Args:
+            exclude (iterable): Backends not to pick (already tried by the request).
+        Returns:
+            OllamaBackend | None: The healthy backend with the fewest requests in flight, an ejected
+                one ready for its trial request, or (if every backend is ejected) the least loaded
+                of them. None if every backend is excluded.
+        """
+
+        cooldown_s = float(os.getenv("OLLAMA_BREAKER_COOLDOWN_S", self.DEFAULT_BREAKER_COOLDOWN_S))
+        now = time.monotonic()
+        with self._lock:
+            candidates = [backend for backend in self.backends if backend not in exclude]
+            if not candidates:
+                return None
+
+            healthy = [backend for backend in candidates if backend.opened_at is None]
+            probes = [backend for backend in candidates
+                      if backend.opened_at is not None and not backend.probing and now - backend.opened_at >= cooldown_s]
+            if probes:
+                backend = probes[0]
+                backend.probing = True
+            else:
+                backend = min(healthy or candidates, key=lambda backend: backend.outstanding)
+
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend
+
+    def release(self, backend, ok):
+        """
+        Counts a finished request of a backend and updates its circuit breaker.
+
+        Args:
+            backend (OllamaBackend): The backend of the request.
+            ok (bool | None): Whether the request succeeded (None if it was cancelled).
+        """
+
+        with self._lock:
+            backend.outstanding -= 1
+            probing, backend.probing = backend.probing, False
+
+            if ok is None:
+                return
+            if ok:
+                backend.consecutive_failures = 0
+                if backend.opened_at is not None:
+                    backend.opened_at = None
+                    print(f"Ollama backend {backend.url} is back")
+                return
+
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if probing or (backend.opened_at is None and
+                           backend.consecutive_failures >= int(os.getenv("OLLAMA_BREAKER_FAILURES", self.DEFAULT_BREAKER_FAILURES))):
+                if backend.opened_at is None:
+                    backend.ejections += 1
+                    print(f"ERROR: Ollama backend {backend.url} ejected after {backend.consecutive_failures} failures")
+                backend.opened_at = time.monotonic()
+
+    def record_hedge(self, won):
+        """Counts a hedged request and whether the hedge answered first."""
+
+        with self._lock:
+            self._hedged += 1
+            self._hedge_wins += int(won)
+
+    def get_stats(self):
+        """
+        Returns the load and health of every backend and the hedging counters.
+
+        Returns:
+            dict: Requests, in flight, failures and ejections of every backend (and whether it is
+                ejected now), hedged requests and how many the hedge answered first.
+        """
+
+        with self._lock:
+            return {
+                "backends": {str(backend.url): {
+                    "requests": backend.requests,
+                    "outstanding": backend.outstanding,
+                    "failures": backend.failures,
+                    "ejections": backend.ejections,
+                    "ejected": backend.opened_at is not None
+                } for backend in self.backends},
+                "hedged": self._hedged,
+                "hedge_wins": self._hedge_wins
+            }
+
+def _route(request, backend):
+    """Returns a copy of the request sent to the backend."""
+
+    url = request.url.copy_with(scheme=backend.url.scheme, host=backend.url.host, port=backend.url.port)
+    headers = [(key, value) for key, value in request.headers.raw if key.lower() != b"host"]
+    return httpx.Request(request.method, url, headers=headers, content=request.content, extensions=request.extensions)
+
+class _TrackedStream(httpx.SyncByteStream):
+    """Response body releasing its backend once closed (failed if it broke or the response is a 5xx)."""
+
+    def __init__(self, stream, on_close, ok):
+        self._stream = stream
+        self._on_close = on_close
+        self._ok = ok
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        except httpx.TransportError:
+            self._ok = False
+            raise
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            if self._on_close:
+                self._on_close(self._ok)
+                self._on_close = None
+
+class _AsyncTrackedStream(httpx.AsyncByteStream):
+    """Async variant of _TrackedStream."""
+
+    def __init__(self, stream, on_close, ok):
+        self._stream = stream
+        self._on_close = on_close
+        self._ok = ok
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except httpx.TransportError:
+            self._ok = False
+            raise
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._on_close:
+                self._on_close(self._ok)
+                self._on_close = None
+
+class _Attempt:
+    """One of the requests (primary or hedge) sent for a hedged request, with the connections it writes on."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sockets = []
+        self.aborted = False
+
+    def add(self, sock):
+        """Watches a connection of the attempt (shut down at once if the attempt was aborted)."""
+
+        with self._lock:
+            if not self.aborted:
+                self._sockets.append(sock)
+                return
+        _shutdown(sock)
+
+    def abort(self):
+        """Shuts the connections of the attempt down, which ends its request wherever it is blocked."""
+
+        with self._lock:
+            self.aborted = True
+            sockets, self._sockets = self._sockets, []
+        for sock in sockets:
+            _shutdown(sock)
+
+def _shutdown(sock):
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass # Already closed
+
+class _AttemptStream(httpcore.NetworkStream):
+    """Connection of the sync pool, handed to the attempt of the thread writing a request on it."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def read(self, max_bytes, timeout=None):
+        return self._stream.read(max_bytes, timeout)
+
+    def write(self, buffer, timeout=None):
+        attempt = _current_attempt.get()
+        sock = self._stream.get_extra_info("socket")
+        if attempt is not None and sock is not None:
+            attempt.add(sock)
+        self._stream.write(buffer, timeout)
+
+    def close(self):
+        self._stream.close()
+
+    def start_tls(self, ssl_context, server_hostname=None, timeout=None):
+        return _AttemptStream(self._stream.start_tls(ssl_context, server_hostname, timeout))
+
+    def get_extra_info(self, info):
+        return self._stream.get_extra_info(info)
+
+class _AttemptBackend(httpcore.NetworkBackend):
+    """Network backend of the sync pool whose connections are _AttemptStreams."""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        return _AttemptStream(self._backend.connect_tcp(host, port, timeout, local_address, socket_options))
+
+    def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return _AttemptStream(self._backend.connect_unix_socket(path, timeout, socket_options))
+
+    def sleep(self, seconds):
+        self._backend.sleep(seconds)
+
+class BalancedTransport(httpx.BaseTransport):
+    """
+    Sync transport sending every request to a backend chosen by the balancer, through the
+    shared connection pool. A backend that refuses the connection is skipped for the next one.
+
+    The losing attempt of a hedged request is aborted as soon as the other one answers: its
+    connection is shut down, even while it still waits for the response headers.
+
+    Args:
+        transport (PooledTransport): The connection pool.
+        balancer (OllamaBalancer): The backends and their state.
+    """
+
+    def __init__(self, transport, balancer):
+        self.transport = transport
+        self.balancer = balancer
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+        pool = transport._pool # The connections must be known before the response arrives, so the pool is wrapped
+        if not isinstance(pool._network_backend, _AttemptBackend):
+            pool._network_backend = _AttemptBackend(pool._network_backend)
+
+    def _send(self, request, backend, attempt=None):
+        token = _current_attempt.set(attempt)
+        try:
+            response = self.transport.handle_request(_route(request, backend))
+        except Exception:
+            self.balancer.release(backend, None if attempt is not None and attempt.aborted else False)
+            raise
+        finally:
+            _current_attempt.reset(token)
+
+        stream = _TrackedStream(response.stream, lambda ok: self.balancer.release(backend, ok), response.status_code < 500)
+        return httpx.Response(response.status_code, headers=response.headers, stream=stream, extensions=response.extensions)
+
+    def _send_with_failover(self, request, tried, tried_lock=None, attempt=None):
+        tried_lock = tried_lock or threading.Lock()
+        last_error = None
+        while True:
+            with tried_lock: # The hedge copies the backends the primary tried
+                backend = self.balancer.acquire(exclude=set(tried))
+                if backend is not None:
+                    tried.add(backend)
+            if backend is None:
+                raise last_error or httpx.ConnectError("No Ollama backend left to try", request=request)
+            try:
+                return self._send(request, backend, attempt)
+            except httpx.ConnectError as e:
+                if attempt is not None and attempt.aborted:
+                    raise
+                last_error = e
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(thread_name_prefix="ollama-hedge")
+            return self._executor
+
+    def handle_request(self, request):
+        request.read()
+        tried = set()
+        hedge_delay = self.balancer.get_hedge_delay()
+        if hedge_delay <= 0 or len(self.balancer.backends) < 2:
+            return self._send_with_failover(request, tried)
+
+        executor = self._get_executor()
+        tried_lock = threading.Lock()
+        primary_attempt, hedge_attempt = _Attempt(), _Attempt()
+        primary = executor.submit(self._send_with_failover, request, tried, tried_lock, primary_attempt)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done:
+            return primary.result()
+
+        # No response yet: the same request goes to another backend, the first response wins
+        with tried_lock:
+            hedge_tried = set(tried)
+        hedge = executor.submit(self._send_with_failover, request, hedge_tried, None, hedge_attempt)
+        attempts = {primary: primary_attempt, hedge: hedge_attempt}
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in done if future.exception() is None), None)
+            if winner is not None:
+                for loser in pending | (done - {winner}):
+                    attempts[loser].abort() # Its connection is shut down at once
+                    loser.add_done_callback(lambda future: future.exception() is None and future.result().close())
+                self.balancer.record_hedge(winner is hedge)
+                return winner.result()
+
+        return primary.result() # Both failed
+
+    def close(self):
+        self.transport.close()
+
+    def get_stats(self):
+        """Returns the request count and the connection usage of the pool."""
+        return self.transport.get_stats()
+
+def _close_response(task):
+    """Closes the response of a finished request task that nobody reads."""
+
+    if not task.cancelled() and task.exception() is None:
+        asyncio.ensure_future(task.result().aclose())
+
+class AsyncBalancedTransport(httpx.AsyncBaseTransport):
+    """Async variant of BalancedTransport: a hedged request is a second task, the slower one is cancelled."""
+
+    def __init__(self, transport, balancer):
+        self.transport = transport
+        self.balancer = balancer
+
+    async def _send(self, request, backend):
+        try:
+            response = await self.transport.handle_async_request(_route(request, backend))
+        except asyncio.CancelledError:
+            self.balancer.release(backend, None) # Cancelled by the caller or a faster hedge, not a failure
+            raise
+        except Exception:
+            self.balancer.release(backend, False)
+            raise
+
+        stream = _AsyncTrackedStream(response.stream, lambda ok: self.balancer.release(backend, ok), response.status_code < 500)
+        return httpx.Response(response.status_code, headers=response.headers, stream=stream, extensions=response.extensions)
+
+    async def _send_with_failover(self, request, tried):
+        last_error = None
+        while True:
+            backend = self.balancer.acquire(exclude=tried)
+            if backend is None:
+                raise last_error or httpx.ConnectError("No Ollama backend left to try", request=request)
+            tried.add(backend)
+            try:
+                return await self._send(request, backend)
+            except httpx.ConnectError as e:
+                last_error = e
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        tried = set()
+        hedge_delay = self.balancer.get_hedge_delay()
+        if hedge_delay <= 0 or len(self.balancer.backends) < 2:
+            return await self._send_with_failover(request, tried)
+
+        primary = asyncio.ensure_future(self._send_with_failover(request, tried))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait([primary], timeout=hedge_delay)
+            if done:
+                return primary.result()
+
+            # No response yet: the same request goes to another backend, the first response wins
+            hedge = asyncio.ensure_future(self._send_with_failover(request, set(tried)))
+            tasks.add(hedge)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    tasks.discard(winner)
+                    self.balancer.record_hedge(winner is hedge)
+                    return winner.result()
+
+            return primary.result() # Both failed
+        finally:
+            for loser in tasks: # The slower request is cancelled, or closed if it got its response meanwhile
+                loser.cancel()
+                loser.add_done_callback(_close_response)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def get_stats(self):
+        """Returns the request count and the connection usage of the pool."""
+        return self.transport.get_stats()
@@ -0,0 +1,339 @@
+import asyncio, contextvars, httpx, os, socket, threading, time
+from kusibot.chatbot.llm_scheduler import llm_scheduler
+from kusibot.chatbot.generation_profiles import generation_controller
+from kusibot.chatbot.turn_timing import turn_timings
+
+######################################################################
+# Latency budget of the LLM calls of every agent type.               #
+# A generation that exceeds it is cancelled (its connection to       #
+# Ollama is closed, which stops the generation there) and the agent  #
+# answers with its fallback instead, so a slow or stuck model never  #
+# holds a chat turn longer than the budget. The wait for a slot of   #
+# the LLM scheduler is part of the budget.                           #
+######################################################################
+
+# Watchdog of the sync LLM call being run, read by the event hooks of the Ollama clients
+_current_watch = contextvars.ContextVar("llm_call_watch", default=None)
+_END = object()
+
+def _shutdown(network_stream):
+    """Shuts the socket of an Ollama connection down, which wakes a read blocked on it with an error."""
+
+    sock = network_stream.get_extra_info("socket")
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass # Already closed
+
+class _CallWatch:
+    """
+    Wall-clock watchdog of a sync LLM call: once its budget is spent, the connections of the call
+    to Ollama are shut down, which ends the stream being read wherever it is blocked. It also holds
+    the generation slot of the call, released once by whichever ends first, the call or its cancel.
+
+    Args:
+        budget_s (float): The time left to the call.
+    """
+
+    def __init__(self, budget_s):
+        self.expires_at = time.monotonic() + budget_s
+        self.expired = False
+        self._lock = threading.Lock()
+        self._streams = []
+        self._slot_held = True
+        self._timer = threading.Timer(max(budget_s, 0.0), self.expire)
+        self._timer.daemon = True
+
+    def remaining(self):
+        """Returns the time (s) left to the call."""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def add(self, network_stream):
+        """Watches a connection of the call (shut down at once if the budget is already spent)."""
+
+        with self._lock:
+            if not self.expired:
+                self._streams.append(network_stream)
+                return
+        _shutdown(network_stream)
+
+    def expire(self):
+        """Marks the call as expired and shuts its connections down."""
+
+        with self._lock:
+            self.expired = True
+            streams, self._streams = self._streams, []
+        for network_stream in streams:
+            _shutdown(network_stream)
+
+    def release_slot(self):
+        """Releases the generation slot of the call (only the first time)."""
+
+        with self._lock:
+            slot_held, self._slot_held = self._slot_held, False
+        if slot_held:
+            llm_scheduler.release()
+
+    def start(self):
+        self._timer.start()
+
+    def stop(self):
+        self._timer.cancel()
+
+class LLMDeadlines:
+    """
+    Runs the agent chains within the deadline of their agent type, read from
+    OLLAMA_<AGENT>_DEADLINE_S (e.g. OLLAMA_CONVERSATION_DEADLINE_S=20).
+
+    The sync generations are streamed under a wall-clock watchdog that shuts their connection
+    down once the budget left after the wait for a slot is spent, and every request they send is
+    given that budget as its timeout (see bound_request and watch_response, the event hooks of the
+    sync Ollama clients), so a model that does not send anything is cut as well. The async ones
+    are cancelled once the budget is spent.
+
+    Every call first waits for a generation slot of the LLM scheduler, queued as its agent
+    type or as the one given in queue_as. If it is not admitted (full queue or too long a
+    wait) the busy fallback is answered without calling the model. Admitted calls run with
+    the Ollama options of the current generation profile of their agent type.
+    """
+
+    DEFAULT_DEADLINES_S = {"conversation": 20.0, "assessment": 10.0}
+    DEFAULT_DEADLINE_S = 60.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._watches = {} # Watchdog of the running sync calls that can be cancelled, by cancel event
+
+    def get_deadline(self, agent_name):
+        """
+        Returns the latency budget of an agent type.
+
+        Args:
+            agent_name (str): The agent type (e.g. "conversation", "assessment").
+        Returns:
+            float: The deadline in seconds.
+        """
+
+        return float(os.getenv(f"OLLAMA_{agent_name.upper()}_DEADLINE_S",
+                               self.DEFAULT_DEADLINES_S.get(agent_name, self.DEFAULT_DEADLINE_S)))
+
+    def _record(self, agent_name, elapsed_time, expired):
+        """Counts a call of an agent type and whether it exceeded its deadline."""
+
+        with self._lock:
+            stats = self._stats.setdefault(agent_name, {"calls": 0, "deadline_hits": 0, "max_latency_ms": 0.0})
+            stats["calls"] += 1
+            stats["deadline_hits"] += int(expired)
+            stats["max_latency_ms"] = max(stats["max_latency_ms"], elapsed_time * 1000)
+        generation_controller.observe_latency(elapsed_time)
+
+    def _stream_chunks(self, agent_name, chain, chain_input, outcome, queue_as=None, cancel_event=None):
+        """
+        Yields the chunks of the generation once admitted by the scheduler, until it ends, its deadline
+        passes or the cancel event is set. Sets outcome["admitted"] and outcome["expired"].
+        """
+
+        deadline_s = self.get_deadline(agent_name)
+        start_time = time.monotonic()
+        outcome["expired"] = False
+
+        outcome["admitted"] = llm_scheduler.acquire(queue_as or agent_name, max_wait_s=deadline_s)
+        admitted_time = time.monotonic()
+        turn_timings.record("llm_queue", admitted_time - start_time)
+        if not outcome["admitted"]:
+            return
+
+        watch = _CallWatch(deadline_s - (admitted_time - start_time)) # The wait for the slot is part of the budget
+        try:
+            if cancel_event is not None:
+                with self._lock:
+                    self._watches[cancel_event] = watch
+                if cancel_event.is_set():
+                    return
+
+            watch.start()
+            stream = generation_controller.apply(agent_name, chain).stream(chain_input)
+            try:
+                while (chunk := self._next_chunk(stream, watch)) is not _END:
+                    if cancel_event is not None and cancel_event.is_set():
+                        return
+                    yield chunk
+            except httpx.HTTPError as e:
+                if cancel_event is not None and cancel_event.is_set():
+                    return # Cut by cancel
+                if not (watch.expired or isinstance(e, httpx.TimeoutException)):
+                    raise
+                outcome["expired"] = True
+            finally:
+                watch.stop()
+                stream.close() # Closes the connection to Ollama, which cancels an unfinished generation
+                self._record(agent_name, time.monotonic() - start_time, outcome["expired"])
+                turn_timings.record("llm", time.monotonic() - admitted_time)
+        finally:
+            if cancel_event is not None:
+                with self._lock:
+                    self._watches.pop(cancel_event, None)
+            watch.release_slot()
+
+    def cancel(self, cancel_event):
+        """
+        Cancels the sync call run with a cancel event: the event is set, the generation slot of the
+        call released and its connection to Ollama shut down, so the call ends without waiting for
+        the next chunk. A call still waiting for the response on a reused connection ends once the
+        headers arrive (its connection is then shut down) or at its deadline.
+
+        Args:
+            cancel_event (threading.Event): The cancel event given to invoke.
+        """
+
+        cancel_event.set()
+        with self._lock:
+            watch = self._watches.get(cancel_event)
+        if watch is not None:
+            watch.expire()
+            watch.release_slot()
+
+    def _next_chunk(self, stream, watch):
+        """Reads the next chunk of a stream (_END once it ends), its requests to Ollama watched by the watchdog of the call."""
+
+        token = _current_watch.set(watch)
+        try:
+            return next(stream, _END)
+        finally:
+            _current_watch.reset(token)
+
+    def bound_request(self, request):
+        """
+        Event hook of the sync Ollama clients, run before every request: the timeouts of a request
+        sent by a call with a deadline are capped to the time left to the call, and a new connection
+        it opens is handed to the watchdog of the call.
+
+        Args:
+            request (httpx.Request): The request to Ollama.
+        """
+
+        watch = _current_watch.get()
+        if watch is None:
+            return
+
+        remaining_s = max(watch.remaining(), 0.001) # A timeout of 0 would make the socket non-blocking
+        timeout = dict(request.extensions.get("timeout") or {})
+        for key in ("connect", "read", "write", "pool"):
+            timeout[key] = remaining_s if timeout.get(key) is None else min(timeout[key], remaining_s)
+        request.extensions["timeout"] = timeout
+
+        trace = request.extensions.get("trace")
+        def watch_connection(event_name, info):
+            # A new connection is watched as soon as it is open, before the response headers arrive
+            if event_name == "connection.connect_tcp.complete" and info.get("return_value") is not None:
+                watch.add(info["return_value"])
+            if trace is not None:
+                trace(event_name, info)
+        request.extensions["trace"] = watch_connection
+
+    def watch_response(self, response):
+        """
+        Event hook of the sync Ollama clients, run once the headers of a response arrive: the
+        connection of a call with a deadline is handed to its watchdog.
+
+        Args:
+            response (httpx.Response): The response of Ollama.
+        """
+
+        watch = _current_watch.get()
+        network_stream = response.extensions.get("network_stream")
+        if watch is not None and network_stream is not None:
+            watch.add(network_stream)
+
+    def invoke(self, agent_name, chain, chain_input, fallback, busy_fallback=None, queue_as=None, cancel_event=None):
+        """
+        Generates the whole response of a chain within the deadline of the agent type.
+
+        Args:
+            agent_name (str): The agent type.
+            chain (Runnable): The chain of the agent.
+            chain_input (dict): The prompt variables.
+            fallback (str): The response if the deadline is exceeded.
+            busy_fallback (str, optional): The response if the scheduler does not admit the call.
+                Defaults to the fallback.
+            queue_as (str, optional): The agent type whose priority the call waits with.
+            cancel_event (threading.Event, optional): Stops the generation once set (its response is then
+                incomplete, for a caller that no longer needs it). Set it with cancel to cut the generation at once.
+        Returns:
+            str: The generated response, or a fallback.
+        """
+
+        outcome = {}
+        response = "".join(self._stream_chunks(agent_name, chain, chain_input, outcome, queue_as, cancel_event))
+
+        if not outcome["admitted"]:
+            return fallback if busy_fallback is None else busy_fallback
+        return fallback if outcome["expired"] else response
+
+    async def ainvoke(self, agent_name, chain, chain_input, fallback, busy_fallback=None, queue_as=None):
+        """Async variant of invoke: the slot and the generation are awaited, cancelled once the deadline passes."""
+
+        deadline_s = self.get_deadline(agent_name)
+        start_time = time.monotonic()
+
+        admitted = await llm_scheduler.aacquire(queue_as or agent_name, max_wait_s=deadline_s)
+        admitted_time = time.monotonic()
+        turn_timings.record("llm_queue", admitted_time - start_time)
+        if not admitted:
+            return fallback if busy_fallback is None else busy_fallback
+
+        try:
+            remaining_s = deadline_s - (admitted_time - start_time)
+            response = await asyncio.wait_for(generation_controller.apply(agent_name, chain).ainvoke(chain_input), remaining_s)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            self._record(agent_name, time.monotonic() - start_time, True)
+            return fallback
+        finally:
+            llm_scheduler.release()
+            turn_timings.record("llm", time.monotonic() - admitted_time)
+
+        self._record(agent_name, time.monotonic() - start_time, False)
+        return response
+
+    def stream(self, agent_name, chain, chain_input, fallback, busy_fallback=None, queue_as=None):
+        """
+        Streams the response of a chain within the deadline of the agent type. A response
+        cut by the deadline ends where it is; if nothing was generated, the fallback is yielded.
+
+        Args:
+            agent_name (str): The agent type.
+            chain (Runnable): The chain of the agent.
+            chain_input (dict): The prompt variables.
+            fallback (str): The response if the deadline is exceeded before the first chunk.
+            busy_fallback (str, optional): The response if the scheduler does not admit the call.
+                Defaults to the fallback.
+            queue_as (str, optional): The agent type whose priority the call waits with.
+        Yields:
+            str: The next chunk of the response.
+        """
+
+        outcome = {}
+        generated = False
+        for chunk in self._stream_chunks(agent_name, chain, chain_input, outcome, queue_as):
+            generated = generated or bool(chunk)
+            yield chunk
+
+        if not outcome["admitted"]:
+            yield fallback if busy_fallback is None else busy_fallback
+        elif outcome["expired"] and not generated:
+            yield fallback
+
+    def get_stats(self):
+        """
+        Returns the deadline counters per agent type.
+
+        Returns:
+            dict: Calls, deadline hits and maximum latency (ms) of every agent type.
+        """
+
+        with self._lock:
+            return {agent_name: dict(stats) for agent_name, stats in self._stats.items()}
+
+llm_deadlines = LLMDeadlines() # Process-wide deadlines of the LLM calls
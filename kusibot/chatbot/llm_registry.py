@@ -0,0 +1,314 @@
+import httpx, json, os, threading
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_ollama import OllamaLLM
+from kusibot.chatbot.llm_deadlines import llm_deadlines
+from kusibot.chatbot.llm_balancer import AsyncBalancedTransport, BalancedTransport, OllamaBalancer
+
+######################################################################
+# Process-wide registry of the Ollama clients used by the agents.    #
+# Every agent (of every user) shares one LLM client and one compiled #
+# chain per agent type, and all of them send their requests through  #
+# a single pool of keep-alive connections to Ollama.                 #
+######################################################################
+
+def _pool_stats(pool, max_connections, requests):
+    """Summarises the connections of an httpcore connection pool."""
+
+    connections = list(getattr(pool, "connections", []))
+    active = sum(1 for conn in connections if not conn.is_idle() and not conn.is_closed())
+
+    return {
+        "requests": requests,
+        "connections": len(connections),
+        "active": active,
+        "idle": sum(1 for conn in connections if conn.is_idle()),
+        "max_connections": max_connections,
+        "utilisation": active / max_connections if max_connections else 0.0
+    }
+
+class PooledTransport(httpx.HTTPTransport):
+    """HTTP transport (keep-alive connection pool) shared by the sync Ollama clients, counting its requests."""
+
+    def __init__(self, limits):
+        super().__init__(limits=limits)
+        self.max_connections = limits.max_connections
+        self._lock = threading.Lock()
+        self._requests = 0
+
+    def handle_request(self, request):
+        with self._lock:
+            self._requests += 1
+        return super().handle_request(request)
+
+    def get_stats(self):
+        """Returns the request count and the connection usage of the pool."""
+        return _pool_stats(self._pool, self.max_connections, self._requests)
+
+class AsyncPooledTransport(httpx.AsyncHTTPTransport):
+    """HTTP transport (keep-alive connection pool) shared by the async Ollama clients, counting its requests."""
+
+    def __init__(self, limits):
+        super().__init__(limits=limits)
+        self.max_connections = limits.max_connections
+        self._requests = 0
+
+    async def handle_async_request(self, request):
+        self._requests += 1 # Always called from the event loop thread
+        return await super().handle_async_request(request)
+
+    def get_stats(self):
+        """Returns the request count and the connection usage of the pool."""
+        return _pool_stats(self._pool, self.max_connections, self._requests)
+
+class PromptEvalRecorder(BaseCallbackHandler):
+    """
+    Records the evaluation metadata Ollama returns with every generation of an agent type:
+    prompt tokens evaluated (the ones not reused from its KV cache), generated tokens and
+    the time spent on each, plus the model load time.
+    """
+
+    run_inline = True # Just counters, no need to run in a thread on the async calls
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {"requests": 0, "prompt_eval_count": 0, "prompt_eval_duration": 0,
+                        "eval_count": 0, "eval_duration": 0, "load_duration": 0}
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                info = generation.generation_info or {}
+                with self._lock:
+                    self._totals["requests"] += 1
+                    for key in ("prompt_eval_count", "prompt_eval_duration", "eval_count", "eval_duration", "load_duration"):
+                        self._totals[key] += info.get(key) or 0
+
+    def get_stats(self):
+        """Returns the total and average tokens and times (ms) of the recorded generations."""
+
+        with self._lock:
+            totals = dict(self._totals)
+
+        requests = totals["requests"]
+        return {
+            "requests": requests,
+            "prompt_eval_tokens": totals["prompt_eval_count"],
+            "prompt_eval_ms": totals["prompt_eval_duration"] / 1e6, # Ollama durations are in ns
+            "eval_tokens": totals["eval_count"],
+            "eval_ms": totals["eval_duration"] / 1e6,
+            "load_ms": totals["load_duration"] / 1e6,
+            "avg_prompt_eval_tokens": totals["prompt_eval_count"] / requests if requests else 0.0,
+            "avg_prompt_eval_ms": totals["prompt_eval_duration"] / 1e6 / requests if requests else 0.0
+        }
+
+class LLMClientRegistry:
+    """
+    Process-wide registry of Ollama LLM clients and compiled chains, keyed by agent type.
+    The clients share one sync and one async keep-alive connection pool. Model options
+    of every agent type are read from OLLAMA_<AGENT>_OPTIONS (JSON), e.g.
+    OLLAMA_CONVERSATION_OPTIONS='{"temperature": 0.7, "num_predict": 160}'.
+    Every request asks Ollama to keep the model loaded for OLLAMA_KEEP_ALIVE (so it is not
+    unloaded between quiet periods), and the prompt evaluation metadata of the responses
+    is recorded per agent type.
+
+    With several Ollama backends (OLLAMA_BASE_URLS, comma separated) the requests are
+    balanced among them (see OllamaBalancer), through the same connection pools.
+
+    After a fork the registry starts over, so a child process never reuses the
+    connections of its parent.
+    """
+
+    DEFAULT_BASE_URL = "http://localhost:11434"
+    DEFAULT_MAX_CONNECTIONS = 20
+    DEFAULT_MAX_KEEPALIVE = 20
+    DEFAULT_KEEPALIVE_EXPIRY_S = 60
+    DEFAULT_KEEP_ALIVE = "30m"
+    DEFAULT_TIMEOUT_S = 60.0 # Of the requests sent outside LLMDeadlines
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """Drops every client, chain and connection pool (owned by the current process from now on)."""
+
+        self._pid = os.getpid()
+        self._transport = None
+        self._async_transport = None
+        self._llms = {}
+        self._chains = {}
+        self._prompt_eval = {}
+        self._balanced_transports = {}
+
+    def _check_process(self):
+        """Starts over if the process was forked since the clients were created (called with the lock held)."""
+
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _get_transports(self):
+        """Returns the shared sync and async transports, creating them the first time (called with the lock held)."""
+
+        if self._transport is None:
+            max_connections = int(os.getenv("OLLAMA_POOL_MAX_CONNECTIONS", self.DEFAULT_MAX_CONNECTIONS))
+            limits = httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(max_connections, int(os.getenv("OLLAMA_POOL_MAX_KEEPALIVE", self.DEFAULT_MAX_KEEPALIVE))),
+                keepalive_expiry=float(os.getenv("OLLAMA_POOL_KEEPALIVE_EXPIRY_S", self.DEFAULT_KEEPALIVE_EXPIRY_S))
+            )
+            self._transport = PooledTransport(limits)
+            self._async_transport = AsyncPooledTransport(limits)
+
+        return self._transport, self._async_transport
+
+    def _get_balanced_transports(self, base_urls):
+        """Returns the sync and async transports balancing the requests among the backends (called with the lock held)."""
+
+        if base_urls not in self._balanced_transports:
+            transport, async_transport = self._get_transports()
+            balancer = OllamaBalancer(base_urls)
+            self._balanced_transports[base_urls] = (BalancedTransport(transport, balancer),
+                                                    AsyncBalancedTransport(async_transport, balancer))
+
+        return self._balanced_transports[base_urls]
+
+    def get_base_urls(self):
+        """
+        Returns the Ollama backends the requests are sent to.
+
+        Returns:
+            tuple: The base URLs, from OLLAMA_BASE_URLS (comma separated) or else OLLAMA_BASE_URL.
+        """
+
+        base_urls = tuple(url.strip() for url in os.getenv("OLLAMA_BASE_URLS", "").split(",") if url.strip())
+        return base_urls or (os.getenv("OLLAMA_BASE_URL", self.DEFAULT_BASE_URL),)
+
+    def get_model_options(self, agent_name):
+        """
+        Returns the Ollama model options configured for an agent type.
+
+        Args:
+            agent_name (str): The agent type (e.g. "conversation", "assessment").
+        Returns:
+            dict: The model options (e.g. temperature, num_predict, num_ctx).
+        """
+
+        options = os.getenv(f"OLLAMA_{agent_name.upper()}_OPTIONS")
+        if not options:
+            return {}
+
+        try:
+            return json.loads(options)
+        except json.JSONDecodeError as e:
+            print(f"ERROR: Invalid OLLAMA_{agent_name.upper()}_OPTIONS, using the default model options - {e}")
+            return {}
+
+    def get_keep_alive(self):
+        """
+        Returns how long Ollama keeps the model loaded after a request.
+
+        Returns:
+            str | int: A duration ("30m", "1h") or seconds (-1 keeps it loaded forever).
+        """
+
+        keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", self.DEFAULT_KEEP_ALIVE)
+        return int(keep_alive) if keep_alive.lstrip('-').isdigit() else keep_alive
+
+    def get_llm(self, agent_name, model_name):
+        """
+        Returns the shared Ollama LLM client of an agent type.
+
+        Args:
+            agent_name (str): The agent type.
+            model_name (str): The name of the Ollama model.
+        Returns:
+            OllamaLLM | None: The LLM client, or None if it cannot be created.
+        """
+
+        base_urls = self.get_base_urls()
+        key = (agent_name, model_name, base_urls)
+
+        with self._lock:
+            self._check_process()
+            if key not in self._llms:
+                if len(base_urls) > 1:
+                    transport, async_transport = self._get_balanced_transports(base_urls)
+                else:
+                    transport, async_transport = self._get_transports()
+                recorder = self._prompt_eval.setdefault(agent_name, PromptEvalRecorder())
+                options = {"keep_alive": self.get_keep_alive(), **self.get_model_options(agent_name)}
+                # The calls run by LLMDeadlines cap the timeouts of their requests to the time they have left
+                timeout = self.DEFAULT_TIMEOUT_S
+                event_hooks = {"request": [llm_deadlines.bound_request], "response": [llm_deadlines.watch_response]}
+                try:
+                    self._llms[key] = OllamaLLM(model=model_name,
+                                                base_url=base_urls[0], # Replaced by the chosen backend when balanced
+                                                sync_client_kwargs={"transport": transport, "timeout": timeout, "event_hooks": event_hooks},
+                                                async_client_kwargs={"transport": async_transport, "timeout": timeout},
+                                                callbacks=[recorder],
+                                                **options)
+                except Exception as e:
+                    print(f"ERROR: Ollama is not installed - {e}")
+                    return None
+
+            return self._llms[key]
+
+    def get_chain(self, agent_name, prompt_template, model_name):
+        """
+        Returns the compiled chain (prompt | LLM) of an agent type, built only once.
+
+        Args:
+            agent_name (str): The agent type.
+            prompt_template (str): The prompt template of the agent.
+            model_name (str): The name of the Ollama model.
+        Returns:
+            Runnable | None: The chain, or None if the LLM client is not available.
+        """
+
+        llm = self.get_llm(agent_name, model_name)
+        if llm is None:
+            return None
+
+        key = (agent_name, prompt_template, id(llm))
+        with self._lock:
+            if key not in self._chains:
+                self._chains[key] = ChatPromptTemplate.from_template(prompt_template) | llm
+
+            return self._chains[key]
+
+    def get_utilisation(self):
+        """
+        Returns the share of the Ollama connections in use (the busiest of the sync and async pools).
+
+        Returns:
+            float: The utilisation, from 0 (idle or no pool yet) to 1 (saturated).
+        """
+
+        with self._lock:
+            self._check_process()
+            pools = [t.get_stats() for t in (self._transport, self._async_transport) if t is not None]
+
+        return max((pool["utilisation"] for pool in pools), default=0.0)
+
+    def get_stats(self):
+        """
+        Returns the clients created, the usage of the sync and async connection pools,
+        the prompt evaluation metadata per agent type and the state of the balanced backends.
+
+        Returns:
+            dict: The registry statistics.
+        """
+
+        with self._lock:
+            self._check_process()
+            return {
+                "llm_clients": len(self._llms),
+                "chains": len(self._chains),
+                "sync_pool": self._transport.get_stats() if self._transport else None,
+                "async_pool": self._async_transport.get_stats() if self._async_transport else None,
+                "prompt_eval": {agent_name: recorder.get_stats() for agent_name, recorder in self._prompt_eval.items()},
+                "balancers": [transport.balancer.get_stats() for transport, _ in self._balanced_transports.values()]
+            }
+
+llm_registry = LLMClientRegistry() # Process-wide registry of the LLM clients
@@ -0,0 +1,168 @@
+import asyncio, heapq, itertools, os, threading, time
+
+######################################################################
+# Admission control of the Ollama generations.                       #
+# Ollama serves a limited number of generations in parallel, so at   #
+# most OLLAMA_MAX_PARALLEL run at once and the rest wait in a        #
+# bounded priority queue (an assessment in progress before the free  #
+# chat). A full queue or a long wait rejects the call right away.    #
+######################################################################
+
+class _Waiter:
+    """A call waiting for a generation slot, woken from any thread (a thread event or a future of its event loop)."""
+
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.event = None if loop else threading.Event()
+        self.future = loop.create_future() if loop else None
+        self.granted = False
+        self.cancelled = False
+
+    def notify(self):
+        if self.loop:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(True))
+        else:
+            self.event.set()
+
+class LLMScheduler:
+    """
+    Limits the concurrent Ollama generations of the sync (threads) and async (event loop) calls.
+
+    Options (read when used): OLLAMA_MAX_PARALLEL (generations at once), OLLAMA_QUEUE_SIZE
+    (calls waiting, more are rejected) and OLLAMA_QUEUE_TIMEOUT_S (maximum wait).
+    The waiting calls get the slots by priority of their agent type (PRIORITIES, lower first)
+    and then in arrival order.
+    """
+
+    PRIORITIES = {"assessment": 0, "conversation": 1, "prefetch": 2, "summary": 3}
+    DEFAULT_PRIORITY = 2
+    DEFAULT_MAX_PARALLEL = 4
+    DEFAULT_QUEUE_SIZE = 64
+    DEFAULT_QUEUE_TIMEOUT_S = 10.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._waiters = [] # Heap of (priority, arrival, waiter)
+        self._active = 0
+        self._queued = 0
+        self._stats = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0,
+                       "max_queue_depth": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0}
+
+    def _get_queue_timeout(self, max_wait_s):
+        queue_timeout_s = float(os.getenv("OLLAMA_QUEUE_TIMEOUT_S", self.DEFAULT_QUEUE_TIMEOUT_S))
+        return queue_timeout_s if max_wait_s is None else min(queue_timeout_s, max_wait_s)
+
+    def _admit(self, agent_name, loop=None):
+        """Takes a free slot (returns None), queues a waiter (returns it) or rejects the call (returns False)."""
+
+        with self._lock:
+            if self._active < int(os.getenv("OLLAMA_MAX_PARALLEL", self.DEFAULT_MAX_PARALLEL)) and not self._queued:
+                self._active += 1
+                self._stats["admitted"] += 1
+                return None
+
+            if self._queued >= int(os.getenv("OLLAMA_QUEUE_SIZE", self.DEFAULT_QUEUE_SIZE)):
+                self._stats["rejected"] += 1
+                return False
+
+            waiter = _Waiter(loop)
+            heapq.heappush(self._waiters, (self.PRIORITIES.get(agent_name, self.DEFAULT_PRIORITY), next(self._sequence), waiter))
+            self._queued += 1
+            self._stats["queued"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queued)
+            return waiter
+
+    def _give_up(self, waiter, start_time):
+        """Leaves the queue after a timeout, unless the slot was granted meanwhile. Returns whether it was."""
+
+        with self._lock:
+            if not waiter.granted:
+                waiter.cancelled = True
+                self._queued -= 1
+                self._stats["timed_out"] += 1
+        self._record_wait(start_time)
+
+        return waiter.granted
+
+    def _record_wait(self, start_time):
+        wait_ms = (time.monotonic() - start_time) * 1000
+        with self._lock:
+            self._stats["total_wait_ms"] += wait_ms
+            self._stats["max_wait_ms"] = max(self._stats["max_wait_ms"], wait_ms)
+
+    def acquire(self, agent_name, max_wait_s=None):
+        """
+        Waits for a generation slot. Every granted slot must be released.
+
+        Args:
+            agent_name (str): The agent type of the call (its priority).
+            max_wait_s (float, optional): Maximum wait, if lower than OLLAMA_QUEUE_TIMEOUT_S.
+        Returns:
+            bool: Whether the slot was granted (False if the queue is full or the wait timed out).
+        """
+
+        start_time = time.monotonic()
+        waiter = self._admit(agent_name)
+        if waiter is None or waiter is False:
+            return waiter is None
+
+        if waiter.event.wait(self._get_queue_timeout(max_wait_s)):
+            self._record_wait(start_time)
+            return True
+
+        return self._give_up(waiter, start_time)
+
+    async def aacquire(self, agent_name, max_wait_s=None):
+        """Async variant of acquire: the wait does not block the event loop."""
+
+        start_time = time.monotonic()
+        waiter = self._admit(agent_name, asyncio.get_running_loop())
+        if waiter is None or waiter is False:
+            return waiter is None
+
+        try:
+            await asyncio.wait_for(waiter.future, self._get_queue_timeout(max_wait_s))
+        except asyncio.TimeoutError:
+            return self._give_up(waiter, start_time)
+        except asyncio.CancelledError:
+            if self._give_up(waiter, start_time): # The caller is gone, the slot goes to the next one
+                self.release()
+            raise
+
+        self._record_wait(start_time)
+        return True
+
+    def release(self):
+        """Releases a generation slot, handing it to the first waiting call if any."""
+
+        with self._lock:
+            while self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                if waiter.cancelled:
+                    continue
+                waiter.granted = True
+                self._queued -= 1
+                self._stats["admitted"] += 1
+                waiter.notify()
+                return
+
+            self._active -= 1
+
+    def get_stats(self):
+        """
+        Returns the generations running and waiting, and the admission counters.
+
+        Returns:
+            dict: Active and queued calls (queue depth), admitted, queued, rejected and
+                timed out calls, and the average and maximum wait (ms).
+        """
+
+        with self._lock:
+            stats = dict(self._stats, active=self._active, queue_depth=self._queued)
+
+        waits = stats["admitted"] + stats["timed_out"]
+        stats["avg_wait_ms"] = stats.pop("total_wait_ms") / waits if waits else 0.0
+        return stats
+
+llm_scheduler = LLMScheduler() # Process-wide scheduler of the Ollama generations
@@ -1,7 +1,12 @@
+import asyncio, concurrent.futures, threading, time
 from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
 from kusibot.chatbot.conversation_agent import ConversationAgent
 from kusibot.chatbot.assesment_agent import AssesmentAgent
+from kusibot.chatbot.llm_deadlines import llm_deadlines
+from kusibot.chatbot.turn_speculation import turn_speculation
+from kusibot.chatbot.turn_timing import turn_timings
 from kusibot.database.db_repositories import AssessmentRepository
+from kusibot.database.db import run_db
 
 class ChatbotManagerAgent:
     """
@@ -12,6 +17,10 @@ class ChatbotManagerAgent:
     - ConversationAgent: Generates a response to the user input for "NORMAL" intents.
     - AssesmentAgent: Generates a response to the user input for the rest of the intents and start and assesment.
 
+    With CHATBOT_SPECULATIVE=1, the turns without an active assessment start the conversation agent
+    (history fetch and generation) at the same time as the intent classification, and cancel it
+    if the intent starts an assessment (see TurnSpeculation). Streamed turns are not speculated.
+
     Attributes:
         intent_recognizer (IntentRecognizerAgent): The shared singleton instance
             of the intent classification agent.
@@ -46,7 +55,8 @@ class ChatbotManagerAgent:
             response: JSON chatbot response.
         """
         
-        assesment_active = self.assessment_repo.is_assessment_active(user_id)
+        with turn_timings.stage("assessment_check"):
+            assesment_active = self.assessment_repo.is_assessment_active(user_id)
 
         response = {
             "intent_detected": None,
@@ -67,6 +77,135 @@ class ChatbotManagerAgent:
             
         return response
             
+    async def agenerate_bot_response(self, user_input, user_id, conv_id):
+        """
+        Async variant of generate_bot_response: the LLM call is awaited and the blocking
+        database access and BERT inference are offloaded to threads.
+        
+        Args:
+            user_input: The message sent by the user.
+            user_id: ID of the user sending the message.
+            conv_id: ID of the current conversation.
+        Returns:
+            response: JSON chatbot response.
+        """
+
+        response = {
+            "intent_detected": None,
+            "agent_response": None,
+            "agent_type": self.CHATBOT_ASSESSMENT_AGENT_TYPE
+        } # By default, response is when assessment is active.
+
+        with turn_timings.stage("assessment_check"):
+            assesment_active = await run_db(self.assessment_repo.is_assessment_active, user_id)
+
+        if assesment_active:
+            response["agent_response"] = await self.assesment_agent.agenerate_response(user_input, conv_id)
+            return response
+
+        if turn_speculation.enabled:
+            return await self._ahandle_response_speculatively(user_input, conv_id, response)
+
+        with turn_timings.stage("intent"):
+            intent, confidence = await asyncio.to_thread(self.intent_recognizer.predict_intent, user_input)
+        response["intent_detected"] = intent
+
+        if self._should_start_assessment(intent, confidence):
+            response["agent_response"] = await self.assesment_agent.agenerate_response(user_input, conv_id, intent)
+        else:
+            response["agent_response"] = await self.conversation_agent.agenerate_response(user_input, conv_id, intent)
+            response["agent_type"] = self.CHATBOT_CONVERSATION_AGENT_TYPE
+
+        return response
+
+    async def _ahandle_response_speculatively(self, user_input, conv_id, response):
+        """
+        Async variant of _handle_response_speculatively: the speculative generation is a task
+        running while the intent is classified in a thread.
+
+        Args:
+            user_input: The message sent by the user.
+            conv_id: ID of the current conversation.
+            response: The JSON chatbot response to fill.
+        Returns:
+            response: JSON chatbot response.
+        """
+
+        start_time = time.monotonic()
+        intent_future = asyncio.get_running_loop().create_future() # The intent, for the response cache of the speculation
+        speculation = asyncio.create_task(
+            turn_speculation.atimed(self.conversation_agent.aspeculate_response(user_input, conv_id, intent_future)))
+
+        try:
+            with turn_timings.stage("intent"):
+                intent, confidence = await asyncio.to_thread(self.intent_recognizer.predict_intent, user_input)
+        except BaseException:
+            speculation.cancel()
+            raise
+        intent_time = time.monotonic() - start_time
+        response["intent_detected"] = intent
+
+        if self._should_start_assessment(intent, confidence):
+            speculation.cancel()
+            await asyncio.gather(speculation, return_exceptions=True) # Waits for the history fetch to end
+            turn_speculation.record_wasted()
+            response["agent_response"] = await self.assesment_agent.agenerate_response(user_input, conv_id, intent)
+        else:
+            intent_future.set_result(intent)
+            response["agent_response"], generation_time = await speculation
+            turn_speculation.record_used(intent_time + generation_time, time.monotonic() - start_time)
+            response["agent_type"] = self.CHATBOT_CONVERSATION_AGENT_TYPE
+
+        return response
+
+    def stream_bot_response(self, user_input, user_id, conv_id):
+        """
+        Orchestrates agents like generate_bot_response, but the response of the chosen agent is streamed.
+        The intent detection and the choice of agent happen before any chunk is produced.
+        
+        Args:
+            user_input: The message sent by the user.
+            user_id: ID of the user sending the message.
+            conv_id: ID of the current conversation.
+        Returns:
+            response: JSON chatbot response whose agent_response is an iterator over the response chunks.
+        """
+
+        response = {
+            "intent_detected": None,
+            "agent_response": None,
+            "agent_type": self.CHATBOT_ASSESSMENT_AGENT_TYPE
+        } # By default, response is when assessment is active.
+
+        if self.assessment_repo.is_assessment_active(user_id):
+            response["agent_response"] = self.assesment_agent.stream_response(user_input, conv_id)
+            return response
+
+        intent, confidence = self.intent_recognizer.predict_intent(user_input)
+        response["intent_detected"] = intent
+
+        if self._should_start_assessment(intent, confidence):
+            response["agent_response"] = self.assesment_agent.stream_response(user_input, conv_id, intent)
+        else:
+            response["agent_response"] = self.conversation_agent.stream_response(user_input, conv_id, intent)
+            response["agent_type"] = self.CHATBOT_CONVERSATION_AGENT_TYPE
+
+        return response
+
+    def _should_start_assessment(self, intent, confidence):
+        """
+        Checks the conditions to START an assessment: a confident, non-normal intent
+        that maps to one of the questionnaires.
+
+        Args:
+            intent: The intent detected in the user input.
+            confidence: The confidence of the detected intent.
+        Returns:
+            bool: Whether an assessment must be started.
+        """
+
+        return should_start_assessment(intent, confidence, self.assesment_agent)
+
     def _handle_response_when_no_assesment(self, user_input, conversation_id):
         """
         Handles the response generation when there is no active assessment.
@@ -79,9 +218,13 @@ class ChatbotManagerAgent:
             agent_response: JSON response containing the intent detected, response generated, and agent type.
         """
         
+        if turn_speculation.enabled:
+            return self._handle_response_speculatively(user_input, conversation_id)
+
         # If there is no current assessment, we need to get the intent of the user input.
         # To know if we need to start an assessment or just return a normal response.
-        intent, confidence = self.intent_recognizer.predict_intent(user_input)
+        with turn_timings.stage("intent"):
+            intent, confidence = self.intent_recognizer.predict_intent(user_input)
         
         agent_response = {
             "intent_detected": intent,
@@ -89,15 +232,8 @@ class ChatbotManagerAgent:
             "type": None
         }
 
-        # Check for conditions to START an assessment
-        should_start_assessment = (
-            confidence >= self.CHATBOT_CONFIDENCE_ASSESMENT_THRESHOLD and 
-            intent != "Normal" and
-            self.assesment_agent.map_intent_to_assessment(intent) is not None
-        )
-
-        # Handle the two cases based on the check above
-        if should_start_assessment:
+        # Handle the two cases based on the conditions to START an assessment
+        if self._should_start_assessment(intent, confidence):
             agent_response["response"] = self.assesment_agent.generate_response(user_input, conversation_id, intent)
             agent_response["type"] = self.CHATBOT_ASSESSMENT_AGENT_TYPE
         else:
@@ -106,3 +242,73 @@ class ChatbotManagerAgent:
         
         return agent_response
 
+    def _handle_response_speculatively(self, user_input, conversation_id):
+        """
+        Handles the response generation when there is no active assessment like _handle_response_when_no_assesment,
+        but the conversation agent starts in a worker thread while the intent is classified. If the intent
+        starts an assessment, the speculative generation is cancelled (releasing its generation slot at once)
+        and the assessment agent answers.
+
+        Args:
+            user_input: The message sent by the user.
+            conversation_id: ID of the current conversation.
+        Returns:
+            agent_response: JSON response containing the intent detected, response generated, and agent type.
+        """
+
+        start_time = time.monotonic()
+        cancel_event = threading.Event()
+        intent_future = concurrent.futures.Future() # The intent, for the response cache of the speculation
+        speculation = turn_speculation.submit(self.conversation_agent.generate_response, user_input, conversation_id,
+                                              cancel_event=cancel_event, intent_future=intent_future)
+
+        try:
+            with turn_timings.stage("intent"):
+                intent, confidence = self.intent_recognizer.predict_intent(user_input)
+        except BaseException:
+            llm_deadlines.cancel(cancel_event)
+            intent_future.set_result(None)
+            raise
+        intent_time = time.monotonic() - start_time
+
+        agent_response = {
+            "intent_detected": intent,
+            "response": None,
+            "type": None
+        }
+
+        start_assessment = self._should_start_assessment(intent, confidence)
+        if start_assessment:
+            # Frees its generation slot for the assessment. Before the intent is handed over, so the speculation never caches it
+            llm_deadlines.cancel(cancel_event)
+        intent_future.set_result(intent)
+
+        if start_assessment:
+            turn_speculation.record_wasted()
+            agent_response["response"] = self.assesment_agent.generate_response(user_input, conversation_id, intent)
+            agent_response["type"] = self.CHATBOT_ASSESSMENT_AGENT_TYPE
+        else:
+            agent_response["response"], generation_time = speculation.result()
+            turn_speculation.record_used(intent_time + generation_time, time.monotonic() - start_time)
+            agent_response["type"] = self.CHATBOT_CONVERSATION_AGENT_TYPE
+
+        return agent_response
+
+def should_start_assessment(intent, confidence, assesment_agent):
+    """
+    The conditions to START an assessment, shared by the manager agent and the intent
+    evaluation harness: a confident, non-normal intent that maps to one of the questionnaires.
+
+    Args:
+        intent: The intent detected in the user input.
+        confidence: The confidence of the detected intent.
+        assesment_agent (AssesmentAgent): The agent mapping the intent to its questionnaire.
+    Returns:
+        bool: Whether an assessment must be started.
+    """
+
+    return (
+        confidence >= ChatbotManagerAgent.CHATBOT_CONFIDENCE_ASSESMENT_THRESHOLD and
+        intent != "Normal" and
+        assesment_agent.map_intent_to_assessment(intent) is not None
+    )
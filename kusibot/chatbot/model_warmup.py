@@ -0,0 +1,103 @@
+import httpx, os, threading, time
+from kusibot.chatbot.llm_registry import llm_registry
+
+######################################################################
+# Warm-up of the models when the app starts.                         #
+# The first chat after a deploy would otherwise pay the lazy torch   #
+# initialisation of BERT and Ollama loading the model into memory,   #
+# so both happen at boot and the process is only reported ready     #
+# once they are done.                                                #
+######################################################################
+
+class ModelWarmup:
+    """
+    Warms up the intent model (dummy predictions at representative lengths) and the Ollama
+    models (a preload request, without prompt, to every backend), then sets the readiness flag.
+
+    Options (read when used): OLLAMA_WARMUP_MODELS (comma separated, "mistral" by default,
+    empty to skip Ollama) and OLLAMA_WARMUP_TIMEOUT_S (the model load can take a while).
+    A failed step is reported but does not keep the process from being ready.
+    """
+
+    DEFAULT_MODELS = "mistral"
+    DEFAULT_TIMEOUT_S = 120.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._thread = None
+        self._report = None
+
+    @property
+    def ready(self):
+        """Whether the warm-up is done (or was skipped)."""
+        return self._ready.is_set()
+
+    def skip(self):
+        """Sets the process ready without warming the models up."""
+        self._ready.set()
+
+    def _warm_up_intent_model(self):
+        from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
+        IntentRecognizerAgent().warm_up()
+
+    def _warm_up_ollama(self):
+        models = [model.strip() for model in os.getenv("OLLAMA_WARMUP_MODELS", self.DEFAULT_MODELS).split(",") if model.strip()]
+        timeout = float(os.getenv("OLLAMA_WARMUP_TIMEOUT_S", self.DEFAULT_TIMEOUT_S))
+
+        # A generate request without prompt only loads the model (kept loaded for OLLAMA_KEEP_ALIVE)
+        for base_url in llm_registry.get_base_urls():
+            for model in models:
+                response = httpx.post(f"{base_url.rstrip('/')}/api/generate",
+                                      json={"model": model, "keep_alive": llm_registry.get_keep_alive()},
+                                      timeout=timeout)
+                response.raise_for_status()
+
+    def run(self):
+        """
+        Warms the models up (blocking) and sets the process ready.
+
+        Returns:
+            dict: The duration (s) of every step and of the whole warm-up, and the steps that failed.
+        """
+
+        report = {"failed": []}
+        start_time = time.perf_counter()
+        for step, warm_up in (("intent_model", self._warm_up_intent_model), ("ollama", self._warm_up_ollama)):
+            step_start_time = time.perf_counter()
+            try:
+                warm_up()
+            except Exception as e:
+                print(f"ERROR: Warm-up of {step} failed - {e}")
+                report["failed"].append(step)
+            report[f"{step}_s"] = time.perf_counter() - step_start_time
+        report["total_s"] = time.perf_counter() - start_time
+
+        with self._lock:
+            self._report = report
+        self._ready.set()
+        print(f"Models warmed up in {report['total_s']:.2f} s (intent model {report['intent_model_s']:.2f} s, "
+              f"Ollama {report['ollama_s']:.2f} s)")
+
+        return report
+
+    def start(self):
+        """Runs the warm-up in a background thread (once per process)."""
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run, name="model-warmup", daemon=True)
+                self._thread.start()
+
+    def get_stats(self):
+        """
+        Returns the readiness and the durations of the warm-up.
+
+        Returns:
+            dict: Whether the process is ready and the warm-up report (None until it ends or if skipped).
+        """
+
+        with self._lock:
+            return {"ready": self.ready, "warmup": dict(self._report) if self._report else None}
+
+model_warmup = ModelWarmup() # Process-wide warm-up and readiness of the models
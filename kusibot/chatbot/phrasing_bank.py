@@ -0,0 +1,201 @@
+import argparse, json, os, random, threading, time
+from kusibot.chatbot.llm_registry import llm_registry
+
+######################################################################
+# Precomputed phrasings of the assessment questions.                 #
+# The questionnaire items are a fixed set, so several natural        #
+# variants of every question are generated offline (one build step)  #
+# and stored next to the questionnaires. Asking a question from the  #
+# bank costs no LLM call.                                            #
+######################################################################
+
+BANK_FORMAT_VERSION = 1
+QUESTIONNAIRES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questionnaires')
+DEFAULT_BANK_PATH = os.path.join(QUESTIONNAIRES_DIR, 'phrasing_bank.json')
+DEFAULT_VARIANTS = 5
+
+TRANSITION_FIRST = "first"
+TRANSITION_FOLLOW_UP = "follow_up"
+
+# Context given to the model for every transition: the bank phrasings must not depend on the conversation
+TRANSITION_CONTEXTS = {
+    TRANSITION_FIRST: "Bot: I would like to ask you a few questions to better understand how you have been feeling.",
+    TRANSITION_FOLLOW_UP: "Bot: Thanks for answering, let's move on to the next question."
+}
+
+PHRASING_LLM = "llm"
+PHRASING_BANK = "bank"
+PHRASING_AUTO = "auto"
+
+def get_transition(question_id):
+    """Returns the transition type of a question: the first one of the assessment or a follow-up."""
+    return TRANSITION_FIRST if question_id == 1 else TRANSITION_FOLLOW_UP
+
+def build_phrasing_bank(questionnaires, chain, variants=DEFAULT_VARIANTS):
+    """
+    Generates the phrasing variants of every question of the questionnaires.
+
+    Args:
+        questionnaires (dict): The questionnaires (as in questionnaires.json).
+        chain (Runnable): The question naturalization chain.
+        variants (int, optional): Variants generated per question.
+    Returns:
+        dict: The phrasing bank.
+    """
+
+    bank = {}
+    for assessment_type, questionnaire in questionnaires.items():
+        bank[assessment_type] = {}
+        for question in questionnaire['questions']:
+            transition = get_transition(question['id'])
+            chain_input = {
+                "question": question['question'],
+                "question_id": question['id'],
+                "context": TRANSITION_CONTEXTS[transition]
+            }
+
+            phrasings = []
+            for phrasing in chain.batch([chain_input] * variants):
+                phrasing = phrasing.strip()
+                if phrasing and phrasing not in phrasings:
+                    phrasings.append(phrasing)
+
+            bank[assessment_type][str(question['id'])] = {transition: phrasings}
+
+    return {"format_version": BANK_FORMAT_VERSION, "variants": variants, "questionnaires": bank}
+
+class PhrasingBank:
+    """
+    Process-wide store of the precomputed question phrasings, loaded from the
+    bank file the first time it is used.
+
+    The mode (QUESTION_PHRASING) chooses how the questions are asked: "llm"
+    (default) always phrases them with the model, "bank" always takes a
+    precomputed variant and "auto" takes one only while the Ollama connection
+    pool is saturated (utilisation of at least QUESTION_BANK_SATURATION).
+    A question missing from the bank is always phrased by the model.
+
+    Args:
+        path (str, optional): The bank file. Defaults to QUESTION_PHRASING_BANK or
+            questionnaires/phrasing_bank.json.
+    """
+
+    DEFAULT_SATURATION = 0.8
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._bank = None
+        self._served = 0
+        self._misses = 0
+
+    @property
+    def mode(self):
+        """The phrasing mode: llm, bank or auto."""
+        return os.getenv("QUESTION_PHRASING", PHRASING_LLM).lower()
+
+    def _load(self):
+        """Reads the bank file the first time (an empty bank if it is missing or invalid)."""
+
+        with self._lock:
+            if self._bank is None:
+                path = self.path or os.getenv("QUESTION_PHRASING_BANK", DEFAULT_BANK_PATH)
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        bank = json.load(f)
+                    if bank.get("format_version") != BANK_FORMAT_VERSION:
+                        raise ValueError(f"unsupported format version {bank.get('format_version')}")
+                    self._bank = bank["questionnaires"]
+                except FileNotFoundError:
+                    print(f"ERROR: Phrasing bank not found at {path}, build it with `poetry run kusibot-build-phrasing-bank`")
+                    self._bank = {}
+                except (ValueError, KeyError) as e:
+                    print(f"ERROR: Invalid phrasing bank {path} - {e}")
+                    self._bank = {}
+
+            return self._bank
+
+    def should_use(self):
+        """
+        Whether the questions are asked from the bank right now.
+
+        Returns:
+            bool: True in bank mode, or in auto mode while Ollama is saturated.
+        """
+
+        mode = self.mode
+        if mode == PHRASING_BANK:
+            return True
+        if mode == PHRASING_AUTO:
+            saturation = float(os.getenv("QUESTION_BANK_SATURATION", self.DEFAULT_SATURATION))
+            return llm_registry.get_utilisation() >= saturation
+
+        return False
+
+    def get_phrasing(self, assessment_type, question_id):
+        """
+        Returns a random precomputed phrasing of a question.
+
+        Args:
+            assessment_type (str): The questionnaire (e.g. PHQ-9).
+            question_id (int): The ID of the question.
+        Returns:
+            str: The phrasing, or None if the bank has none for the question.
+        """
+
+        phrasings = (self._load().get(assessment_type, {})
+                                 .get(str(question_id), {})
+                                 .get(get_transition(question_id)))
+
+        with self._lock:
+            if not phrasings:
+                self._misses += 1
+                return None
+            self._served += 1
+
+        return random.choice(phrasings)
+
+    def get_stats(self):
+        """
+        Returns the bank counters.
+
+        Returns:
+            dict: The questions served from the bank and the ones it did not have.
+        """
+
+        with self._lock:
+            return {"mode": self.mode, "served": self._served, "misses": self._misses}
+
+phrasing_bank = PhrasingBank() # Process-wide bank of question phrasings
+
+def main():
+    """Command building the phrasing bank of the assessment questions with the Ollama model."""
+
+    from kusibot.chatbot.assesment_agent import AssesmentAgent
+
+    parser = argparse.ArgumentParser(description="Precompute natural phrasings of the assessment questions.")
+    parser.add_argument("--output", default=os.getenv("QUESTION_PHRASING_BANK", DEFAULT_BANK_PATH),
+                        help="File where the bank is written (default: QUESTION_PHRASING_BANK or questionnaires/phrasing_bank.json).")
+    parser.add_argument("--variants", type=int, default=DEFAULT_VARIANTS,
+                        help=f"Variants generated per question (default: {DEFAULT_VARIANTS}).")
+    parser.add_argument("--model", default="mistral", help="Ollama model (default: mistral).")
+    args = parser.parse_args()
+
+    chain = llm_registry.get_chain(AssesmentAgent.AGENT_NAME, AssesmentAgent.MODEL_PROMPT_QUESTION, args.model)
+    if chain is None:
+        raise SystemExit("ERROR: Ollama is not available")
+
+    with open(os.path.join(QUESTIONNAIRES_DIR, 'questionnaires.json'), 'r', encoding='utf-8') as f:
+        questionnaires = json.load(f)
+
+    start_time = time.perf_counter()
+    bank = build_phrasing_bank(questionnaires, chain, args.variants)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(bank, f, indent=2, ensure_ascii=False)
+
+    phrasings = sum(len(variants) for questions in bank["questionnaires"].values()
+                    for transitions in questions.values() for variants in transitions.values())
+    print(f"Phrasing bank written to {args.output} ({phrasings} phrasings) in {time.perf_counter() - start_time:.1f} s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+import asyncio, os, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from kusibot.chatbot.llm_deadlines import llm_deadlines
+
+class QuestionPrefetcher:
+    """
+    Background naturalization of the next assessment question. Once the free text answer
+    of question N arrives, question N+1 is fully determined, so its LLM phrasing is started
+    in a thread while the user picks an option, and cached by (assessment, question).
+
+    Options (read when used): QUESTION_PREFETCH ("0" disables it), QUESTION_PREFETCH_TTL_S
+    (age after which a prefetched question is stale) and QUESTION_PREFETCH_WORKERS.
+
+    Args:
+        max_entries (int): Maximum number of prefetched questions kept (the oldest are dropped).
+    """
+
+    DEFAULT_TTL_S = 300
+    DEFAULT_WORKERS = 2
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._entries = OrderedDict()
+        self._submitted = 0
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+        self._failures = 0
+
+    @property
+    def enabled(self):
+        """Whether the next questions are prefetched."""
+        return os.getenv("QUESTION_PREFETCH", "1") == "1"
+
+    def _get_executor(self):
+        """Returns the worker threads, recreated after a fork (called with the lock held)."""
+
+        if self._executor is None or self._pid != os.getpid():
+            workers = int(os.getenv("QUESTION_PREFETCH_WORKERS", self.DEFAULT_WORKERS))
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="question-prefetch")
+            self._pid = os.getpid()
+            self._entries.clear()
+
+        return self._executor
+
+    def submit(self, assessment_id, question_id, agent_name, chain, chain_input):
+        """
+        Starts naturalizing a question in the background. It waits for a slot of the LLM
+        scheduler with the (lower) prefetch priority, within the deadline of the agent type.
+
+        Args:
+            assessment_id: The ID of the assessment.
+            question_id: The ID of the question to naturalize.
+            agent_name (str): The agent type of the chain.
+            chain (Runnable): The question naturalization chain.
+            chain_input (dict): The prompt variables of the question.
+        """
+
+        with self._lock:
+            future = self._get_executor().submit(llm_deadlines.invoke, agent_name, chain, chain_input,
+                                                 fallback=None, queue_as="prefetch")
+            self._entries[(assessment_id, question_id)] = (future, time.monotonic())
+            self._entries.move_to_end((assessment_id, question_id))
+            while len(self._entries) > self.max_entries:
+                _, (oldest, _) = self._entries.popitem(last=False)
+                oldest.cancel()
+            self._submitted += 1
+
+    def _pop(self, assessment_id, question_id):
+        """Removes and returns the future of a question if it is still fresh, counting the outcome."""
+
+        ttl = float(os.getenv("QUESTION_PREFETCH_TTL_S", self.DEFAULT_TTL_S))
+        with self._lock:
+            entry = self._entries.pop((assessment_id, question_id), None)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            future, submitted_at = entry
+            if time.monotonic() - submitted_at > ttl:
+                future.cancel()
+                self._stale += 1
+                return None
+
+            return future
+
+    def _record_result(self, future):
+        """Returns the result of a finished prefetch, or None if it failed (or was not generated in time)."""
+
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"ERROR: Prefetching the next assessment question failed - {e}")
+            result = None
+
+        if result is None:
+            with self._lock:
+                self._failures += 1
+            return None
+
+        with self._lock:
+            self._hits += 1
+        return result
+
+    def get(self, assessment_id, question_id):
+        """
+        Returns the prefetched question, waiting for it if it is still being generated
+        (it started earlier than a new generation would).
+
+        Args:
+            assessment_id: The ID of the assessment.
+            question_id: The ID of the question.
+        Returns:
+            str: The naturalized question, or None on a miss, if it is stale or it failed.
+        """
+
+        future = self._pop(assessment_id, question_id)
+        if future is None:
+            return None
+
+        return self._record_result(future)
+
+    async def aget(self, assessment_id, question_id):
+        """Async variant of get: an unfinished generation is awaited without holding a thread."""
+
+        future = self._pop(assessment_id, question_id)
+        if future is None:
+            return None
+
+        try:
+            await asyncio.wrap_future(future)
+        except Exception:
+            pass # Recorded below
+
+        return self._record_result(future)
+
+    def get_stats(self):
+        """
+        Returns the prefetch counters.
+
+        Returns:
+            dict: Submitted, pending, hits, misses, stale and failed prefetches.
+        """
+
+        with self._lock:
+            return {
+                "submitted": self._submitted,
+                "pending": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "stale": self._stale,
+                "failures": self._failures
+            }
+
+question_prefetcher = QuestionPrefetcher() # Process-wide prefetcher of assessment questions
@@ -0,0 +1,158 @@
+import hashlib, os, threading, time, torch
+from collections import OrderedDict
+from kusibot.chatbot.context_window import format_turn
+
+######################################################################
+# Semantic cache of the conversation replies.                        #
+# Opening turns are mostly near-identical greetings and small talk,  #
+# so the reply generated for one is served again to a similar        #
+# message (cosine similarity of their BERT embeddings) while the     #
+# conversation has no user messages yet, without calling the LLM.    #
+######################################################################
+
+class SemanticResponseCache:
+    """
+    Bounded cache of conversation replies keyed on the embedding of the user message and a
+    fingerprint of the context (the prompt history and the detected intent).
+
+    Only short messages (RESPONSE_CACHE_MAX_WORDS) with a trivial context (no user message in
+    the history, e.g. the first turn after the greeting of the chatbot) are looked up and stored.
+    A stored reply is served if the similarity of the messages reaches RESPONSE_CACHE_THRESHOLD.
+
+    Options (read when used): RESPONSE_CACHE ("1" enables it), RESPONSE_CACHE_SIZE (least
+    recently used replies are evicted), RESPONSE_CACHE_TTL_S and RESPONSE_CACHE_THRESHOLD.
+    The embeddings are the pooled output of the intent model (IntentRecognizerAgent.embed_text).
+    """
+
+    DEFAULT_SIZE = 256
+    DEFAULT_TTL_S = 3600
+    DEFAULT_THRESHOLD = 0.97
+    DEFAULT_MAX_WORDS = 12
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # Key -> (embedding, context key, reply, stored at)
+        self._next_key = 0
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def enabled(self):
+        """Whether the replies are cached."""
+        return os.getenv("RESPONSE_CACHE", "0") == "1"
+
+    def get_context_key(self, text, chain_input, intent=None):
+        """
+        Returns the fingerprint of the context of a turn, if the turn can use the cache.
+
+        Args:
+            text (str): The user's input text.
+            chain_input (dict): The prompt variables of the conversation agent.
+            intent (str, optional): The detected intent of the user's input.
+        Returns:
+            str: The context fingerprint, or None if the message is not short or the context not trivial.
+        """
+
+        if not self.can_cache(text, chain_input):
+            return None
+
+        return hashlib.sha256(f"{intent}\n{chain_input['chat_history']}".encode("utf-8")).hexdigest()
+
+    def can_cache(self, text, chain_input):
+        """Whether a turn uses the cache: the message is short and the context trivial (no user message)."""
+
+        if not self.enabled or len(text.split()) > int(os.getenv("RESPONSE_CACHE_MAX_WORDS", self.DEFAULT_MAX_WORDS)):
+            return False
+
+        user_prefix = format_turn(True, "")
+        return not any(line.startswith(user_prefix) for line in chain_input["chat_history"].splitlines())
+
+    def embed(self, text):
+        """Returns the embedding of a message (None if the intent model is not loaded in this process)."""
+
+        from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
+        return IntentRecognizerAgent().embed_text(text)
+
+    def _expire(self, now):
+        """Drops the replies older than the TTL (called with the lock held)."""
+
+        ttl_s = float(os.getenv("RESPONSE_CACHE_TTL_S", self.DEFAULT_TTL_S))
+        expired = [key for key, (_, _, _, stored_at) in self._entries.items() if now - stored_at > ttl_s]
+        for key in expired:
+            del self._entries[key]
+        self._expirations += len(expired)
+
+    def get(self, embedding, context_key):
+        """
+        Returns the stored reply of the most similar message with the same context, marking it as recently used.
+
+        Args:
+            embedding (torch.Tensor): The normalized embedding of the user's message.
+            context_key (str): The context fingerprint.
+        Returns:
+            str: The stored reply, or None on a miss.
+        """
+
+        threshold = float(os.getenv("RESPONSE_CACHE_THRESHOLD", self.DEFAULT_THRESHOLD))
+        with self._lock:
+            self._expire(time.monotonic())
+
+            best_key, best_similarity = None, threshold
+            for key, (entry_embedding, entry_context_key, _, _) in self._entries.items():
+                if entry_context_key != context_key:
+                    continue
+                similarity = float(torch.dot(entry_embedding, embedding))
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+
+            if best_key is None:
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(best_key)
+            self._hits += 1
+            return self._entries[best_key][2]
+
+    def put(self, embedding, context_key, reply):
+        """
+        Stores a reply, evicting the least recently used one if the cache is full.
+
+        Args:
+            embedding (torch.Tensor): The normalized embedding of the user's message.
+            context_key (str): The context fingerprint.
+            reply (str): The generated reply.
+        """
+
+        max_size = max(1, int(os.getenv("RESPONSE_CACHE_SIZE", self.DEFAULT_SIZE)))
+        with self._lock:
+            self._entries[self._next_key] = (embedding, context_key, reply, time.monotonic())
+            self._next_key += 1
+            self._stores += 1
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def get_stats(self):
+        """
+        Returns the size and hit/miss counters of the cache.
+
+        Returns:
+            dict: The cache statistics.
+        """
+
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "stores": self._stores,
+                "evictions": self._evictions,
+                "expirations": self._expirations
+            }
+
+response_cache = SemanticResponseCache() # Process-wide cache of the conversation replies
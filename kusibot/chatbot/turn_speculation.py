@@ -0,0 +1,120 @@
+import os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from kusibot.chatbot.turn_timing import turn_timings
+
+######################################################################
+# Speculative chat turns.                                            #
+# Most turns without an active assessment end in the conversation    #
+# agent, so its history fetch and generation start at the same time  #
+# as the intent classification instead of after it. The speculation  #
+# is cancelled when the intent starts an assessment instead.         #
+######################################################################
+
+class TurnSpeculation:
+    """
+    Runs the speculative conversation generations of the chat turns (CHATBOT_SPECULATIVE=1)
+    and measures them: the time saved on the turns where the speculation was used and the
+    rate of wasted (cancelled) speculations.
+
+    The sync generations run in worker threads (CHATBOT_SPECULATIVE_WORKERS), each one in its
+    own app context so it does not share the database session of the turn.
+    """
+
+    DEFAULT_WORKERS = 8
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._turns = 0
+        self._wasted = 0
+        self._saved_s = 0.0
+
+    @property
+    def enabled(self):
+        """Whether the chat turns are speculated."""
+        return os.getenv("CHATBOT_SPECULATIVE", "0") == "1"
+
+    def _get_executor(self):
+        """Returns the worker threads, recreated after a fork (called with the lock held)."""
+
+        if self._executor is None or self._pid != os.getpid():
+            workers = int(os.getenv("CHATBOT_SPECULATIVE_WORKERS", self.DEFAULT_WORKERS))
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="turn-speculation")
+            self._pid = os.getpid()
+
+        return self._executor
+
+    def submit(self, func, *args, **kwargs):
+        """
+        Starts a speculative generation in a worker thread.
+
+        Args:
+            func: The generation function (e.g. ConversationAgent.generate_response).
+            *args, **kwargs: Arguments of the function.
+        Returns:
+            Future: The response and the time it took (s).
+        """
+
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def run():
+            start_time = time.monotonic()
+            if app is None:
+                response = func(*args, **kwargs)
+            else:
+                with app.app_context():
+                    response = func(*args, **kwargs)
+            return response, time.monotonic() - start_time
+
+        with self._lock:
+            return self._get_executor().submit(turn_timings.bind(run)) # Its stages are timed as part of the turn
+
+    async def atimed(self, awaitable):
+        """Awaits a speculative async generation. Returns the response and the time it took (s)."""
+
+        start_time = time.monotonic()
+        response = await awaitable
+        return response, time.monotonic() - start_time
+
+    def record_used(self, sequential_s, turn_s):
+        """
+        Counts a turn answered by its speculation.
+
+        Args:
+            sequential_s (float): Time the turn stages take one after the other (classification and generation).
+            turn_s (float): Time the turn took.
+        """
+
+        with self._lock:
+            self._turns += 1
+            self._saved_s += max(sequential_s - turn_s, 0.0)
+
+    def record_wasted(self):
+        """Counts a turn whose speculation was cancelled."""
+
+        with self._lock:
+            self._turns += 1
+            self._wasted += 1
+
+    def get_stats(self):
+        """
+        Returns the speculation counters.
+
+        Returns:
+            dict: Speculated turns, wasted speculations and their rate, and the total and
+                average time saved (ms) on the turns that used their speculation.
+        """
+
+        with self._lock:
+            used = self._turns - self._wasted
+            return {
+                "turns": self._turns,
+                "wasted": self._wasted,
+                "wasted_rate": self._wasted / self._turns if self._turns else 0.0,
+                "saved_ms": self._saved_s * 1000,
+                "avg_saved_ms": self._saved_s * 1000 / used if used else 0.0
+            }
+
+turn_speculation = TurnSpeculation() # Process-wide speculation of the chat turns
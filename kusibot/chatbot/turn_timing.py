@@ -0,0 +1,179 @@
+import bisect, contextvars, threading, time
+from contextlib import contextmanager
+
+######################################################################
+# Latency breakdown of the chat turns.                               #
+# Every stage of a turn (assessment check, intent, history, LLM      #
+# queue and generation, message commits) records its duration in     #
+# the timer of the turn, which is sent back in the Server-Timing     #
+# header and added to in-process histograms per stage.               #
+######################################################################
+
+# Timer of the turn being served. Async tasks and asyncio.to_thread copy it, so the stages
+# run by them (e.g. the database access of run_db) are recorded into the same turn.
+_current_timer = contextvars.ContextVar("turn_timer", default=None)
+
+class TurnTimer:
+    """
+    Durations (s) of the stages of a chat turn, in the order they were first recorded. A stage
+    run more than once in the turn adds up; speculative stages may overlap with the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock() # Speculative stages record from worker threads
+        self.start_time = time.perf_counter()
+        self.total_s = None
+        self.stages = {}
+
+    def record(self, stage, seconds):
+        """Adds the duration of a stage."""
+
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def get_server_timing(self):
+        """
+        Returns the Server-Timing header value of the turn.
+
+        Returns:
+            str: The duration (ms) of every stage and of the whole turn (e.g. "intent;dur=12.5, total;dur=950.1").
+        """
+
+        with self._lock:
+            metrics = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items()]
+        if self.total_s is not None:
+            metrics.append(f"total;dur={self.total_s * 1000:.1f}")
+
+        return ", ".join(metrics)
+
+class TurnTimings:
+    """
+    Times the stages of the chat turns and keeps a histogram of the durations of every stage.
+
+    A stage outside a timed turn (e.g. a background prefetch or the model warm-up) is not
+    recorded, so the instrumented code runs the same with the timing disabled (TURN_TIMING).
+    """
+
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 60000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    @contextmanager
+    def turn(self, enabled=True):
+        """
+        Times a chat turn: the stages run inside are recorded into its timer.
+
+        Args:
+            enabled (bool): Whether to time the turn (if not, the timer yielded is None).
+        Yields:
+            TurnTimer | None: The timer of the turn, with its total set once the turn ends.
+        """
+
+        if not enabled:
+            yield None
+            return
+
+        timer = TurnTimer()
+        token = _current_timer.set(timer)
+        try:
+            yield timer
+        finally:
+            _current_timer.reset(token)
+            timer.total_s = time.perf_counter() - timer.start_time
+            self._observe(timer)
+
+    @contextmanager
+    def stage(self, name):
+        """Times the code inside as a stage of the current turn (if any)."""
+
+        timer = _current_timer.get()
+        if timer is None:
+            yield
+            return
+
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            timer.record(name, time.perf_counter() - start_time)
+
+    def record(self, name, seconds):
+        """Adds a duration (s) measured by the caller to a stage of the current turn (if any)."""
+
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.record(name, seconds)
+
+    def bind(self, func):
+        """
+        Binds a function to the timer of the current turn, for worker threads (which do not
+        inherit it) running stages of the turn.
+
+        Args:
+            func: The function run by the worker thread.
+        Returns:
+            The function, recording its stages into the turn (unchanged if no turn is timed).
+        """
+
+        timer = _current_timer.get()
+        if timer is None:
+            return func
+
+        def run(*args, **kwargs):
+            token = _current_timer.set(timer)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current_timer.reset(token)
+
+        return run
+
+    def _observe(self, timer):
+        """Adds the stages and the total of a finished turn to the histograms."""
+
+        durations = dict(timer.stages)
+        durations["total"] = timer.total_s
+        with self._lock:
+            for stage, seconds in durations.items():
+                histogram = self._histograms.setdefault(stage, {"count": 0, "sum_ms": 0.0, "max_ms": 0.0,
+                                                                "buckets": [0] * (len(self.BUCKETS_MS) + 1)})
+                duration_ms = seconds * 1000
+                histogram["count"] += 1
+                histogram["sum_ms"] += duration_ms
+                histogram["max_ms"] = max(histogram["max_ms"], duration_ms)
+                histogram["buckets"][bisect.bisect_left(self.BUCKETS_MS, duration_ms)] += 1
+
+    def _get_percentile(self, histogram, percentile):
+        """Returns the upper bound (ms) of the bucket holding a percentile (the max if beyond the last bucket)."""
+
+        rank = percentile * histogram["count"]
+        seen = 0
+        for bound, count in zip(self.BUCKETS_MS, histogram["buckets"]):
+            seen += count
+            if seen >= rank:
+                return float(min(bound, histogram["max_ms"]))
+        return histogram["max_ms"]
+
+    def get_stats(self):
+        """
+        Returns the latency distribution of every stage of the timed turns.
+
+        Returns:
+            dict: Per stage, the turns that ran it, the mean, p50, p95 (bucket upper bounds) and max
+                latency in ms, and the count per bucket ("<=bound" in ms, and ">last bound").
+        """
+
+        with self._lock:
+            return {stage: {
+                "count": histogram["count"],
+                "mean_ms": histogram["sum_ms"] / histogram["count"],
+                "p50_ms": self._get_percentile(histogram, 0.50),
+                "p95_ms": self._get_percentile(histogram, 0.95),
+                "max_ms": histogram["max_ms"],
+                "buckets": {**{f"<={bound}": count for bound, count in zip(self.BUCKETS_MS, histogram["buckets"])},
+                            f">{self.BUCKETS_MS[-1]}": histogram["buckets"][-1]}
+            } for stage, histogram in self._histograms.items()}
+
+turn_timings = TurnTimings() # Process-wide timing of the chat turns
@@ -1,6 +1,7 @@
+from flask import has_app_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-import os
+import asyncio, os
 
 #########################################
 # SQLAlchemy DB initialization
@@ -12,6 +13,27 @@ db = SQLAlchemy()
 # Creating Migrate instance
 migrate = Migrate()
 
+async def run_db(func, *args):
+    """
+    Runs blocking database work from async code in a thread. The session is closed afterwards,
+    so its connection goes back to the pool instead of being held while the caller awaits the LLM.
+
+    Args:
+        func: The function accessing the database.
+        *args: Arguments of the function.
+    Returns:
+        The result of the function.
+    """
+
+    def run():
+        try:
+            return func(*args)
+        finally:
+            if has_app_context():
+                db.session.close()
+
+    return await asyncio.to_thread(run)
+
 def init_db(app):
     """
     Initialising DB (SQLAlchemy) with Flask app.
@@ -1,5 +1,5 @@
 from kusibot.database.db import db
-from kusibot.database.models import Conversation, Message, Assessment, AssessmentQuestion, User
+from kusibot.database.models import Conversation, ConversationSummary, Message, Assessment, AssessmentQuestion, User
 from sqlalchemy import func
 from datetime import datetime, timezone
 
@@ -200,6 +200,46 @@ class ConversationRepository:
             db.session.rollback()
             return []
 
+    def get_summary(self, conv_id):
+        """
+        Retrieve the rolling summary of the older messages of a conversation.
+
+        Args:
+            conv_id: The ID of the conversation.
+        Returns:
+            ConversationSummary: The summary object if found, otherwise None.
+        """
+
+        try:
+            return db.session.query(ConversationSummary).filter_by(conversation_id=conv_id).first()
+        except Exception as e:
+            print(f"Error retrieving conversation summary: {e}")
+            db.session.rollback()
+            return None
+
+    def save_summary(self, conv_id, text, summarized_until):
+        """
+        Create or replace the rolling summary of a conversation.
+
+        Args:
+            conv_id: The ID of the conversation.
+            text: The summary text.
+            summarized_until: The ID of the last message included in the summary.
+        """
+
+        try:
+            summary = self.get_summary(conv_id)
+            if not summary:
+                summary = ConversationSummary(conversation_id=conv_id)
+                db.session.add(summary)
+            summary.text = text
+            summary.summarized_until = summarized_until
+            summary.updated_at = datetime.now(timezone.utc)
+            db.session.commit()
+        except Exception as e:
+            print(f"Error saving conversation summary: {e}")
+            db.session.rollback()
+
 class MessageRepository:
     """Manages all data access logic for the Message model."""
 
@@ -294,7 +334,25 @@ class MessageRepository:
             print(f"Error retrieving messages: {e}")
             db.session.rollback()
             return []
-    
+
+    def get_user_messages_with_intent(self):
+        """
+        Retrieve all user messages with a detected intent, ordered by timestamp.
+
+        Returns:
+            list: A list of Message objects.
+        """
+
+        try:
+            return db.session.query(Message)\
+                             .filter(Message.is_user.is_(True), Message.intent.isnot(None))\
+                             .order_by(Message.timestamp)\
+                             .all()
+        except Exception as e:
+            print(f"Error retrieving messages with intent: {e}")
+            db.session.rollback()
+            return []
+
 class AssessmentRepository:
     """Manages all data access logic for the Assessment model."""
 
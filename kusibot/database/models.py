@@ -59,6 +59,7 @@ class Conversation(db.Model):
         created_at (datetime): Conversation creation date.
         finished_at (datetime): Conversation finish date.
         messages (Relationship): Relationship with the Message model.
+        summary (Relationship): Relationship with the ConversationSummary model (if any).
     """
 
     id = db.Column(db.Integer, primary_key=True)
@@ -66,11 +67,35 @@ class Conversation(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
     finished_at = db.Column(db.DateTime, nullable=True)
     messages = db.relationship('Message', backref='conversation', lazy=True)
+    summary = db.relationship('ConversationSummary', backref='conversation', uselist=False, lazy=True)
 
     def __repr__(self):
         """Represents in a string the essential attributes of a Conversation object."""
         return f'<Conversation {self.id!r}. User: {self.user_id!r}. Created at: {self.created_at!r}>'
 
+class ConversationSummary(db.Model):
+    """
+    ConversationSummary model for the database.
+    Rolling summary of the older messages of a conversation, standing in for them in the LLM context.
+
+    Attributes:
+        id (int): Summary ID.
+        conversation_id (int): Conversation ID that the summary belongs to.
+        text (str): Summary text.
+        summarized_until (int): ID of the last message included in the summary.
+        updated_at (datetime): Summary last update date.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.Integer, db.ForeignKey('conversation.id'), unique=True, nullable=False)
+    text = db.Column(db.Text, nullable=False)
+    summarized_until = db.Column(db.Integer, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+
+    def __repr__(self):
+        """Represents in a string the essential attributes of a ConversationSummary object."""
+        return f'<ConversationSummary {self.id!r}. Conversation: {self.conversation_id!r}. Summarized until: {self.summarized_until!r}>'
+
 class Message(db.Model):
     """
     Message model for the database.
@@ -1,5 +1,7 @@
 from kusibot.database.db_repositories import ConversationRepository, MessageRepository, AssessmentRepository
+from kusibot.database.db import run_db
 from kusibot.chatbot import ChatbotManagerAgent
+from kusibot.chatbot.turn_timing import turn_timings
 
 class ChatbotService:
     """Service class for handling chatbot interactions.
@@ -87,17 +89,40 @@ class ChatbotService:
         # Response generation based on whether an assessment is active or not
         bot_response = user_agent.generate_bot_response(user_input, user_id, current_conv.id)
 
-        # Saving user message first
-        self.msg_repo.save_user_message(conv_id=current_conv.id,
-                                        msg=user_input,
-                                        intent=bot_response["intent_detected"])
+        self._save_turn(current_conv.id, user_input, bot_response)
+            
+        return {
+            "agent_response": bot_response["agent_response"],
+            "agent_type": bot_response["agent_type"],
+            "intent_detected": bot_response["intent_detected"]
+        }
 
-        # Storing bot response after
-        self.msg_repo.save_chatbot_message(conv_id=current_conv.id,
-                                           msg=bot_response["agent_response"],
-                                           intent=None,
-                                           agent_type=bot_response["agent_type"]
-        )
+    async def aget_response(self, user_input, user_id):
+        """
+        Async variant of get_response: the agents' LLM calls are awaited (in the event loop of the
+        async views, see AsyncViewLoop), and the database access is offloaded to threads.
+        
+        Args:
+            user_input: The message sent by the user.
+            user_id: ID of the user making the request.
+        Returns:
+            response: The chatbot's response to the user's input.
+        """
+
+        # Get the current conversation for the user
+        current_conv = await run_db(self.conv_repo.get_current_conversation_by_user_id, user_id)
+        
+        # If there is no current conversation, create a new one
+        if not current_conv:
+            return self.CHATBOT_NO_CONVERSATION
+        
+        # Get the correct chatbot manager for the user.
+        user_agent = self._get_or_create_chatbot_manager(user_id)
+
+        # Response generation based on whether an assessment is active or not
+        bot_response = await user_agent.agenerate_bot_response(user_input, user_id, current_conv.id)
+
+        await run_db(self._save_turn, current_conv.id, user_input, bot_response)
             
         return {
             "agent_response": bot_response["agent_response"],
@@ -105,6 +130,77 @@ class ChatbotService:
             "intent_detected": bot_response["intent_detected"]
         }
 
+    def stream_response(self, user_input, user_id):
+        """
+        Generates a response from the chatbot like get_response, but streamed as the agents produce it.
+        Both messages are stored when the stream ends (with the response produced so far if the
+        client disconnects before).
+        
+        Args:
+            user_input: The message sent by the user.
+            user_id: ID of the user making the request.
+        Yields:
+            event: A "meta" event with the agent type and intent detected, a "token" event for every
+                response chunk and a final "done" event with the full response.
+        """
+
+        # Get the current conversation for the user
+        current_conv = self.conv_repo.get_current_conversation_by_user_id(user_id)
+        
+        if not current_conv:
+            yield {"event": "done", "response": self.CHATBOT_NO_CONVERSATION}
+            return
+        
+        # Get the correct chatbot manager for the user.
+        user_agent = self._get_or_create_chatbot_manager(user_id)
+
+        # Intent detection and agent choice happen here, before the first chunk
+        bot_response = user_agent.stream_bot_response(user_input, user_id, current_conv.id)
+        yield {
+            "event": "meta",
+            "agent_type": bot_response["agent_type"],
+            "intent": bot_response["intent_detected"]
+        }
+
+        chunks = []
+        try:
+            for chunk in bot_response["agent_response"]:
+                chunks.append(chunk)
+                yield {"event": "token", "text": chunk}
+        except GeneratorExit:
+            # Client disconnected: the turn is kept with the response produced so far
+            self._save_turn(current_conv.id, user_input, {**bot_response, "agent_response": "".join(chunks)})
+            raise
+
+        bot_response["agent_response"] = "".join(chunks)
+        self._save_turn(current_conv.id, user_input, bot_response)
+
+        yield {"event": "done", "response": bot_response["agent_response"]}
+
+    def _save_turn(self, conv_id, user_input, bot_response):
+        """
+        Stores the user message and the chatbot response of a conversation turn.
+        
+        Args:
+            conv_id: ID of the current conversation.
+            user_input: The message sent by the user.
+            bot_response: The chatbot response (agent response, agent type and intent detected).
+        """
+
+        # Saving user message first
+        with turn_timings.stage("save_user"):
+            self.msg_repo.save_user_message(conv_id=conv_id,
+                                            msg=user_input,
+                                            intent=bot_response["intent_detected"])
+
+        # Storing bot response after
+        with turn_timings.stage("save_bot"):
+            self.msg_repo.save_chatbot_message(conv_id=conv_id,
+                                               msg=bot_response["agent_response"],
+                                               intent=None,
+                                               agent_type=bot_response["agent_type"]
+            )
+
     def _get_or_create_chatbot_manager(self, user_id):
         """
         Gets or creates a ChatbotManagerAgent for the user to handle chatbot interactions
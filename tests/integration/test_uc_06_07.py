@@ -1,4 +1,5 @@
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
+import json
 from kusibot.database.models import Message, Assessment
 
 # ---- Test for UC06 and UC07: Conduct a Chat Conversation and
@@ -217,6 +218,111 @@ def test_it22_ai_error_response(mock_manager_agent, db_uc_06, client):
     # 5. Logout
     standard_user_logout(client)
 
+@patch('kusibot.services.chatbot_service.ChatbotManagerAgent')
+def test_it34_streamed_response_saved_when_stream_ends(mock_manager_agent, db_uc_06, client):
+    
+    # 1. Log in a Standard user
+    standard_user_login(client)
+
+    # 2. ManagerAgent streams the response in chunks
+    mock_manager_agent_instance = mock_manager_agent.return_value
+    mock_manager_agent_instance.stream_bot_response.return_value = {
+        "intent_detected": "Normal",
+        "agent_response": iter(["Hello! ", "Doing great :)"]),
+        "agent_type": "Conversation"
+    }
+
+    # 3. User sends a message to the streaming endpoint
+    response = client.post("/chatbot/chat/stream", json={
+        "message": "Hello! How are you doing KusiBot?"
+    })
+
+    # 4. Assertions
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    body = response.get_data(as_text=True)
+    assert 'event: meta\ndata: {"agent_type": "Conversation", "intent": "Normal"}' in body
+    assert 'event: token\ndata: {"text": "Hello! "}' in body
+    assert 'event: done\ndata: {"response": "Hello! Doing great :)"}' in body
+
+    # Full response stored once the stream ended
+    messages = Message.query.order_by(Message.id).all()
+    assert messages[-2].text == "Hello! How are you doing KusiBot?"
+    assert messages[-2].intent == "Normal"
+    assert messages[-1].text == "Hello! Doing great :)"
+    assert messages[-1].agent_type == "Conversation"
+
+    # 5. Log out
+    standard_user_logout(client)
+
+@patch('kusibot.services.chatbot_service.ChatbotManagerAgent')
+def test_it35_async_chat_view_answers_and_saves_turn(mock_manager_agent, db_uc_06, client):
+
+    # 1. Log in a Standard user (and start the conversation)
+    standard_user_login(client)
+    client.get("/chatbot/")
+
+    # 2. ManagerAgent answers the async turn
+    mock_manager_agent_instance = mock_manager_agent.return_value
+    mock_manager_agent_instance.agenerate_bot_response = AsyncMock(return_value={
+        "intent_detected": "Normal",
+        "agent_response": "Hello! Doing great :)",
+        "agent_type": "Conversation"
+    })
+
+    # 3. User sends a message to the async endpoint
+    response = client.post("/chatbot/chat/async", json={
+        "message": "Hello! How are you doing KusiBot?"
+    })
+
+    # 4. Assertions: same response as the sync view, awaited through the Flask dispatch
+    assert response.status_code == 200
+    assert response.get_json() == {"response": "Hello! Doing great :)", "agent_type": "Conversation", "intent": "Normal"}
+    mock_manager_agent_instance.agenerate_bot_response.assert_awaited_once()
+
+    messages = Message.query.order_by(Message.id).all()
+    assert messages[-2].text == "Hello! How are you doing KusiBot?"
+    assert messages[-1].text == "Hello! Doing great :)"
+
+    # 5. Log out
+    standard_user_logout(client)
+
+@patch('kusibot.services.chatbot_service.ChatbotManagerAgent')
+def test_it36_streamed_turn_timed(mock_manager_agent, db_uc_06, client):
+
+    # 1. Log in a Standard user (and start the conversation)
+    standard_user_login(client)
+    client.get("/chatbot/")
+
+    # 2. ManagerAgent streams the response in chunks
+    mock_manager_agent_instance = mock_manager_agent.return_value
+    mock_manager_agent_instance.stream_bot_response.return_value = {
+        "intent_detected": "Normal",
+        "agent_response": iter(["Hello! ", "Doing great :)"]),
+        "agent_type": "Conversation"
+    }
+
+    # 3. User sends a message to the streaming endpoint
+    response = client.post("/chatbot/chat/stream", json={
+        "message": "Hello! How are you doing KusiBot?"
+    })
+
+    # 4. Assertions: the breakdown of the turn comes after its response, and feeds the histograms
+    events = [event.split("\n", 1) for event in response.get_data(as_text=True).strip().split("\n\n")]
+    assert [name for name, _ in events] == ["event: meta", "event: token", "event: token", "event: done", "event: timing"]
+    server_timing = json.loads(events[-1][1].removeprefix("data: "))["server_timing"]
+    assert "first_token;dur=" in server_timing and "save_bot;dur=" in server_timing and "total;dur=" in server_timing
+
+    metrics = client.get("/metrics").get_json()
+    assert metrics["turn_timing"]["first_token"]["count"] >= 1
+    assert metrics["turn_timing"]["total"]["count"] >= 1
+    assert {"active", "queue_depth", "avg_wait_ms", "max_wait_ms"} <= metrics["llm_scheduler"].keys()
+    assert {"turns", "wasted_rate", "avg_saved_ms"} <= metrics["turn_speculation"].keys()
+    assert metrics["generation"]["adaptive"] is False and metrics["generation"]["level"] == 0
+
+    # 5. Log out
+    standard_user_logout(client)
 
 # ---- Utils functions ----
 
@@ -0,0 +1,152 @@
+import pytest, asyncio, json, threading, time, httpx
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, MagicMock
+from werkzeug.serving import ThreadedWSGIServer
+from app import bcrypt
+from kusibot.chatbot.llm_registry import llm_registry
+from kusibot.chatbot.llm_scheduler import llm_scheduler
+from kusibot.chatbot.generation_profiles import generation_controller
+from kusibot.chatbot.turn_timing import turn_timings
+from kusibot.database.db import db as _db
+from kusibot.database.models import User
+
+######################################################################
+# Concurrency load test of the chat turn against a stub Ollama that  #
+# answers after a fixed delay (the LLM time). The sync and the async #
+# view are served by a threaded WSGI server in one process: every    #
+# turn takes a request thread, and the async turns are awaited       #
+# together in the event loop of the async views.                     #
+######################################################################
+
+LLM_DELAY_S = 0.5
+CONCURRENCY_LEVELS = [1, 10, 100, 200]
+CHAT_URLS = {"sync": "/chatbot/chat", "async": "/chatbot/chat/async"}
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate as Ollama (streamed NDJSON) after LLM_DELAY_S."""
+
+    protocol_version = "HTTP/1.1" # Keep-alive connections, as Ollama
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(LLM_DELAY_S)
+
+        chunks = [
+            {"model": "stub", "created_at": "2025-01-01T00:00:00Z", "response": "Hello, ", "done": False},
+            {"model": "stub", "created_at": "2025-01-01T00:00:00Z", "response": "I am here.", "done": False},
+            {"model": "stub", "created_at": "2025-01-01T00:00:00Z", "response": "", "done": True, "done_reason": "stop"}
+        ]
+        body = "".join(json.dumps(chunk) + "\n" for chunk in chunks).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class StubOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512 # Every concurrent turn connects at once
+
+class ChatServer(ThreadedWSGIServer):
+    """WSGI server of the app, with a thread per request (as gunicorn gthread with enough threads)."""
+
+    daemon_threads = True
+    request_queue_size = 512
+
+@pytest.fixture(scope="module")
+def stub_ollama():
+    server = StubOllamaServer(("127.0.0.1", 0), StubOllamaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+@pytest.fixture(scope="function")
+def performance_app(stub_ollama, monkeypatch):
+    monkeypatch.setenv("OLLAMA_BASE_URL", stub_ollama)
+    monkeypatch.setenv("OLLAMA_POOL_MAX_CONNECTIONS", "100") # The stub answers every request in parallel
+    monkeypatch.setenv("OLLAMA_MAX_PARALLEL", "100")
+    monkeypatch.setenv("OLLAMA_QUEUE_SIZE", "200")
+
+    # BERT is not measured here: every message is a normal conversation
+    intent_agent = MagicMock()
+    intent_agent.predict_intent.return_value = ("Normal", 0.9)
+    with patch('kusibot.chatbot.manager_agent.IntentRecognizerAgent', return_value=intent_agent):
+        from app import create_app
+        yield create_app(config_name="performance")
+
+@pytest.fixture(scope="function")
+def performance_db(performance_app):
+    """Creates the database with a standard user. No app context is kept open during the
+    test, so every concurrent request gets its own (as in a real server)."""
+
+    with performance_app.app_context():
+        _db.create_all()
+
+        standard_user = User(
+            username = "test_user",
+            email = "test_user@email.com",
+            password = bcrypt.generate_password_hash("password").decode('utf-8'),
+            is_professional = False
+        )
+
+        _db.session.add(standard_user)
+        _db.session.commit()
+        _db.session.remove()
+
+    yield
+
+    with performance_app.app_context():
+        _db.drop_all()
+
+async def run_load(client, url, concurrency):
+    """Sends concurrency chat messages at once and returns the wall time and the statuses."""
+
+    start_time = time.perf_counter()
+    responses = await asyncio.gather(*(client.post(url, json={"message": f"Hello {i}"})
+                                       for i in range(concurrency)))
+    elapsed_time = time.perf_counter() - start_time
+
+    return elapsed_time, [response.status_code for response in responses]
+
+async def run_scenario(base_url):
+    """Runs every concurrency level on the sync and the async view."""
+
+    results = {}
+    limits = httpx.Limits(max_connections=max(CONCURRENCY_LEVELS))
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        await client.post("/auth/login", data={"identifier": "test_user", "password": "password", "remember": "False"})
+        await client.get("/chatbot/") # Starts the conversation
+
+        for concurrency in CONCURRENCY_LEVELS:
+            for mode, url in CHAT_URLS.items():
+                elapsed_time, statuses = await run_load(client, url, concurrency)
+
+                assert statuses == [200] * concurrency
+                results[(mode, concurrency)] = elapsed_time
+                print(f"  - {mode:5} | {concurrency:3} concurrent turns | wall time {elapsed_time:.2f} s "
+                      f"| {concurrency / elapsed_time:.1f} turns/s")
+
+    return results
+
+def test_async_chat_scales_with_concurrency(performance_db, performance_app):
+
+    print("\n--- Running KusiBot Performance Tests (Async concurrency) ---\n")
+    print(f"Stub LLM delay: {LLM_DELAY_S} s | Threaded WSGI server\n")
+
+    server = ChatServer("127.0.0.1", 0, performance_app)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        results = asyncio.run(run_scenario(f"http://127.0.0.1:{server.server_address[1]}"))
+    finally:
+        server.shutdown()
+
+    print(f"\nOllama connection pools: {llm_registry.get_stats()}")
+    print(f"LLM scheduler: {llm_scheduler.get_stats()}")
+    print(f"Generation profiles: {generation_controller.get_stats()}")
+    print(f"Turn stages: {turn_timings.get_stats()}")
+
+    # Hundreds of turns in flight in one process, the throughput holding as the concurrency doubles
+    assert results[("async", 200)] < 3 * results[("async", 100)]
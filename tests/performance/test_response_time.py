@@ -2,6 +2,8 @@ import pytest, sys, time, statistics
 from app import create_app, bcrypt
 from kusibot.database.db import db as _db
 from kusibot.database.models import User
+from kusibot.chatbot.turn_speculation import turn_speculation
+from kusibot.chatbot.turn_timing import turn_timings
 
 @pytest.fixture(scope="session")
 def performance_app():
@@ -87,6 +89,18 @@ def test_response_time_normal(performance_db_session, performance_client):
         avg_time = statistics.mean(timings)
         print(f"\nAverage Response Time for Iteration {iteration + 1}: {avg_time:.4f} seconds")
 
+    if turn_speculation.enabled: # CHATBOT_SPECULATIVE=1
+        print(f"Speculative turns: {turn_speculation.get_stats()}")
+    print_stage_latencies()
+
+def print_stage_latencies():
+    """Prints the latency of every stage of the chat turns timed so far (TURN_TIMING)."""
+
+    print("\nLatency per stage of the turns:")
+    for stage, stats in turn_timings.get_stats().items():
+        print(f"  - {stage:16} | {stats['count']:3} turns | mean {stats['mean_ms']:8.1f} ms "
+              f"| p50 <= {stats['p50_ms']:8.1f} ms | p95 <= {stats['p95_ms']:8.1f} ms | max {stats['max_ms']:8.1f} ms")
+
 def assessment_test(performance_client, iteration):
 
     print(f"Iteration {iteration}")
@@ -134,5 +148,9 @@ def test_response_time_assessment(performance_db_session, performance_client):
         avg_time = statistics.mean(timings)
         print(f"\nAverage Response Time for Iteration {iteration + 1}: {avg_time:.4f} seconds")
 
+    if turn_speculation.enabled: # CHATBOT_SPECULATIVE=1
+        print(f"Speculative turns: {turn_speculation.get_stats()}")
+    print_stage_latencies()
+
 
     
@@ -0,0 +1,143 @@
+# Test dependencies
+import pytest, json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, MagicMock
+from transformers import BertTokenizerFast
+
+# Members used in Fixtures
+from kusibot.chatbot.llm_registry import LLMClientRegistry
+from kusibot.chatbot.conversation_agent import ConversationAgent
+from kusibot.chatbot.manager_agent import ChatbotManagerAgent
+from kusibot.chatbot.turn_speculation import TurnSpeculation
+
+# Input of the conversation chain used by the tests calling the model
+HELLO_CHAIN_INPUT = {"chat_history": "", "user_query": "Hello"}
+
+# Vocabulary of the tiny tokenizer (ids in the order of the list)
+TINY_VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "i", "feel", "sad", "today", "very", "much", "hello"]
+
+# ---- Stub Ollama server ----
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate as Ollama with the reply of the server, after its delay, keeping the connection alive."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.server.paths.append(self.path)
+        self.server.requests.append(json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0)))))
+        time.sleep(self.server.delay_s)
+        body = (json.dumps({"model": "stub", "response": self.server.reply, "done": False}) + "\n" +
+                json.dumps(dict({"model": "stub", "response": "", "done": True}, **self.server.done_fields)) + "\n").encode('utf-8')
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass # The client gave up (deadline, cancel or answered hedge) and closed the connection
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def start_ollama():
+    """
+    Provides a function starting stub Ollama servers: (reply, delay_s, handler, fields of the final chunk).
+    The servers record the paths and bodies of the requests and expose their URL as server.url.
+    """
+
+    servers = []
+
+    def start(reply="Hi there!", delay_s=0.0, handler=StubOllamaHandler, **done_fields):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        server.reply, server.delay_s, server.done_fields = reply, delay_s, done_fields
+        server.paths, server.requests = [], []
+        server.url = f"http://127.0.0.1:{server.server_address[1]}"
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+
+@pytest.fixture
+def registry():
+    """Provides a fresh registry used by the ConversationAgent."""
+
+    registry = LLMClientRegistry()
+    with patch('kusibot.chatbot.conversation_agent.llm_registry', registry):
+        yield registry
+
+@pytest.fixture
+def chain_input():
+    """Provides the input of the conversation chain, built without reading the history from the database."""
+
+    with patch.object(ConversationAgent, '_build_chain_input', return_value=HELLO_CHAIN_INPUT):
+        yield HELLO_CHAIN_INPUT
+
+# ---- Manager agent ----
+
+@pytest.fixture
+def manager_agent():
+    """Provides an instance of ManagerAgent for each test."""
+    return ChatbotManagerAgent()
+
+@pytest.fixture
+def mock_intent_agent_in_manager_agent():
+    """Provides a mock instance of the IntentRecogniserAgent used in ManagerAgent."""
+
+    with patch('kusibot.chatbot.manager_agent.IntentRecognizerAgent') as mock_repo_class:
+        mock_repo = MagicMock()
+        mock_repo_class.return_value = mock_repo
+        yield mock_repo
+
+@pytest.fixture
+def mock_conversation_agent_in_manager_agent():
+    """Provides a mock instance of the ConversationAgent used in ManagerAgent."""
+
+    with patch('kusibot.chatbot.manager_agent.ConversationAgent') as mock_repo_class:
+        mock_repo = MagicMock()
+        mock_repo_class.return_value = mock_repo
+        yield mock_repo
+
+@pytest.fixture
+def mock_assessment_agent_in_manager_agent():
+    """Provides a mock instance of the AssesmentAgent used in ManagerAgent."""
+
+    with patch('kusibot.chatbot.manager_agent.AssesmentAgent') as mock_repo_class:
+        mock_repo = MagicMock()
+        mock_repo_class.return_value = mock_repo
+        yield mock_repo
+
+@pytest.fixture
+def mock_assessment_repo_in_manager_agent():
+    """Provides a mock instance of the AssesmentRepository used in ManagerAgent."""
+
+    with patch('kusibot.chatbot.manager_agent.AssessmentRepository') as mock_repo_class:
+        mock_repo = MagicMock()
+        mock_repo_class.return_value = mock_repo
+        yield mock_repo
+
+@pytest.fixture
+def turn_speculation(monkeypatch):
+    """Provides fresh speculation counters used by the ManagerAgent, with speculative turns enabled."""
+
+    monkeypatch.setenv("CHATBOT_SPECULATIVE", "1")
+    speculation = TurnSpeculation()
+    with patch('kusibot.chatbot.manager_agent.turn_speculation', speculation):
+        yield speculation
+
+# ---- Intent model ----
+
+@pytest.fixture
+def tiny_tokenizer(tmp_path):
+    """Provides a BERT tokenizer of a small vocabulary (the real one is not needed)."""
+
+    vocab_path = tmp_path / "vocab.txt"
+    vocab_path.write_text("\n".join(TINY_VOCAB))
+    return BertTokenizerFast(vocab_file=str(vocab_path))
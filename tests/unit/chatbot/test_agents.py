@@ -1,53 +1,80 @@
 # Test dependencies
-import pytest
-from unittest.mock import patch, MagicMock
+import pytest, torch, asyncio, json, threading, time
+from types import SimpleNamespace
+from flask import jsonify
+from unittest.mock import patch, MagicMock, AsyncMock
+from langchain_core.language_models.fake import FakeListLLM, FakeStreamingListLLM
+from langchain_core.prompts import ChatPromptTemplate
 # Members used in Tests
 from kusibot.chatbot.manager_agent import ChatbotManagerAgent
 from kusibot.chatbot.assesment_agent import AssesmentAgent
+from kusibot.chatbot.assesment_states.waiting_free_state import WaitingFreeTextState
+from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
+from kusibot.chatbot.question_prefetcher import QuestionPrefetcher
+from kusibot.chatbot.phrasing_bank import PhrasingBank, build_phrasing_bank
+from kusibot.chatbot.context_window import ContextWindow, estimate_tokens
+from kusibot.chatbot.turn_timing import TurnTimings
+from kusibot.app.chatbot.routes import timed_turn
+from kusibot.database.models import User, Conversation
+from kusibot.database.db_repositories import AssessmentRepository, ConversationRepository
 
 # ---- Fixtures ----
 
 @pytest.fixture
-def manager_agent():
-    """Provides an instance of ManagerAgent for each test."""
-    return ChatbotManagerAgent()
+def prefetcher():
+    """Provides a fresh prefetcher used by the assessment agent."""
+
+    prefetcher = QuestionPrefetcher()
+    with patch('kusibot.chatbot.assesment_agent.question_prefetcher', prefetcher):
+        yield prefetcher
 
 @pytest.fixture
-def mock_intent_agent_in_manager_agent():
-    """Provides a mock instance of the IntentRecogniserAgent used in ManagerAgent."""
+def assessment_agent():
+    """Provides an assessment agent waiting for the free text answer of question 1,
+    with a fake model and mocked repositories."""
+
+    agent = AssesmentAgent()
+    agent.llm = FakeListLLM(responses=["How is your sleep lately?", "Generated again"])
+    agent.question_chain = ChatPromptTemplate.from_template(AssesmentAgent.MODEL_PROMPT_QUESTION) | agent.llm
+
+    assessment = SimpleNamespace(id=1, user_id=1, assessment_type="PHQ-9", current_question=1, last_free_text=None)
+    agent.conv_repo = MagicMock()
+    agent.conv_repo.get_summary.return_value = None
+    agent.msg_repo = MagicMock()
+    agent.msg_repo.get_limited_messages.return_value = []
+    agent.assess_question_repo = MagicMock()
+    agent.assess_repo = MagicMock()
+    agent.assess_repo.get_assessment.return_value = assessment
+    agent.assess_repo.update_assessment.side_effect = lambda _, **fields: assessment.__dict__.update(fields)
 
-    with patch('kusibot.chatbot.manager_agent.IntentRecognizerAgent') as mock_repo_class:
-        mock_repo = MagicMock()
-        mock_repo_class.return_value = mock_repo
-        yield mock_repo
+    agent._transition_to_next_state(WaitingFreeTextState())
+    return agent
 
 @pytest.fixture
-def mock_conversation_agent_in_manager_agent():
-    """Provides a mock instance of the ConversationAgent used in ManagerAgent."""
+def questionnaires():
+    """Provides a questionnaire of two questions."""
 
-    with patch('kusibot.chatbot.manager_agent.ConversationAgent') as mock_repo_class:
-        mock_repo = MagicMock()
-        mock_repo_class.return_value = mock_repo
-        yield mock_repo
+    return {"PHQ-9": {"questions": [
+        {"id": 1, "question": "Little interest or pleasure in doing things", "options": ["Not at all", "Nearly every day"]},
+        {"id": 2, "question": "Feeling down, depressed, or hopeless", "options": ["Not at all", "Nearly every day"]}
+    ]}}
 
 @pytest.fixture
-def mock_assessment_agent_in_manager_agent():
-    """Provides a mock instance of the AssesmentAgent used in ManagerAgent."""
+def chatty_messages():
+    """Provides 20 messages (oldest first), the user ones very long."""
 
-    with patch('kusibot.chatbot.manager_agent.AssesmentAgent') as mock_repo_class:
-        mock_repo = MagicMock()
-        mock_repo_class.return_value = mock_repo
-        yield mock_repo
+    return [SimpleNamespace(id=i, is_user=i % 2 == 1,
+                            text=f"[{i}] " + ("I keep thinking about work. " * 40 if i % 2 == 1 else "I hear you."))
+            for i in range(1, 21)]
 
 @pytest.fixture
-def mock_assessment_repo_in_manager_agent():
-    """Provides a mock instance of the AssesmentRepository used in ManagerAgent."""
-
-    with patch('kusibot.chatbot.manager_agent.AssessmentRepository') as mock_repo_class:
-        mock_repo = MagicMock()
-        mock_repo_class.return_value = mock_repo
-        yield mock_repo
- 
+def timings():
+    """Provides fresh histograms used by the timed chat views."""
+
+    timings = TurnTimings()
+    with patch('kusibot.app.chatbot.routes.turn_timings', timings):
+        yield timings
+
 # ---- Tests ----
 
 def test_ut13_generate_bot_response_assessment_agent(mock_assessment_repo_in_manager_agent,
@@ -93,3 +120,398 @@ def test_ut15_map_intent_to_assessment():
     result = agent.map_intent_to_assessment("depression")
     assert result == "PHQ-9"
 
+def test_ut18_bucket_by_length():
+
+    # Bucketing does not need the BERT model loaded
+    agent = IntentRecognizerAgent.__new__(IntentRecognizerAgent)
+
+    # Test
+    buckets = agent._bucket_by_length([5, 100, 12, 40, 16, 17])
+    assert buckets == [[0, 2, 4], [5], [3], [1]]
+
+def test_ut20_quantized_model_rejected_when_predictions_disagree(tmp_path):
+
+    # Agent without the BERT model loaded
+    agent = IntentRecognizerAgent.__new__(IntentRecognizerAgent)
+    agent.device = torch.device("cpu")
+    agent.model = fp32_model = MagicMock()
+    agent.model_dir = str(tmp_path)
+    agent._get_input_tensors_from_texts = MagicMock(return_value=(None, None))
+
+    # Setting up the Mocks: the quantized model only agrees on half of the check messages
+    with patch('kusibot.chatbot.intent_recognizer_agent.quantize_model') as mock_quantize, \
+         patch('kusibot.chatbot.intent_recognizer_agent.compare_models') as mock_compare, \
+         patch('kusibot.chatbot.intent_recognizer_agent.model_size_bytes', return_value=1), \
+         patch('kusibot.chatbot.intent_recognizer_agent.measure_latency_ms', return_value=1.0):
+        mock_compare.return_value = {"agreement": 0.5, "max_prob_diff": 0.4}
+
+        # Test
+        agent._apply_quantization()
+
+    mock_quantize.assert_called_once_with(fp32_model)
+    assert agent.model is fp32_model
+    assert agent.quantization_report["applied"] is False
+
+def test_ut31_streamed_question_advances_assessment_after_stream():
+
+    # Assessment agent with a streaming model and mocked repositories
+    agent = AssesmentAgent()
+    agent.question_chain = (ChatPromptTemplate.from_template(AssesmentAgent.MODEL_PROMPT_QUESTION)
+                            | FakeStreamingListLLM(responses=["How have you been sleeping?"]))
+    agent.conv_repo = MagicMock()
+    agent.conv_repo.get_summary.return_value = None
+    agent.msg_repo = MagicMock()
+    agent.msg_repo.get_limited_messages.return_value = []
+    agent.assess_repo = MagicMock()
+    agent.assess_repo.get_current_assessment.return_value.id = 1
+    agent._get_question_json = MagicMock(return_value={"id": 1, "question": "Trouble sleeping?"})
+
+    # Test: the question is streamed in chunks...
+    stream = agent.stream_response("I feel down", 1, "Depression")
+    first_chunk = next(stream)
+    assert len(first_chunk) < len("How have you been sleeping?")
+    agent.assess_repo.update_assessment.assert_not_called()
+
+    # ...and the assessment waits for the free text answer once it ends
+    assert first_chunk + "".join(stream) == "How have you been sleeping?"
+    agent.assess_repo.update_assessment.assert_called_once_with(1, current_state=AssesmentAgent.STATE_WAITING_FREE_TEXT)
+
+def test_ut32_async_turns_overlap_while_waiting_for_llm(mock_assessment_repo_in_manager_agent,
+                                                        mock_intent_agent_in_manager_agent,
+                                                        mock_assessment_agent_in_manager_agent,
+                                                        mock_conversation_agent_in_manager_agent,
+                                                        manager_agent):
+
+    # Setting up the Mocks: the model takes 0.2 s to answer
+    async def slow_llm(text, conversation_id, intent=None):
+        await asyncio.sleep(0.2)
+        return f"Answer to {text}"
+
+    mock_assessment_repo_in_manager_agent.is_assessment_active.return_value = False
+    mock_intent_agent_in_manager_agent.predict_intent.return_value = ("Normal", 0.8)
+    mock_conversation_agent_in_manager_agent.agenerate_response = AsyncMock(side_effect=slow_llm)
+
+    # Test: 10 concurrent turns wait for the model at the same time
+    async def run_turns():
+        return await asyncio.gather(*(manager_agent.agenerate_bot_response(f"Hello {i}", i, i) for i in range(10)))
+
+    start_time = time.perf_counter()
+    responses = asyncio.run(run_turns())
+    elapsed_time = time.perf_counter() - start_time
+
+    assert [r["agent_response"] for r in responses] == [f"Answer to Hello {i}" for i in range(10)]
+    assert all(r["agent_type"] == ChatbotManagerAgent.CHATBOT_CONVERSATION_AGENT_TYPE for r in responses)
+    assert elapsed_time < 1.0 # Sequentially it would take 2 s
+
+def test_ut34_next_question_is_prefetched_during_categorization(prefetcher, assessment_agent, monkeypatch):
+
+    monkeypatch.setenv("QUESTION_PREFETCH", "1")
+
+    # Test: the free text answer starts phrasing question 2...
+    assessment_agent.state.generate_response("I barely enjoy anything", 1, 1)
+    assert prefetcher.get_stats()["submitted"] == 1
+
+    # ...which the categorization reply returns without calling the model again
+    assert assessment_agent.state.generate_response("2", 1, 1) == "How is your sleep lately?"
+    assert assessment_agent.llm.i == 1
+    assert prefetcher.get_stats()["hits"] == 1
+
+def test_ut35_stale_prefetched_question_is_generated_again(prefetcher, assessment_agent, monkeypatch):
+
+    monkeypatch.setenv("QUESTION_PREFETCH", "1")
+    monkeypatch.setenv("QUESTION_PREFETCH_TTL_S", "-1") # Every prefetched question is stale
+
+    assessment_agent.state.generate_response("I barely enjoy anything", 1, 1)
+    future, _ = prefetcher._entries[(1, 2)]
+    future.result() # The prefetch answered before the user picked an option
+
+    # Test: the stale question is discarded and phrased synchronously
+    assert assessment_agent.state.generate_response("2", 1, 1) == "Generated again"
+    assert prefetcher.get_stats()["stale"] == 1
+
+def test_ut36_assessment_question_asked_from_built_bank(questionnaires, tmp_path, monkeypatch):
+
+    # Building the bank offline: repeated variants are dropped
+    build_llm = FakeListLLM(responses=["Shall we start with your interest in things?", "Shall we start with your interest in things?",
+                                       "How is your mood lately?", "Has your mood been low?"])
+    bank_chain = ChatPromptTemplate.from_template(AssesmentAgent.MODEL_PROMPT_QUESTION) | build_llm
+    bank = build_phrasing_bank(questionnaires, bank_chain, variants=2)
+    assert bank["questionnaires"]["PHQ-9"]["1"] == {"first": ["Shall we start with your interest in things?"]}
+    assert bank["questionnaires"]["PHQ-9"]["2"] == {"follow_up": ["How is your mood lately?", "Has your mood been low?"]}
+
+    bank_path = tmp_path / "phrasing_bank.json"
+    bank_path.write_text(json.dumps(bank))
+
+    # Assessment agent asking question 2 in bank mode
+    monkeypatch.setenv("QUESTION_PHRASING", "bank")
+    agent = AssesmentAgent()
+    agent.question_chain = MagicMock()
+    agent.questionnaires = questionnaires
+    agent.assess_repo = MagicMock()
+    agent.assess_repo.get_assessment.return_value = SimpleNamespace(id=1, user_id=1, assessment_type="PHQ-9", current_question=2)
+
+    # Test: the question comes from the bank without any LLM call
+    with patch('kusibot.chatbot.assesment_agent.phrasing_bank', PhrasingBank(str(bank_path))) as phrasing_bank:
+        assert agent.state.generate_response("I feel down", 1, 1) in ["How is your mood lately?", "Has your mood been low?"]
+
+    agent.question_chain.invoke.assert_not_called()
+    assert phrasing_bank.get_stats()["served"] == 1
+
+def test_ut38_context_fits_token_budget_newest_first(chatty_messages, monkeypatch):
+
+    monkeypatch.setenv("CONTEXT_CONVERSATION_TOKENS", "600")
+    monkeypatch.setenv("CONTEXT_SUMMARY", "0")
+    context_window = ContextWindow()
+    summary = SimpleNamespace(text="The user is stressed about work.", summarized_until=4)
+
+    # Test: the summary comes first, then the newest messages that fit
+    history = context_window.build_history("conversation", 1, chatty_messages, summary)
+    lines = history.split("\n")
+
+    assert estimate_tokens(history) <= 600
+    assert lines[0] == "Summary of the earlier conversation: The user is stressed about work."
+    assert lines[-1] == "Bot: [20] I hear you."
+    assert 2 < len(lines) < 20
+
+    # A single message longer than the budget is truncated
+    huge_message = [SimpleNamespace(id=21, is_user=True, text="word " * 2000)]
+    assert estimate_tokens(context_window.build_history("conversation", 1, huge_message, None)) <= 600
+    assert context_window.get_stats()["truncated"] == 1
+
+def test_ut39_left_out_messages_folded_into_rolling_summary(unit_test_db_session, chatty_messages, monkeypatch):
+
+    monkeypatch.setenv("CONTEXT_CONVERSATION_TOKENS", "600")
+    monkeypatch.setenv("CONTEXT_SUMMARY", "1")
+
+    test_user = User(username="user1", email="user1@email.com", password="pass1")
+    unit_test_db_session.add(test_user)
+    unit_test_db_session.commit()
+    unit_test_db_session.add(Conversation(id=1, user_id=test_user.id))
+    unit_test_db_session.commit()
+
+    # Setting up the summarizer model
+    context_window = ContextWindow()
+    summary_chain = ChatPromptTemplate.from_template(ContextWindow.SUMMARY_PROMPT) | FakeListLLM(responses=["The user worries about work."])
+
+    # Test: the messages left out of the budget are summarized in the background
+    with patch('kusibot.chatbot.context_window.llm_registry.get_chain', return_value=summary_chain):
+        context_window.build_history("conversation", 1, chatty_messages, None)
+        context_window._executor.shutdown(wait=True)
+
+    summary = ConversationRepository().get_summary(1)
+    assert summary.text == "The user worries about work."
+    assert context_window.get_stats()["summaries"] == 1
+
+    # The summary stands in for them in the next context
+    history = context_window.build_history("conversation", 1, chatty_messages, summary)
+    assert history.startswith("Summary of the earlier conversation: The user worries about work.")
+    assert f"[{summary.summarized_until}]" not in history
+    assert estimate_tokens(history) <= 600
+
+def test_ut46_speculative_turn_overlaps_intent_and_generation(mock_assessment_repo_in_manager_agent,
+                                                              mock_intent_agent_in_manager_agent,
+                                                              mock_assessment_agent_in_manager_agent,
+                                                              mock_conversation_agent_in_manager_agent,
+                                                              turn_speculation,
+                                                              manager_agent):
+
+    # Setting up the Mocks: BERT and the model take 0.2 s each
+    def slow_intent(text):
+        time.sleep(0.2)
+        return ("Normal", 0.8)
+
+    def slow_llm(text, conversation_id, intent=None, cancel_event=None, intent_future=None):
+        time.sleep(0.2)
+        return f"Answer to {text}"
+
+    mock_assessment_repo_in_manager_agent.is_assessment_active.return_value = False
+    mock_intent_agent_in_manager_agent.predict_intent.side_effect = slow_intent
+    mock_assessment_agent_in_manager_agent.map_intent_to_assessment.return_value = None
+    mock_conversation_agent_in_manager_agent.generate_response.side_effect = slow_llm
+
+    # Test: the turn takes the longest stage, not both
+    start_time = time.perf_counter()
+    response = manager_agent.generate_bot_response("Hello", 1, 1)
+    elapsed_time = time.perf_counter() - start_time
+
+    assert response["agent_response"] == "Answer to Hello"
+    assert response["agent_type"] == ChatbotManagerAgent.CHATBOT_CONVERSATION_AGENT_TYPE
+    assert elapsed_time < 0.35 # Sequentially it would take 0.4 s
+    stats = turn_speculation.get_stats()
+    assert stats["turns"] == 1
+    assert stats["wasted"] == 0
+    assert stats["saved_ms"] > 100
+
+def test_ut47_speculation_cancelled_when_assessment_starts(mock_assessment_repo_in_manager_agent,
+                                                           mock_intent_agent_in_manager_agent,
+                                                           mock_assessment_agent_in_manager_agent,
+                                                           mock_conversation_agent_in_manager_agent,
+                                                           turn_speculation,
+                                                           manager_agent):
+
+    # Setting up the Mocks: the speculative generation runs until it is cancelled
+    cancelled = threading.Event()
+
+    def cancellable_llm(text, conversation_id, intent=None, cancel_event=None, intent_future=None):
+        if cancel_event.wait(5):
+            cancelled.set()
+        return "Discarded"
+
+    async def acancellable_llm(text, conversation_id, intent_future):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    mock_assessment_repo_in_manager_agent.is_assessment_active.return_value = False
+    mock_intent_agent_in_manager_agent.predict_intent.return_value = ("Depression", 0.9)
+    mock_assessment_agent_in_manager_agent.map_intent_to_assessment.return_value = "PHQ-9"
+    mock_assessment_agent_in_manager_agent.generate_response.return_value = "First question"
+    mock_assessment_agent_in_manager_agent.agenerate_response = AsyncMock(return_value="First question")
+    mock_conversation_agent_in_manager_agent.generate_response.side_effect = cancellable_llm
+    mock_conversation_agent_in_manager_agent.aspeculate_response = acancellable_llm
+
+    # Test: the sync turn is answered by the assessment and its speculation stopped
+    response = manager_agent.generate_bot_response("I'm feeling down", 1, 1)
+    assert response["agent_response"] == "First question"
+    assert cancelled.wait(1)
+
+    # Test: the async turn cancels its speculative task
+    cancelled.clear()
+    response = asyncio.run(manager_agent.agenerate_bot_response("I'm feeling down", 1, 1))
+    assert response["agent_response"] == "First question"
+    assert cancelled.is_set()
+
+    stats = turn_speculation.get_stats()
+    assert stats["turns"] == 2
+    assert stats["wasted_rate"] == 1.0
+
+def test_ut54_stages_recorded_into_current_turn_only(timings):
+
+    # Test: outside a turn nothing is recorded
+    with timings.stage("intent"):
+        pass
+    timings.record("llm", 1.0)
+    assert timings.get_stats() == {}
+
+    # Test: the stages run by worker threads (bound or through asyncio.to_thread) add up into the turn
+    def history():
+        with timings.stage("history"):
+            time.sleep(0.02)
+
+    with timings.turn() as timer:
+        with timings.stage("intent"):
+            time.sleep(0.02)
+        worker = threading.Thread(target=timings.bind(history))
+        worker.start()
+        worker.join()
+        asyncio.run(asyncio.to_thread(history))
+        timings.record("llm", 0.5)
+
+    assert list(timer.stages) == ["intent", "history", "llm"]
+    assert timer.stages["history"] >= 0.04
+    assert timer.total_s >= timer.stages["intent"] + timer.stages["history"]
+    assert timer.get_server_timing().endswith(f"llm;dur=500.0, total;dur={timer.total_s * 1000:.1f}")
+
+    # Test: the histograms count every finished turn per stage
+    with timings.turn():
+        timings.record("llm", 3.0)
+
+    stats = timings.get_stats()
+    assert stats["llm"]["count"] == 2
+    assert stats["llm"]["mean_ms"] == 1750.0
+    assert stats["llm"]["p50_ms"] == 500.0
+    assert stats["llm"]["p95_ms"] == 3000.0
+    assert stats["llm"]["buckets"]["<=500"] == stats["llm"]["buckets"]["<=5000"] == 1
+    assert stats["intent"]["count"] == 1
+    assert stats["total"]["count"] == 2
+
+def test_ut55_chat_view_sends_server_timing_when_enabled(app, timings,
+                                                        mock_assessment_repo_in_manager_agent,
+                                                        mock_intent_agent_in_manager_agent,
+                                                        mock_assessment_agent_in_manager_agent,
+                                                        mock_conversation_agent_in_manager_agent,
+                                                        manager_agent):
+
+    # Setting up the Mocks: BERT takes 0.05 s to classify the intent
+    def slow_intent(text):
+        time.sleep(0.05)
+        return ("Normal", 0.8)
+
+    mock_assessment_repo_in_manager_agent.is_assessment_active.return_value = False
+    mock_intent_agent_in_manager_agent.predict_intent.side_effect = slow_intent
+    mock_assessment_agent_in_manager_agent.map_intent_to_assessment.return_value = None
+    mock_conversation_agent_in_manager_agent.generate_response.return_value = "Hi!"
+
+    @timed_turn
+    def chat():
+        return jsonify(manager_agent.generate_bot_response("Hello", 1, 1))
+
+    # Test: the breakdown of the turn goes out in the Server-Timing header
+    app.config['TURN_TIMING'] = True
+    with app.test_request_context('/chatbot/chat', method='POST'):
+        response = chat()
+
+    metrics = dict(metric.split(";dur=") for metric in response.headers['Server-Timing'].split(", "))
+    assert list(metrics) == ["assessment_check", "intent", "total"]
+    assert float(metrics["intent"]) >= 50
+    assert float(metrics["total"]) >= float(metrics["intent"])
+    assert timings.get_stats()["intent"]["count"] == 1
+
+    # Test: disabled by config, no header and no histograms
+    app.config['TURN_TIMING'] = False
+    try:
+        with app.test_request_context('/chatbot/chat', method='POST'):
+            response = chat()
+    finally:
+        app.config['TURN_TIMING'] = True
+
+    assert response.get_json()["agent_response"] == "Hi!"
+    assert 'Server-Timing' not in response.headers
+    assert timings.get_stats()["total"]["count"] == 1
+
+def test_ut59_async_assessment_start_through_run_db(unit_test_db_session):
+
+    # Adds an active Conversation without assessment
+    test_user = User(username="user1", email="user1@email.com", password="pass1")
+    unit_test_db_session.add(test_user)
+    unit_test_db_session.commit()
+    test_conv = Conversation(user_id = test_user.id)
+    unit_test_db_session.add(test_conv)
+    unit_test_db_session.commit()
+    user_id, conversation_id = test_user.id, test_conv.id
+
+    agent = AssesmentAgent()
+
+    # Test: the assessment is started in a worker thread (its session closed) and the first question asked
+    with patch.object(agent, '_anaturalize_question', AsyncMock(return_value="Little interest in doing things?")) as naturalize:
+        response = asyncio.run(agent.agenerate_response("I think I have depression", conversation_id, "Depression"))
+
+    assert response == "Little interest in doing things?"
+    assessment = AssessmentRepository().get_current_assessment(user_id)
+    assert assessment.assessment_type == "PHQ-9"
+    assert naturalize.call_args.args[2] == user_id
+
+def test_ut64_batch_buckets_padded_to_their_longest_sequence(tiny_tokenizer):
+
+    # Agent without the BERT model loaded, with a small vocabulary tokenizer
+    agent = IntentRecognizerAgent.__new__(IntentRecognizerAgent)
+    agent.tokenizer = tiny_tokenizer
+    agent.device = torch.device("cpu")
+    agent.padding = "longest"
+    agent.reverse_label_mapping = {0: "Normal", 1: "Depression"}
+    agent.LENGTH_BUCKETS = (4, 8, 128)
+    agent._record_token_lengths = MagicMock()
+
+    forward_shapes = []
+    def forward(input_ids, attention_mask):
+        forward_shapes.append(tuple(input_ids.shape))
+        assert attention_mask.all() # No padding inside a bucket of equal lengths
+        return torch.tensor([[0.9, 0.1]] * input_ids.shape[0])
+    agent._forward = forward
+
+    # Test: one forward pass per bucket, padded only to its longest sequence
+    results = agent._predict_batch(["I feel sad today, very very much", "Hello", "I feel sad"])
+    assert [intent for intent, _ in results] == ["Normal"] * 3
+    assert forward_shapes == [(1, 3), (1, 5), (1, 9)]
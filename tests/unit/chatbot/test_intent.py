@@ -0,0 +1,386 @@
+# Test dependencies
+import pytest, torch, json, os, socket, sys, threading, time, zlib
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch, MagicMock
+from transformers import BertConfig, BertForSequenceClassification
+# Members used in Tests
+from kusibot.chatbot.intent_recognizer_agent import IntentRecognizerAgent
+from kusibot.chatbot.intent_batcher import IntentMicroBatcher
+from kusibot.chatbot.intent_backends import create_backend, export_torchscript, EagerBackend, ONNX_ARTIFACT, TORCHSCRIPT_ARTIFACT
+from kusibot.chatbot.intent_quantization import QUANTIZATION_CHECK_TEXTS, quantize_model, save_quantized_model, load_quantized_model
+from kusibot.chatbot.intent_evaluation import accuracy_report, comparison_report, parse_settings, run_predictions, assessment_trigger
+from kusibot.chatbot.intent_cascade import HashedNgramClassifier, IntentCascade
+from kusibot.chatbot.intent_cache import IntentPredictionCache
+from kusibot.chatbot.intent_bundle import BUNDLE_MANIFEST, read_manifest, load_bundle
+from kusibot.chatbot.intent_server import IntentServerClient, _handle_connection
+
+# ---- Fixtures ----
+
+@pytest.fixture
+def batch_calls():
+    """Provides a list recording every batch received by the fake prediction function."""
+    return []
+
+def tiny_bert():
+    """Returns a small randomly initialised BERT classifier (the real model is not needed for parity)."""
+
+    torch.manual_seed(0)
+    config = BertConfig(vocab_size=512, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+                        intermediate_size=64, num_labels=5)
+    return BertForSequenceClassification(config).eval()
+
+def check_inputs():
+    """Returns the check texts as a padded batch, with word ids hashed into the tiny vocabulary."""
+
+    ids = [[1] + [zlib.crc32(word.encode('utf-8')) % 510 + 2 for word in text.lower().split()] + [1]
+           for text in QUANTIZATION_CHECK_TEXTS]
+    length = max(len(text_ids) for text_ids in ids)
+    input_ids = torch.tensor([text_ids + [0] * (length - len(text_ids)) for text_ids in ids])
+    return input_ids, (input_ids != 0).long()
+
+TRAIN_TEXTS = ["hello how are you", "thanks a lot"] * 10 + ["i feel sad and hopeless", "i have depression"] * 10
+TRAIN_LABELS = ["Normal"] * 20 + ["Depression"] * 20
+
+def train_first_stage():
+    """Trains a small first-stage classifier on two intents."""
+
+    classifier = HashedNgramClassifier(["Normal", "Depression"], num_buckets=2**10)
+    classifier.fit(TRAIN_TEXTS, TRAIN_LABELS, epochs=5, batch_size=8)
+    return classifier
+
+@pytest.fixture
+def first_stage():
+    """Provides a small first-stage classifier trained on two intents."""
+    return train_first_stage()
+
+@pytest.fixture
+def bundle_dir(tiny_tokenizer, tmp_path):
+    """Writes a bundle with a tiny (randomly initialised) BERT model."""
+
+    tiny_tokenizer.save_pretrained(tmp_path)
+
+    config = BertConfig(vocab_size=len(tiny_tokenizer), hidden_size=8, num_hidden_layers=1, num_attention_heads=1,
+                        intermediate_size=8, num_labels=2)
+    BertForSequenceClassification(config).save_pretrained(tmp_path, safe_serialization=True)
+    (tmp_path / "label_mapping.json").write_text(json.dumps({"Normal": 0, "Depression": 1}))
+
+    files = {filename: {"size": os.path.getsize(tmp_path / filename), "sha256": ""}
+             for filename in os.listdir(tmp_path)}
+    (tmp_path / BUNDLE_MANIFEST).write_text(json.dumps({"format_version": 1, "files": files}))
+
+    return tmp_path
+
+@pytest.fixture
+def listener(tmp_path):
+    """Provides a listening UNIX socket (the intent service) and its path."""
+
+    socket_path = str(tmp_path / "intent.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+    yield server, socket_path
+    server.close()
+
+# ---- Tests ----
+
+def test_ut16_batcher_groups_concurrent_requests(batch_calls):
+
+    texts = [f"message {i}" for i in range(8)]
+    first_batch_started, release_first_batch = threading.Event(), threading.Event()
+
+    def predict_batch(texts):
+        batch_calls.append(list(texts))
+        if len(batch_calls) == 1: # The model is busy with the first request while the others arrive
+            first_batch_started.set()
+            release_first_batch.wait(5)
+        return [(text.upper(), 0.9) for text in texts]
+
+    batcher = IntentMicroBatcher(predict_batch, max_batch_size=4, max_wait_ms=0)
+
+    # Test
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(batcher.predict, texts[0])]
+        assert first_batch_started.wait(5)
+        futures += [executor.submit(batcher.predict, text) for text in texts[1:]]
+        while batcher.get_stats()["total_requests"] < len(texts):
+            time.sleep(0.001)
+        release_first_batch.set()
+        results = [future.result() for future in futures]
+
+    # Every caller gets its own prediction back...
+    assert results == [(text.upper(), 0.9) for text in texts]
+    # ...while the requests queued meanwhile share the next forward passes, never above the max batch size.
+    assert [len(batch) for batch in batch_calls] == [1, 4, 3]
+
+    stats = batcher.get_stats()
+    assert stats["total_requests"] == 8
+    assert stats["total_batches"] == 3
+    assert stats["batch_size_histogram"] == {1: 1, 3: 1, 4: 1}
+
+def test_ut17_batcher_propagates_prediction_errors():
+
+    def failing_predict_batch(texts):
+        raise RuntimeError("model failure")
+
+    batcher = IntentMicroBatcher(failing_predict_batch, max_batch_size=2, max_wait_ms=0)
+
+    # Test
+    with pytest.raises(RuntimeError, match="model failure"):
+        batcher.predict("hello")
+
+def test_ut19_create_backend_falls_back_to_eager(tmp_path):
+
+    model = MagicMock()
+
+    # ONNX artifact not exported yet
+    backend = create_backend("onnx", model, str(tmp_path), "cpu")
+    assert isinstance(backend, EagerBackend)
+
+    # ONNX artifact exported, but ONNX Runtime not installed
+    (tmp_path / ONNX_ARTIFACT).write_bytes(b"")
+    with patch.dict(sys.modules, {"onnxruntime": None}):
+        backend = create_backend("onnx", model, str(tmp_path), "cpu")
+    assert isinstance(backend, EagerBackend)
+
+    # Unknown backend name
+    backend = create_backend("unknown", model, str(tmp_path), "cpu")
+    assert isinstance(backend, EagerBackend)
+
+def test_ut21_evaluation_reports_accuracy_and_threshold_flips():
+
+    samples = [("hi", "Normal"), ("i feel sad", "Depression"), ("i am worried", "Anxiety")]
+    reference = [("Normal", 0.9), ("Depression", 0.55), ("Anxiety", 0.8)]
+    candidate = [("Normal", 0.9), ("Depression", 0.45), ("Normal", 0.6)]
+
+    # Test accuracy of the candidate
+    report = accuracy_report(samples, candidate)
+    assert report["accuracy"] == pytest.approx(2 / 3)
+    assert report["per_intent"]["Anxiety"]["accuracy"] == 0.0
+
+    # Test comparison against the reference around a 0.5 threshold
+    def triggers_assessment(intent, confidence):
+        return confidence >= 0.5 and intent != "Normal"
+
+    comparison = comparison_report(reference, candidate, 0.5, triggers_assessment)
+    assert comparison["agreement"] == pytest.approx(2 / 3)
+    assert comparison["near_threshold_samples"] == 1
+    assert comparison["threshold_crossings"] == 1
+    assert comparison["assessment_trigger_flips"] == 2
+
+def test_ut22_parse_candidate_settings():
+
+    assert parse_settings("backend=onnx, max_length=64") == {"backend": "onnx", "max_length": "64"}
+    with pytest.raises(ValueError):
+        parse_settings("unknown=1")
+
+def test_ut23_calibrated_margin_preserves_assessment_triggers(first_stage):
+
+    texts = ["hello how are you", "i feel sad and hopeless"]
+    # BERT would not start an assessment for the second message (low confidence)
+    bert_predictions = [("Normal", 0.9), ("Depression", 0.4)]
+
+    def triggers_assessment(intent, confidence):
+        return confidence >= 0.5 and intent != "Normal"
+
+    # Setting up the first-stage probabilities [Normal, Depression]
+    probs = {"hello how are you": [0.95, 0.05], "i feel sad and hopeless": [0.2, 0.8]}
+    first_stage.predict_proba = lambda batch: torch.tensor([probs[text] for text in batch])
+
+    # Test
+    calibration = first_stage.calibrate_margin(texts, bert_predictions, triggers_assessment)
+    assert calibration["escalation_rate"] == 0.5
+    assert first_stage.predict("hello how are you")[0] == "Normal"
+    assert first_stage.predict("i feel sad and hopeless") is None
+
+    # Test: the training is reproducible (seeded shuffling)
+    assert torch.equal(train_first_stage().weights.weight, first_stage.weights.weight)
+
+def test_ut24_cascade_escalates_uncertain_messages(first_stage):
+
+    bert_predict = MagicMock(return_value=("Depression", 0.8))
+    cascade = IntentCascade(first_stage, margin=0.5)
+
+    # Test
+    assert cascade.predict("hello how are you", bert_predict)[0] == "Normal"
+    bert_predict.assert_not_called()
+
+    assert cascade.predict("", bert_predict) == ("Depression", 0.8)
+    bert_predict.assert_called_once()
+
+    stats = cascade.get_stats()
+    assert stats["escalations"] == 1
+    assert stats["escalation_rate"] == 0.5
+
+    # Test: an escalation is counted even if the clock did not move while BERT ran
+    with patch('kusibot.chatbot.intent_cascade.time.perf_counter', return_value=1.0):
+        cascade.predict("", bert_predict)
+    assert cascade.get_stats()["escalations"] == 2
+
+def test_ut25_cache_evicts_least_recently_used():
+
+    cache = IntentPredictionCache(max_size=2)
+    cache.validate("model-v1")
+    cache.put("hi", ("Normal", 0.9))
+    cache.put("thanks", ("Normal", 0.8))
+
+    # "hi" is used again, so "thanks" becomes the least recently used
+    assert cache.get("hi") == ("Normal", 0.9)
+    cache.put("i feel sad", ("Depression", 0.7))
+
+    # Test
+    assert cache.get("thanks") is None
+    assert cache.get("i feel sad") == ("Depression", 0.7)
+
+    stats = cache.get_stats()
+    assert stats["size"] == 2
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+def test_ut26_cache_invalidated_when_model_changes():
+
+    cache = IntentPredictionCache(max_size=10)
+    cache.validate("model-v1")
+    cache.put("hi", ("Normal", 0.9))
+
+    # Same model: prediction kept
+    cache.validate("model-v1")
+    assert cache.get("hi") == ("Normal", 0.9)
+
+    # Test: model or backend changed
+    cache.validate("model-v2")
+    assert cache.get("hi") is None
+    assert cache.get_stats()["invalidations"] == 1
+
+def test_ut27_bundle_loads_without_network(bundle_dir):
+
+    # Test
+    tokenizer, model, label_mapping = load_bundle(str(bundle_dir))
+
+    assert label_mapping == {"Normal": 0, "Depression": 1}
+    assert model.config.num_labels == 2
+    assert tokenizer("i feel sad")["input_ids"] == [2, 5, 6, 7, 3]
+
+def test_ut28_incomplete_bundle_fails_fast(bundle_dir):
+
+    # Weights modified after the bundle was built
+    with open(bundle_dir / "model.safetensors", "ab") as f:
+        f.write(b"0")
+    with pytest.raises(ValueError):
+        read_manifest(str(bundle_dir))
+
+    # Test: weights missing
+    os.remove(bundle_dir / "model.safetensors")
+    with pytest.raises(FileNotFoundError):
+        load_bundle(str(bundle_dir))
+
+def test_ut29_client_gets_prediction_from_service(listener):
+
+    server, socket_path = listener
+
+    # Setting up the service with a mocked model
+    agent = MagicMock()
+    agent.predict_intent.return_value = ("Depression", 0.75)
+    threading.Thread(target=lambda: _handle_connection(server.accept()[0], agent), daemon=True).start()
+
+    # Test: both requests use the same connection
+    client = IntentServerClient(socket_path, timeout_ms=2000)
+    assert client.predict("I feel sad") == ("Depression", 0.75)
+    assert client.predict("I feel sad again") == ("Depression", 0.75)
+
+    agent.predict_intent.assert_called_with("I feel sad again")
+    assert client.get_stats()["failures"] == 0
+
+def test_ut30_agent_falls_back_locally_when_service_times_out(listener, monkeypatch):
+
+    _, socket_path = listener # The service accepts the connection but never answers
+
+    # The agent is a client of the service: the local model is not loaded
+    monkeypatch.setenv("INTENT_SERVER_SOCKET", socket_path)
+    monkeypatch.setenv("INTENT_SERVER_TIMEOUT_MS", "50")
+    agent = IntentRecognizerAgent.__new__(IntentRecognizerAgent)
+    agent.__init__()
+    assert agent._local_model_loaded is False
+
+    # Setting up the local model
+    def load_local_model():
+        agent._local_model_loaded = True
+    agent._load_local_model = MagicMock(side_effect=load_local_model)
+    agent._predict_with_bert = MagicMock(return_value=("Normal", 0.9))
+
+    # Test
+    assert agent.predict_intent("Hello there") == ("Normal", 0.9)
+    agent._load_local_model.assert_called_once()
+
+    stats = agent.get_server_stats()
+    assert stats["failures"] == 1
+    assert stats["local_fallbacks"] == 1
+
+def test_ut56_torchscript_backend_matches_eager_on_check_texts(tmp_path):
+
+    model = tiny_bert()
+    export_torchscript(model, str(tmp_path / TORCHSCRIPT_ARTIFACT), torch.device("cpu"))
+
+    eager = create_backend("eager", model, str(tmp_path), torch.device("cpu"))
+    compiled = create_backend("compiled", model, str(tmp_path), torch.device("cpu"))
+    assert compiled.mode == "torchscript"
+
+    # Test: same logits (and intents) on a batch of another shape than the traced one
+    input_ids, attention_mask = check_inputs()
+    eager_logits = eager(input_ids, attention_mask)
+    compiled_logits = compiled(input_ids, attention_mask)
+    assert torch.allclose(eager_logits, compiled_logits, atol=1e-5)
+    assert torch.equal(eager_logits.argmax(dim=-1), compiled_logits.argmax(dim=-1))
+
+def test_ut57_quantized_artifact_loaded_without_quantizing_again(tmp_path):
+
+    model = tiny_bert()
+    quantized_model = quantize_model(model)
+    save_quantized_model(quantized_model, str(tmp_path / "quantized.pt"))
+
+    # Test: the stored int8 model is loaded as is
+    with patch('kusibot.chatbot.intent_quantization.quantize_model') as mock_quantize:
+        loaded_model = load_quantized_model(str(tmp_path / "quantized.pt"))
+    mock_quantize.assert_not_called()
+
+    input_ids, attention_mask = check_inputs()
+    with torch.no_grad():
+        assert torch.equal(loaded_model(input_ids=input_ids, attention_mask=attention_mask).logits,
+                           quantized_model(input_ids=input_ids, attention_mask=attention_mask).logits)
+
+def test_ut58_evaluation_uses_manager_trigger_and_handles_empty_set():
+
+    # Test: the harness decides as the manager agent (threshold, not Normal, mapped to a questionnaire)
+    threshold, triggers_assessment = assessment_trigger()
+    assert triggers_assessment("Depression", threshold)
+    assert not triggers_assessment("Depression", threshold - 0.01)
+    assert not triggers_assessment("Normal", 0.99)
+    assert not triggers_assessment("Unknown", 0.99)
+
+    # Test: an empty evaluation set reports zero samples instead of failing
+    agent = MagicMock()
+    predictions, latency = run_predictions(agent, [])
+    assert predictions == []
+    assert latency["samples"] == 0
+    agent._predict_batch.assert_not_called()
+
+def test_ut63_agent_cache_cleared_when_model_replaced():
+
+    # Agent without the BERT model loaded, with the cache enabled
+    agent = IntentRecognizerAgent.__new__(IntentRecognizerAgent)
+    agent.client = None
+    agent.padding = "longest"
+    agent.cache = IntentPredictionCache(max_size=10)
+    agent._predict_local = MagicMock(return_value=("Normal", 0.9))
+
+    # Same model: the repeated message is answered from the cache
+    assert agent.predict_intent("Hi!") == ("Normal", 0.9)
+    assert agent.predict_intent("hi") == ("Normal", 0.9)
+    assert agent._predict_local.call_count == 1
+
+    # Test: a new model, backend or cascade (even at the address of the previous one) drops the predictions
+    for attribute in ("model", "backend", "cascade"):
+        setattr(agent, attribute, MagicMock())
+        agent.predict_intent("hi")
+    assert agent._predict_local.call_count == 4
+    assert agent.cache.get_stats()["invalidations"] == 3
@@ -0,0 +1,563 @@
+# Test dependencies
+import pytest, torch, asyncio, concurrent.futures, json, socket, threading, time
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import patch, MagicMock, AsyncMock
+# Members used in Tests
+from kusibot.chatbot.llm_registry import LLMClientRegistry
+from kusibot.chatbot.llm_deadlines import LLMDeadlines
+from kusibot.chatbot.llm_scheduler import LLMScheduler, llm_scheduler
+from kusibot.chatbot.llm_balancer import OllamaBalancer
+from kusibot.chatbot.generation_profiles import GenerationController
+from kusibot.chatbot.context_window import ContextWindow
+from kusibot.chatbot.response_cache import SemanticResponseCache
+from kusibot.chatbot.model_warmup import ModelWarmup
+from kusibot.chatbot.conversation_agent import ConversationAgent
+from kusibot.chatbot.assesment_agent import AssesmentAgent
+
+# ---- Fixtures ----
+
+class StallingOllamaHandler(BaseHTTPRequestHandler):
+    """Answers /api/generate as Ollama, sending the first chunk at once and the next one after 2 s."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in ({"model": "stub", "response": "Hello", "done": False},
+                          {"model": "stub", "response": " there", "done": False},
+                          {"model": "stub", "response": "", "done": True}):
+                line = (json.dumps(chunk) + "\n").encode('utf-8')
+                self.wfile.write(f"{len(line):x}\r\n".encode('ascii') + line + b"\r\n")
+                self.wfile.flush()
+                time.sleep(2)
+            self.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass # The client gave up and closed the connection
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stub_ollama(start_ollama, monkeypatch):
+    """Provides a stub Ollama server set as OLLAMA_BASE_URL, reporting the prompt evaluation."""
+
+    server = start_ollama(prompt_eval_count=40, prompt_eval_duration=8000000, eval_count=3,
+                          eval_duration=6000000, load_duration=1000000)
+    monkeypatch.setenv("OLLAMA_BASE_URL", server.url)
+    return server
+
+@pytest.fixture(params=["slow"])
+def slow_ollama(request, start_ollama, registry, monkeypatch):
+    """
+    Provides a stub Ollama server set as OLLAMA_BASE_URL, sending the first chunk after 2 s ("slow") or
+    stalling after it ("stalling"), and fresh registries and deadlines.
+    """
+
+    if request.param == "stalling":
+        server = start_ollama(handler=StallingOllamaHandler)
+    else:
+        server = start_ollama("Too late", delay_s=2)
+    monkeypatch.setenv("OLLAMA_BASE_URL", server.url)
+
+    deadlines = LLMDeadlines()
+    with patch('kusibot.chatbot.assesment_agent.llm_registry', LLMClientRegistry()), \
+         patch('kusibot.chatbot.llm_registry.llm_deadlines', deadlines), \
+         patch('kusibot.chatbot.conversation_agent.llm_deadlines', deadlines), \
+         patch('kusibot.chatbot.assesment_agent.llm_deadlines', deadlines):
+        yield deadlines
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    """Provides a scheduler of one generation at once and two waiting calls."""
+
+    monkeypatch.setenv("OLLAMA_MAX_PARALLEL", "1")
+    monkeypatch.setenv("OLLAMA_QUEUE_SIZE", "2")
+    monkeypatch.setenv("OLLAMA_QUEUE_TIMEOUT_S", "5")
+    return LLMScheduler()
+
+def wait_for_queue_depth(scheduler, depth):
+    """Waits until the scheduler has depth calls waiting."""
+
+    while scheduler.get_stats()["queue_depth"] < depth:
+        time.sleep(0.01)
+
+@pytest.fixture
+def scheduler_stats():
+    """Provides the stats of a fake LLM scheduler read by the controller."""
+
+    scheduler = MagicMock()
+    scheduler.get_stats.return_value = {"queue_depth": 0}
+    with patch('kusibot.chatbot.generation_profiles.llm_scheduler', scheduler):
+        yield scheduler.get_stats.return_value
+
+@pytest.fixture
+def controller(scheduler_stats, monkeypatch):
+    """Provides a controller without cooldown and with the conversation profiles registered."""
+
+    monkeypatch.setenv("GENERATION_ADAPTIVE", "1")
+    monkeypatch.setenv("GENERATION_COOLDOWN_S", "0")
+    monkeypatch.setenv("GENERATION_QUEUE_HIGH", "4")
+    monkeypatch.setenv("GENERATION_QUEUE_LOW", "1")
+    monkeypatch.setenv("GENERATION_LATENCY_HIGH_S", "5")
+    monkeypatch.setenv("GENERATION_LATENCY_LOW_S", "2")
+    controller = GenerationController()
+    controller.register(ConversationAgent.AGENT_NAME, ConversationAgent.GENERATION_PROFILES)
+    return controller
+
+GREETING_HISTORY = {"chat_history": "Bot: Hello! I'm Kusibot and I'm here to chat with you about how you're feeling today.",
+                    "user_query": "Hi"}
+
+def unit_embedding(*values):
+    """Returns a normalized embedding."""
+    return torch.nn.functional.normalize(torch.tensor(values, dtype=torch.float), dim=0)
+
+@pytest.fixture
+def cache(monkeypatch):
+    """Provides an enabled cache of two replies."""
+
+    monkeypatch.setenv("RESPONSE_CACHE", "1")
+    monkeypatch.setenv("RESPONSE_CACHE_SIZE", "2")
+    monkeypatch.setenv("RESPONSE_CACHE_THRESHOLD", "0.95")
+    return SemanticResponseCache()
+
+@pytest.fixture
+def dead_backend():
+    """Provides the URL of a port nobody listens on."""
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+@pytest.fixture
+def ollama(start_ollama, monkeypatch):
+    """Provides a stub Ollama server used as the only backend."""
+
+    server = start_ollama("", done_reason="load")
+    monkeypatch.delenv("OLLAMA_BASE_URLS", raising=False)
+    monkeypatch.setenv("OLLAMA_BASE_URL", server.url)
+    monkeypatch.setenv("OLLAMA_KEEP_ALIVE", "30m")
+    return server
+
+# ---- Tests ----
+
+def test_ut33_agents_share_chain_and_keep_alive_connection(stub_ollama, registry, chain_input, monkeypatch):
+
+    monkeypatch.setenv("OLLAMA_CONVERSATION_OPTIONS", json.dumps({"temperature": 0.2, "num_predict": 64}))
+
+    # Two users, two agents: one client and one chain
+    agent_1, agent_2 = ConversationAgent(), ConversationAgent()
+    assert agent_1.chain is agent_2.chain
+    assert agent_1.chain.last.temperature == 0.2
+    assert agent_1.chain.last.num_predict == 64
+
+    # Test: both requests use the same pooled connection
+    assert agent_1.generate_response("Hello", 1) == "Hi there!"
+    assert agent_2.generate_response("Hello", 2) == "Hi there!"
+
+    stats = registry.get_stats()
+    assert stats["llm_clients"] == 1
+    assert stats["chains"] == 1
+    assert stats["sync_pool"]["requests"] == 2
+    assert stats["sync_pool"]["connections"] == 1
+    assert stats["sync_pool"]["active"] == 0
+
+def test_ut37_requests_keep_model_loaded_and_record_prompt_eval(stub_ollama, registry, chain_input, monkeypatch):
+
+    monkeypatch.setenv("OLLAMA_KEEP_ALIVE", "-1")
+
+    agent = ConversationAgent()
+
+    # Test: the prompt starts with the static instructions and keeps the model loaded
+    agent.generate_response("Hello", 1)
+    agent.generate_response("Hello again", 1)
+
+    static_prefix = ConversationAgent.PROMPT_TEMPLATE.split("{")[0]
+    assert len(static_prefix) > 0.8 * len(ConversationAgent.PROMPT_TEMPLATE)
+    assert all(request["prompt"].startswith("Human: " + static_prefix) for request in stub_ollama.requests)
+    assert all(request["keep_alive"] == -1 for request in stub_ollama.requests)
+
+    prompt_eval = registry.get_stats()["prompt_eval"]["conversation"]
+    assert prompt_eval["requests"] == 2
+    assert prompt_eval["avg_prompt_eval_tokens"] == 40
+    assert prompt_eval["prompt_eval_ms"] == 16.0
+
+def test_ut40_conversation_answers_canned_reply_when_deadline_exceeded(slow_ollama, chain_input, monkeypatch):
+
+    monkeypatch.setenv("OLLAMA_CONVERSATION_DEADLINE_S", "0.3")
+    agent = ConversationAgent()
+
+    # Test: the turn ends at the deadline with a canned reply
+    start_time = time.perf_counter()
+    response = agent.generate_response("Hello", 1)
+    elapsed_time = time.perf_counter() - start_time
+
+    assert response in ConversationAgent.DEADLINE_RESPONSES
+    assert elapsed_time < 1.5
+    assert slow_ollama.get_stats()["conversation"]["deadline_hits"] == 1
+
+def test_ut41_async_question_falls_back_to_raw_question_when_deadline_exceeded(slow_ollama, monkeypatch):
+
+    monkeypatch.setenv("OLLAMA_ASSESSMENT_DEADLINE_S", "0.3")
+    agent = AssesmentAgent()
+
+    # Test: the generation is cancelled at the deadline and the raw question asked
+    with patch.object(AssesmentAgent, '_build_question_input', return_value={"question": "Trouble sleeping?", "question_id": 2, "context": ""}):
+        start_time = time.perf_counter()
+        response = asyncio.run(agent._anaturalize_question("Trouble sleeping?", 2, 1))
+        elapsed_time = time.perf_counter() - start_time
+
+    assert response == "Trouble sleeping?"
+    assert elapsed_time < 1.5
+    assert slow_ollama.get_stats()["assessment"] == {"calls": 1, "deadline_hits": 1, "max_latency_ms": pytest.approx(300, abs=200)}
+
+def test_ut42_assessment_call_admitted_before_queued_chat(scheduler):
+
+    # The only slot is busy: a chat call and then an assessment call wait
+    assert scheduler.acquire("conversation")
+    admitted = []
+
+    def call(agent_name):
+        scheduler.acquire(agent_name)
+        admitted.append(agent_name)
+        scheduler.release()
+
+    chat = threading.Thread(target=call, args=("conversation",))
+    chat.start()
+    wait_for_queue_depth(scheduler, 1)
+    assessment = threading.Thread(target=call, args=("assessment",))
+    assessment.start()
+    wait_for_queue_depth(scheduler, 2)
+
+    # Test: the assessment gets the slot first
+    scheduler.release()
+    chat.join()
+    assessment.join()
+
+    assert admitted == ["assessment", "conversation"]
+    stats = scheduler.get_stats()
+    assert stats["max_queue_depth"] == 2
+    assert stats["active"] == 0
+    assert stats["max_wait_ms"] > 0
+
+def test_ut43_full_queue_fails_fast_with_friendly_reply(scheduler, chain_input):
+
+    # The slot is busy and the queue is full
+    assert scheduler.acquire("conversation")
+    waiters = [threading.Thread(target=scheduler.acquire, args=("conversation",)) for _ in range(2)]
+    for waiter in waiters:
+        waiter.start()
+    wait_for_queue_depth(scheduler, 2)
+
+    # Test: a new chat turn is answered right away without calling the model
+    agent = ConversationAgent()
+    with patch('kusibot.chatbot.llm_deadlines.llm_scheduler', scheduler), \
+         patch.object(agent, 'chain') as chain:
+        start_time = time.perf_counter()
+        assert agent.generate_response("Hello", 1) == ConversationAgent.BUSY_RESPONSE
+        assert time.perf_counter() - start_time < 0.5
+
+    chain.stream.assert_not_called()
+    assert scheduler.get_stats()["rejected"] == 1
+
+    for _ in range(3):
+        scheduler.release()
+    for waiter in waiters:
+        waiter.join()
+
+def test_ut44_profiles_step_down_under_load_and_back_up(controller, scheduler_stats):
+
+    # Test: idle, the full profile
+    assert controller.get_profile("conversation")["name"] == "full"
+
+    # Test: a deep queue steps down one profile per update, down to the lightest
+    scheduler_stats["queue_depth"] = 10
+    assert controller.get_profile("conversation")["name"] == "reduced"
+    assert controller.get_profile("conversation")["name"] == "minimal"
+    assert controller.get_profile("conversation")["name"] == "minimal"
+
+    # Test: between the thresholds the profile is kept
+    scheduler_stats["queue_depth"] = 2
+    assert controller.get_profile("conversation")["name"] == "minimal"
+
+    # Test: an empty queue but slow generations keep it light
+    scheduler_stats["queue_depth"] = 0
+    controller.observe_latency(9.0)
+    assert controller.get_profile("conversation")["name"] == "minimal"
+
+    # Test: once the generations are fast again, it steps back up
+    for _ in range(10):
+        controller.observe_latency(0.5)
+    assert controller.get_profile("conversation")["name"] == "reduced"
+    assert controller.get_profile("conversation")["name"] == "full"
+
+    stats = controller.get_stats()
+    assert stats["level"] == 0
+    assert stats["profiles"] == {"conversation": "full"}
+    assert stats["switches"] == 4
+
+def test_ut45_lighter_profile_applied_to_ollama_options_and_context(controller, scheduler_stats, start_ollama,
+                                                                    registry, chain_input, monkeypatch):
+
+    server = start_ollama()
+    monkeypatch.setenv("OLLAMA_BASE_URL", server.url)
+    monkeypatch.setenv("OLLAMA_CONVERSATION_OPTIONS", json.dumps({"temperature": 0.2, "num_predict": 160}))
+
+    context_window = ContextWindow()
+    with patch('kusibot.chatbot.conversation_agent.llm_deadlines', LLMDeadlines()), \
+         patch('kusibot.chatbot.conversation_agent.context_window', context_window), \
+         patch('kusibot.chatbot.llm_deadlines.generation_controller', controller), \
+         patch('kusibot.chatbot.context_window.generation_controller', controller):
+        agent = ConversationAgent()
+
+        # Idle: the configured options and context budget
+        assert agent.generate_response("Hello", 1) == "Hi there!"
+        assert context_window.get_budget("conversation") == 768
+
+        # Under load: the reduced profile
+        scheduler_stats["queue_depth"] = 10
+        assert agent.generate_response("Hello", 1) == "Hi there!"
+        assert context_window.get_budget("conversation") == 256 # The next update steps down to minimal
+
+    # Test: the lighter profile only overrides its own options
+    full_options, reduced_options = (request["options"] for request in server.requests)
+    assert full_options["num_predict"] == 160
+    assert reduced_options["num_predict"] == 128
+    assert reduced_options["temperature"] == 0.2
+
+def test_ut48_similar_message_served_within_same_trivial_context(cache, monkeypatch):
+
+    context_key = cache.get_context_key("Hi", GREETING_HISTORY, "Normal")
+    cache.put(unit_embedding(1.0, 0.0, 0.0), context_key, "Hi! How are you feeling today?")
+
+    # Test: a similar message gets the reply, a different one or another context does not
+    assert cache.get(unit_embedding(1.0, 0.1, 0.0), context_key) == "Hi! How are you feeling today?"
+    assert cache.get(unit_embedding(0.0, 1.0, 0.0), context_key) is None
+    assert cache.get(unit_embedding(1.0, 0.0, 0.0), cache.get_context_key("Hi", GREETING_HISTORY, "Stress")) is None
+
+    # Test: only short messages without user messages in the context are cached
+    assert cache.get_context_key("Hi " * 20, GREETING_HISTORY, "Normal") is None
+    assert cache.get_context_key("Hi", {"chat_history": GREETING_HISTORY["chat_history"] + "\nUser: I feel sad"}, "Normal") is None
+
+    # Test: bounded size, the least recently used reply is evicted
+    cache.put(unit_embedding(0.0, 1.0, 0.0), context_key, "Hello there!")
+    assert cache.get(unit_embedding(1.0, 0.0, 0.0), context_key) == "Hi! How are you feeling today?"
+    cache.put(unit_embedding(0.0, 0.0, 1.0), context_key, "Hey! What's on your mind?")
+    assert cache.get(unit_embedding(0.0, 1.0, 0.0), context_key) is None
+    assert cache.get(unit_embedding(1.0, 0.0, 0.0), context_key) == "Hi! How are you feeling today?"
+
+    # Test: expired replies are dropped
+    monkeypatch.setenv("RESPONSE_CACHE_TTL_S", "0")
+    assert cache.get(unit_embedding(1.0, 0.0, 0.0), context_key) is None
+
+    stats = cache.get_stats()
+    assert stats["size"] == 0
+    assert stats["hits"] == 3
+    assert stats["hit_rate"] == 3 / 7
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 2
+
+def test_ut49_conversation_agent_reuses_reply_for_similar_greeting(cache):
+
+    embeddings = {"Hi": unit_embedding(1.0, 0.0), "Hi!": unit_embedding(1.0, 0.05), "Hello": unit_embedding(0.0, 1.0)}
+    agent = ConversationAgent()
+
+    with patch('kusibot.chatbot.conversation_agent.response_cache', cache), \
+         patch.object(cache, 'embed', side_effect=embeddings.get), \
+         patch('kusibot.chatbot.conversation_agent.llm_deadlines') as llm_deadlines, \
+         patch.object(ConversationAgent, '_build_chain_input', return_value=GREETING_HISTORY):
+        llm_deadlines.invoke.side_effect = ["Hi! How are you feeling today?", ConversationAgent.BUSY_RESPONSE, "Hello!"]
+
+        # Test: the similar greeting is answered without calling the model
+        assert agent.generate_response("Hi", 1, "Normal") == "Hi! How are you feeling today?"
+        assert agent.generate_response("Hi!", 2, "Normal") == "Hi! How are you feeling today?"
+        assert llm_deadlines.invoke.call_count == 1
+
+        # Test: canned replies are not stored
+        assert agent.generate_response("Hello", 3, "Normal") == ConversationAgent.BUSY_RESPONSE
+        assert agent.generate_response("Hello", 4, "Normal") == "Hello!"
+
+    assert cache.get_stats()["stores"] == 2
+
+def test_ut50_least_outstanding_routing_and_dead_backend_ejected(start_ollama, dead_backend, registry, chain_input, monkeypatch):
+
+    # Test: the requests in flight go to the least loaded backend
+    balancer = OllamaBalancer(["http://a:11434", "http://b:11434"])
+    first, second, third = balancer.acquire(), balancer.acquire(), balancer.acquire()
+    assert first is not second and third is first
+    balancer.release(second, True)
+    assert balancer.acquire() is second
+
+    # Two backends, one of them down
+    monkeypatch.setenv("OLLAMA_BASE_URLS", f"{dead_backend},{start_ollama('alive').url}")
+    monkeypatch.setenv("OLLAMA_BREAKER_FAILURES", "2")
+    agent = ConversationAgent()
+
+    # Test: every turn is answered, the dead backend is skipped and then ejected
+    assert [agent.generate_response("Hello", 1) for _ in range(5)] == ["alive"] * 5
+
+    stats = registry.get_stats()["balancers"][0]["backends"]
+    assert stats[dead_backend] == {"requests": 2, "outstanding": 0, "failures": 2, "ejections": 1, "ejected": True}
+    assert stats[registry.get_base_urls()[1]]["requests"] == 5
+
+    # Test: after the cooldown, one trial request is sent to it again
+    monkeypatch.setenv("OLLAMA_BREAKER_COOLDOWN_S", "0")
+    assert agent.generate_response("Hello", 1) == "alive"
+    assert registry.get_stats()["balancers"][0]["backends"][dead_backend]["requests"] == 3
+
+def test_ut51_slow_request_hedged_to_second_backend(start_ollama, registry, chain_input, monkeypatch):
+
+    # The first backend (picked first) takes 2 s to answer
+    monkeypatch.setenv("OLLAMA_BASE_URLS", f"{start_ollama('slow', 2.0).url},{start_ollama('fast').url}")
+    monkeypatch.setenv("OLLAMA_HEDGE_DELAY_S", "0.2")
+    agent = ConversationAgent()
+
+    # Test: the turn gets the answer of the hedge
+    start_time = time.perf_counter()
+    assert agent.generate_response("Hello", 1) == "fast"
+    assert time.perf_counter() - start_time < 1.0
+
+    # Test: the slower request was aborted as soon as the hedge answered (not counted as a failure)
+    abort_deadline = time.perf_counter() + 0.3
+    while registry.get_stats()["balancers"][0]["backends"][registry.get_base_urls()[0]]["outstanding"] and time.perf_counter() < abort_deadline:
+        time.sleep(0.01)
+    stats = registry.get_stats()["balancers"][0]
+    assert [backend["outstanding"] for backend in stats["backends"].values()] == [0, 0]
+    assert [backend["failures"] for backend in stats["backends"].values()] == [0, 0]
+
+    # Test: the next (async) turn is hedged as well, its slower task cancelled
+    assert asyncio.run(agent.agenerate_response("Hello", 1)) == "fast"
+    assert time.perf_counter() - start_time < 1.5
+
+    stats = registry.get_stats()["balancers"][0]
+    assert stats["hedged"] == 2
+    assert stats["hedge_wins"] == 2
+    assert [backend["requests"] for backend in stats["backends"].values()] == [2, 2]
+
+def test_ut52_warmup_preloads_models_before_ready(ollama, monkeypatch):
+
+    monkeypatch.setenv("OLLAMA_WARMUP_MODELS", "mistral, llama3")
+    warmup = ModelWarmup()
+    intent_warmed_up = threading.Event()
+
+    with patch('kusibot.chatbot.intent_recognizer_agent.IntentRecognizerAgent') as agent:
+        agent.return_value.warm_up.side_effect = lambda: (warmup.ready or intent_warmed_up.set())
+
+        # Test: not ready before the warm-up, ready once it ends
+        assert not warmup.ready
+        report = warmup.run()
+        assert warmup.ready
+
+    # Test: BERT was warmed up while not ready, and Ollama got a preload request per model
+    assert intent_warmed_up.is_set()
+    assert ollama.paths == ["/api/generate", "/api/generate"]
+    assert ollama.requests == [{"model": "mistral", "keep_alive": "30m"}, {"model": "llama3", "keep_alive": "30m"}]
+    assert report["failed"] == []
+    assert report["total_s"] >= report["intent_model_s"] + report["ollama_s"]
+    assert warmup.get_stats() == {"ready": True, "warmup": report}
+
+def test_ut53_failed_warmup_step_does_not_block_readiness(app, monkeypatch):
+
+    monkeypatch.setenv("OLLAMA_BASE_URL", "http://127.0.0.1:1") # Nobody listens
+    warmup = ModelWarmup()
+
+    with patch('kusibot.app.general.routes.model_warmup', warmup), \
+         patch('kusibot.chatbot.intent_recognizer_agent.IntentRecognizerAgent'):
+        client = app.test_client()
+
+        # Test: the readiness probe fails while warming up
+        response = client.get('/ready')
+        assert response.status_code == 503
+        assert response.get_json() == {"ready": False, "warmup": None}
+
+        # Test: Ollama is down, the step is reported and the process is ready anyway
+        warmup.start()
+        warmup._thread.join(timeout=10)
+        response = client.get('/ready')
+        assert response.status_code == 200
+        assert response.get_json()["warmup"]["failed"] == ["ollama"]
+
+def test_ut60_speculative_reply_cached_under_intent_of_turn(cache):
+
+    embeddings = {"Hi": unit_embedding(1.0, 0.0), "Hi!": unit_embedding(1.0, 0.05)}
+    agent = ConversationAgent()
+
+    async def aspeculate(text, conversation_id, intent):
+        intent_future = asyncio.get_running_loop().create_future()
+        speculation = asyncio.create_task(agent.aspeculate_response(text, conversation_id, intent_future))
+        await asyncio.sleep(0) # The intent is classified after the speculation started
+        intent_future.set_result(intent)
+        return await speculation
+
+    with patch('kusibot.chatbot.conversation_agent.response_cache', cache), \
+         patch.object(cache, 'embed', side_effect=embeddings.get), \
+         patch('kusibot.chatbot.conversation_agent.llm_deadlines') as llm_deadlines, \
+         patch.object(ConversationAgent, '_build_chain_input', return_value=GREETING_HISTORY):
+        llm_deadlines.invoke.return_value = "Hi! How are you feeling today?"
+        llm_deadlines.ainvoke = AsyncMock(return_value="Hi! I'm here for you.")
+
+        # Test: the sync speculation stores its reply with the intent handed over once classified
+        intent_future = concurrent.futures.Future()
+        intent_future.set_result("Normal")
+        assert agent.generate_response("Hi", 1, intent_future=intent_future) == "Hi! How are you feeling today?"
+        assert agent.generate_response("Hi!", 2, "Normal") == "Hi! How are you feeling today?"
+        assert llm_deadlines.invoke.call_count == 1
+
+        # Test: the async speculation looks the reply up and stores it under its own intent
+        assert asyncio.run(aspeculate("Hi!", 3, "Normal")) == "Hi! How are you feeling today?"
+        assert asyncio.run(aspeculate("Hi!", 4, "Stress")) == "Hi! I'm here for you."
+        assert asyncio.run(aspeculate("Hi", 5, "Stress")) == "Hi! I'm here for you."
+        assert llm_deadlines.ainvoke.call_count == 1
+
+@pytest.mark.parametrize('slow_ollama', ["slow", "stalling"], indirect=True)
+def test_ut61_deadline_bounds_queue_wait_and_generation_together(slow_ollama, chain_input, monkeypatch):
+
+    monkeypatch.setenv("OLLAMA_CONVERSATION_DEADLINE_S", "0.6")
+    monkeypatch.setenv("OLLAMA_MAX_PARALLEL", "1")
+    agent = ConversationAgent()
+
+    # Setting up: the only generation slot is busy for 0.4 s
+    assert llm_scheduler.acquire("summary")
+    threading.Timer(0.4, llm_scheduler.release).start()
+
+    # Test: the wait for the slot and the stalled generation share the deadline
+    start_time = time.perf_counter()
+    response = agent.generate_response("Hello", 1)
+    elapsed_time = time.perf_counter() - start_time
+
+    assert response in ConversationAgent.DEADLINE_RESPONSES
+    assert elapsed_time < 0.85
+    assert slow_ollama.get_stats()["conversation"]["deadline_hits"] == 1
+
+@pytest.mark.parametrize('slow_ollama', ["slow", "stalling"], indirect=True)
+def test_ut62_cancel_cuts_generation_and_frees_slot(slow_ollama, chain_input, monkeypatch):
+
+    monkeypatch.setenv("OLLAMA_CONVERSATION_DEADLINE_S", "5")
+    agent = ConversationAgent()
+    cancel_event = threading.Event()
+    responses = []
+
+    def speculate():
+        responses.append(agent.generate_response("Hello", 1, cancel_event=cancel_event))
+
+    # Setting up: a speculative generation waiting for the model
+    speculation = threading.Thread(target=speculate)
+    speculation.start()
+    time.sleep(0.3)
+
+    # Test: cancel frees its slot at once and ends it without waiting for the model
+    start_time = time.perf_counter()
+    slow_ollama.cancel(cancel_event)
+    assert llm_scheduler.get_stats()["active"] == 0
+
+    speculation.join(1)
+    elapsed_time = time.perf_counter() - start_time
+
+    assert not speculation.is_alive()
+    assert elapsed_time < 0.5
+    assert llm_scheduler.get_stats()["active"] == 0
+    assert slow_ollama.get_stats()["conversation"]["deadline_hits"] == 0